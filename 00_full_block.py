@@ -1,8 +1,12 @@
 import os
-import zipfile
+import argparse
 import json
 import re
 
+from archive_scanner import scan_sources
+from pack_writer import open_pack
+import run_report
+
 # ================= CONFIGURATION =================
 SOURCE_DIRS = ["mods", "datapacks"]
 OUTPUT_PACK_NAME = "00_Total_Spawn_Blocker"
@@ -34,70 +38,39 @@ def is_ignored(filename):
             return True
     return False
 
-def create_blocker_file(relative_path):
+def create_blocker_file(pack, relative_path):
     # --- FIX : ON ASEPTISE LE CHEMIN AVANT DE CRÉER ---
     safe_path = sanitize_filename(relative_path)
     # --------------------------------------------------
 
-    output_path = os.path.join(os.getcwd(), OUTPUT_PACK_NAME, safe_path)
-    
     try:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w") as f:
-            f.write('{"enabled": false, "spawns": []}')
+        pack.write(safe_path, '{"enabled": false, "spawns": []}')
     except Exception as e:
         print(f"Erreur création fichier : {e}")
 
-def process_everything():
+@run_report.stage("00_full_block.process_everything")
+def process_everything(jobs=1, as_zip=False):
     print("--- 🛡️ Génération du VRAI Blocker v3 (Sanitized) ---")
     
-    cwd = os.getcwd()
     files_blocked = 0
     files_ignored = 0
 
-    # Création du pack.mcmeta
-    os.makedirs(os.path.join(cwd, OUTPUT_PACK_NAME), exist_ok=True)
-    with open(os.path.join(cwd, OUTPUT_PACK_NAME, "pack.mcmeta"), "w") as f:
-        json.dump({"pack": {"pack_format": 15, "description": "The True Blocker"}}, f, indent=4)
-
-    for folder in SOURCE_DIRS:
-        target_dir = os.path.join(cwd, folder)
-        if not os.path.exists(target_dir): continue
+    scan = scan_sources(SOURCE_DIRS, jobs=jobs)
 
-        for root, dirs, files in os.walk(target_dir):
-            for file in files:
-                full_path = os.path.join(root, file)
-                
-                # CAS 1 : Archives
-                if file.lower().endswith((".jar", ".zip")):
-                    try:
-                        with zipfile.ZipFile(full_path, 'r') as z:
-                            for internal in z.namelist():
-                                if "spawn_pool_world" in internal and internal.endswith(".json"):
-                                    if is_ignored(internal):
-                                        files_ignored += 1
-                                        continue
+    with open_pack(OUTPUT_PACK_NAME, as_zip) as pack:
+        # Création du pack.mcmeta
+        pack.write("pack.mcmeta", json.dumps({"pack": {"pack_format": 15, "description": "The True Blocker"}}, indent=4))
 
-                                    parts = internal.split("/")
-                                    if "data" in parts:
-                                        data_idx = parts.index("data")
-                                        relative_path = "/".join(parts[data_idx:])
-                                        create_blocker_file(relative_path)
-                                        files_blocked += 1
-                    except: pass
+        for entry in scan.spawn_files:
+            # Archives : on teste tout le chemin interne / Dossiers : seulement le nom du fichier
+            if is_ignored(entry.path if entry.archive else entry.filename):
+                files_ignored += 1
+                continue
 
-                # CAS 2 : Dossiers
-                elif file.endswith(".json") and "spawn_pool_world" in full_path:
-                    if is_ignored(file):
-                        files_ignored += 1
-                        continue
-
-                    path_parts = full_path.replace("\\", "/").split("/")
-                    if "data" in path_parts:
-                        data_idx = path_parts.index("data")
-                        relative_path = "/".join(path_parts[data_idx:])
-                        create_blocker_file(relative_path)
-                        files_blocked += 1
+            relative_path = entry.data_path()
+            if relative_path:
+                create_blocker_file(pack, relative_path)
+                files_blocked += 1
 
     print("-" * 40)
     print(f"✅ TERMINÉ !")
@@ -107,4 +80,15 @@ def process_everything():
     print("Action : Supprime l'ancien dossier '00' et remplace-le par celui-ci.")
 
 if __name__ == "__main__":
-    process_everything()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pack qui bloque tous les spawns d'origine")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de process pour lire les archives (0 = tous les coeurs)")
+    parser.add_argument("--zip", action="store_true",
+                        help="Écrit le pack directement dans une archive .zip au lieu d'un dossier")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    args = parser.parse_args()
+    if args.profile: run_report.enable()
+
+    process_everything(jobs=args.jobs, as_zip=args.zip)
+    run_report.save()
@@ -1,9 +1,15 @@
 import os
+import argparse
 import json
-import zipfile
 import re
 import statistics
-import copy
+
+from archive_scanner import scan_sources
+from spawn_rules import SpawnRule
+from biome_table import BiomeTable
+from pack_writer import open_pack, remove_stale_files, fingerprint, BuildState
+from legendaries import get_matcher
+import run_report
 
 # ================= CONFIGURATION =================
 SOURCE_DIRS = ["mods", "datapacks"]
@@ -12,27 +18,16 @@ BIOME_DB_FILE = "biome_database.json"
 PACK_00_NAME = "00_Total_Spawn_Blocker"
 PACK_01_NAME = "01_Unified_Spawns"
 PACK_02_NAME = "02_Legendary_Protection"
-
-# Mots clés légendaires
-LEGENDARY_KEYWORDS = [
-    "articuno", "zapdos", "moltres", "mewtwo", "mew",
-    "raikou", "entei", "suicune", "lugia", "hooh", "celebi",
-    "regirock", "regice", "registeel", "latias", "latios", "kyogre", "groudon", "rayquaza", "jirachi", "deoxys",
-    "uxie", "mesprit", "azelf", "dialga", "palkia", "heatran", "regigigas", "giratina", "cresselia", "phione", "manaphy", "darkrai", "shaymin", "arceus",
-    "victini", "cobalion", "terrakion", "virizion", "tornadus", "thundurus", "reshiram", "zekrom", "landorus", "kyurem", "keldeo", "meloetta", "genesect",
-    "xerneas", "yveltal", "zygarde", "diancie", "hoopa", "volcanion",
-    "typenull", "silvally", "tapukoko", "tapulele", "tapubulu", "tapufini", "cosmog", "cosmoem", "solgaleo", "lunala", "nihilego", "buzzwole", "pheromosa", "xurkitree", "celesteela", "kartana", "guzzlord", "necrozma", "magearna", "marshadow", "poipole", "naganadel", "stakataka", "blacephalon", "zeraora", "meltan", "melmetal",
-    "zacian", "zamazenta", "eternatus", "kubfu", "urshifu", "zarude", "regieleki", "regidrago", "glastrier", "spectrier", "calyrex", "enamorus",
-    "koraidon", "miraidon", "walkingwake", "ironleaves", "okidogi", "munkidori", "fezandipiti", "ogerpon", "terapagos", 
-    "roaringmoon", "ironvaliant", "greattusk", "screamtail", "brutebonnet", "fluttermane", "sandyshocks", "ironbundle", "ironhands", "ironjugulis", "ironmoth", "ironthorns", "gougeingfire", "ragingbolt", "ironboulder", "ironcrown"
-]
+# Les légendaires à exclure : legendaries.py (ou legendaries.txt pour ta propre liste)
 # =================================================
 
 resolved_tags = {}
+biome_table = BiomeTable() # Biome -> ID entier, les règles comparent leurs biomes en masques
 try:
     with open(BIOME_DB_FILE, 'r') as f:
         db = json.load(f)
         resolved_tags = db.get("tags", {})
+        biome_table = BiomeTable.from_database(db)
     print("✅ Base de données biomes chargée.")
 except:
     print("⚠️ Base de données biomes non trouvée.")
@@ -52,16 +47,12 @@ def extract_pokemon_name(filename):
     return name.lower()
 
 def is_legendary(poke_name):
-    clean_name = poke_name.lower().replace("cobblemon:", "")
-    for leg in LEGENDARY_KEYWORDS:
-        if leg in clean_name:
-            return True
-    return False
+    # Liste partagée avec 03_legendary_blocker.py (voir legendaries.py)
+    return get_matcher().match(poke_name) is not None
 
 # --- ETAPE 1 : COLLECTION ---
-def collect_rule(content, filename):
-    try: data = json.load(content)
-    except: return
+def collect_rule(data, filename):
+    if not isinstance(data, dict): return
     if "spawns" not in data or not isinstance(data["spawns"], list): return
 
     files_to_block.add(filename)
@@ -73,127 +64,85 @@ def collect_rule(content, filename):
     if poke_name not in raw_spawns: raw_spawns[poke_name] = []
 
     for rule in data["spawns"]:
+        # Copie : le document décodé est partagé avec les autres étapes du scan
+        rule = dict(rule)
         if "spawnablePositionType" in rule:
             rule["context"] = rule.pop("spawnablePositionType")
-        raw_spawns[poke_name].append(rule)
+        raw_spawns[poke_name].append(SpawnRule(rule, biome_table))
 
-def scan_everything():
+@run_report.stage("01_unified_spawns.scan_everything")
+def scan_everything(jobs=1):
     print("--- 🔍 Phase 1 : Extraction ---")
-    cwd = os.getcwd()
-    for folder in SOURCE_DIRS:
-        target_dir = os.path.join(cwd, folder)
-        if not os.path.exists(target_dir): continue
-        for root, dirs, files in os.walk(target_dir):
-            for file in files:
-                full_path = os.path.join(root, file)
-                if file.endswith(".json") and "spawn_pool_world" in root:
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        collect_rule(f, file)
-                elif file.lower().endswith((".zip", ".jar")):
-                    try:
-                        with zipfile.ZipFile(full_path, 'r') as z:
-                            for internal in z.namelist():
-                                if "cobblemon/spawn_pool_world" in internal and internal.endswith(".json"):
-                                    with z.open(internal) as f:
-                                        collect_rule(f, os.path.basename(internal))
-                    except: pass
+    scan = scan_sources(SOURCE_DIRS, jobs=jobs)
+    for entry in scan.spawn_files:
+        # Dans les archives, seul le namespace cobblemon nous intéresse
+        if entry.archive and "cobblemon/spawn_pool_world" not in entry.path: continue
+        collect_rule(entry.load(), entry.filename)
 
 # --- ETAPE 2 : FUSION ---
 
-def get_core_signature(rule):
-    r = copy.deepcopy(rule)
-    ignore = ["id", "_comment", "weight", "q", "bucket_weight"]
-    for k in ignore: r.pop(k, None)
-    if "condition" in r:
-        r["condition"].pop("biomes", None)
-        for k, v in r["condition"].items():
-            if isinstance(v, list): r["condition"][k] = sorted(v)
-    if "anticondition" in r:
-        for k, v in r["anticondition"].items():
-            if isinstance(v, list): r["anticondition"][k] = sorted(v)
-    return json.dumps(r, sort_keys=True)
-
 def is_overworld_tag(biome_id):
     b = biome_id if ":" in biome_id else f"minecraft:{biome_id}"
     return b in ["minecraft:is_overworld", "cobblemon:is_overworld", "#minecraft:is_overworld", "#cobblemon:is_overworld"]
 
-def process_and_merge():
+@run_report.stage("01_unified_spawns.process_and_merge")
+def process_and_merge(only=None):
+    """Fusionne les règles de chaque espèce (seulement celles de 'only' si fourni)."""
     print("--- 🧠 Phase 2 : Fusion & Sauvetage ---")
     final_spawns = {}
     
     count_legendaries_blocked = 0
 
+    # Tous les IDs "Overworld" de la table, pour les tester d'un seul ET binaire
+    overworld_mask = 0
+    for biome_id, name in enumerate(biome_table.names):
+        if is_overworld_tag(name): overworld_mask |= 1 << biome_id
+
     for pokemon, rules in raw_spawns.items():
         if is_legendary(pokemon):
             count_legendaries_blocked += 1
             continue
+        if only is not None and pokemon not in only: continue
 
-        flat_rules = []
+        # --- FIX V5 : Remplacement intelligent ---
+        # Chaque règle est "aplatie" en un couple (règle, ID de biome) : les biomes vides ont déjà
+        # été remplacés par Overworld à la collecte (c'est ici qu'on sauve Altaria !).
+        # Une règle sans biomes (Global Rule) donne un seul couple avec l'ID -1.
+        groups = {}
         for rule in rules:
-            biomes = rule.get("condition", {}).get("biomes", [])
-            
-            # --- FIX V5 : Remplacement intelligent ---
-            if biomes:
-                corrected_biomes = []
-                for b in biomes:
-                    if not b or b.strip() == "":
-                        # C'est ici qu'on sauve Altaria !
-                        # On remplace le vide par Overworld
-                        corrected_biomes.append("#cobblemon:is_overworld")
-                    else:
-                        corrected_biomes.append(b)
-                
-                # On applique la correction
-                for b in corrected_biomes:
-                    new_r = copy.deepcopy(rule)
-                    new_r["condition"]["biomes"] = [b]
-                    flat_rules.append(new_r)
+            members = groups.setdefault(rule.signature, [])
+            if rule.biome_ids:
+                for biome_id in rule.biome_ids: members.append((rule, biome_id))
             else:
-                # Pas de biomes du tout (Global Rule), on garde tel quel
-                flat_rules.append(rule)
-        
-        groups = {}
-        for r in flat_rules:
-            sig = get_core_signature(r)
-            if sig not in groups: groups[sig] = []
-            groups[sig].append(r)
+                members.append((rule, -1))
             
         merged_rules = []
-        for sig, group_rules in groups.items():
-            biomes_in_group = set()
-            has_overworld = False
-            for gr in group_rules:
-                b_list = gr.get("condition", {}).get("biomes", [])
-                b = b_list[0] if b_list else ""
-                
-                if b: 
-                    biomes_in_group.add(b)
-                    if is_overworld_tag(b): has_overworld = True
+        for group_rules in groups.values():
+            biomes_in_group = 0
+            for _, biome_id in group_rules:
+                if biome_id >= 0: biomes_in_group |= 1 << biome_id
+            has_overworld = biomes_in_group & overworld_mask
             
-            filtered_rules = []
-            if has_overworld and len(biomes_in_group) > 1:
-                for gr in group_rules:
-                    b_list = gr.get("condition", {}).get("biomes", [])
-                    b = b_list[0] if b_list else ""
-                    if not is_overworld_tag(b): filtered_rules.append(gr)
+            if has_overworld and biomes_in_group.bit_count() > 1:
+                filtered_rules = [(r, i) for r, i in group_rules if i < 0 or not (overworld_mask >> i) & 1]
             else: filtered_rules = group_rules
             
             if not filtered_rules: continue
 
-            final_biomes = set()
-            weights = []
-            template = copy.deepcopy(filtered_rules[0])
-            for fr in filtered_rules:
-                b_list = fr.get("condition", {}).get("biomes", [])
-                if b_list: final_biomes.add(b_list[0])
-                weights.append(fr.get("weight", 1.0))
-            
+            final_biomes = 0
+            for _, biome_id in filtered_rules:
+                if biome_id >= 0: final_biomes |= 1 << biome_id
+            weights = [r.weight for r, _ in filtered_rules]
+
+            # Copie de surface : seuls weight, id et condition.biomes sont remplacés
+            template = dict(filtered_rules[0][0].data)
             avg_weight = round(statistics.mean(weights), 2)
             template["weight"] = avg_weight
             
             if final_biomes:
-                if "condition" not in template: template["condition"] = {}
-                template["condition"]["biomes"] = sorted(list(final_biomes))
+                condition = dict(template.get("condition", {}))
+                condition["biomes"] = sorted(biome_table.names_of(final_biomes))
+                template["condition"] = condition
             
             template["id"] = f"{pokemon}-{len(merged_rules)}"
             merged_rules.append(template)
@@ -203,23 +152,97 @@ def process_and_merge():
     print(f"🚫 {count_legendaries_blocked} Pokémon Légendaires exclus.")
     return final_spawns
 
+# --- MODE INCREMENTAL ---
+def input_fingerprints():
+    """Fichier de sortie -> (espèces qu'il contient, empreinte de leurs règles brutes)."""
+    # Plusieurs espèces peuvent tomber sur le même nom de fichier : on les garde ensemble
+    files = {}
+    for pokemon, rules in raw_spawns.items():
+        if is_legendary(pokemon): continue
+        files.setdefault(sanitize_filename(pokemon) + ".json", []).append([pokemon, [r.data for r in rules]])
+    return {filename: ([pokemon for pokemon, rules in members], fingerprint(members)) for filename, members in files.items()}
+
+def plan_incremental(state):
+    """
+    Compare l'empreinte des règles brutes de chaque fichier de sortie au run précédent.
+    Renvoie (espèces à recalculer, fichiers attendus dans le pack).
+    """
+    path_01 = os.path.join(PACK_01_NAME, "data", "cobblemon", "spawn_pool_world")
+
+    files = input_fingerprints()
+    dirty = set()
+    for filename, (species, fp) in files.items():
+        if not state.is_fresh(filename, fp) or not os.path.exists(os.path.join(path_01, filename)):
+            dirty.update(species)
+        state.record(filename, fp)
+
+    print(f"♻️ Incrémental : {len(dirty)} espèces à recalculer sur {len(raw_spawns)}.")
+    return dirty, set(files)
+
 # --- ETAPE 3 : ECRITURE ---
-def write_packs(content):
+@run_report.stage("01_unified_spawns.write_packs")
+def write_packs(content, keep_files=None, as_zip=False):
+    """
+    Écrit le pack 01, en dossier ou directement en .zip (as_zip).
+    Avec keep_files (mode incrémental, dossier seulement), les fichiers en trop sont supprimés.
+    """
     print("--- 💾 Phase 3 : Génération ---")
     
-    path_01 = os.path.join(PACK_01_NAME, "data", "cobblemon", "spawn_pool_world")
-    os.makedirs(path_01, exist_ok=True)
-    with open(os.path.join(PACK_01_NAME, "pack.mcmeta"), "w") as f:
-        json.dump({"pack": {"pack_format": 15, "description": "Unified Spawns"}}, f, indent=4)
+    spawn_dir = "data/cobblemon/spawn_pool_world"
     
+    # Si deux espèces donnent le même nom de fichier, la dernière l'emporte
+    outputs = {}
     for pokemon, rules in content.items():
         clean_filename = sanitize_filename(pokemon) + ".json"
-        with open(os.path.join(path_01, clean_filename), "w") as f:
-            json.dump({"enabled": True, "neededInstalledMods": [], "spawns": rules}, f, indent=2)
-
-    print("✅ Pack 01 généré.")
+        outputs[clean_filename] = json.dumps({"enabled": True, "neededInstalledMods": [], "spawns": rules}, indent=2)
+
+    files_written = 0
+    with open_pack(PACK_01_NAME, as_zip) as pack:
+        pack.write("pack.mcmeta", json.dumps({"pack": {"pack_format": 15, "description": "Unified Spawns"}}, indent=4))
+        for clean_filename, text in outputs.items():
+            if pack.write(f"{spawn_dir}/{clean_filename}", text):
+                files_written += 1
+
+    if keep_files is not None and not as_zip:
+        removed = remove_stale_files(os.path.join(PACK_01_NAME, *spawn_dir.split("/")), keep_files)
+        if removed: print(f"🗑️ {removed} fichiers obsolètes supprimés.")
+
+    print(f"✅ Pack 01 généré. ({files_written} fichiers modifiés)")
+
+def build_pack(incremental=False, as_zip=False):
+    """
+    Phases 2 et 3. Tout run en dossier enregistre ses empreintes dans build_state.json, run complet compris :
+    sinon un --incremental après un run complet comparerait les entrées à celles d'un run plus ancien
+    et garderait des fichiers écrits depuis pour d'autres règles. Le zip ne touche pas au dossier ni à son état.
+    """
+    if as_zip:
+        write_packs(process_and_merge(), as_zip=True)
+        return
+    state = BuildState(PACK_01_NAME)
+    if incremental:
+        dirty, keep_files = plan_incremental(state)
+        write_packs(process_and_merge(only=dirty), keep_files)
+    else:
+        for filename, (species, fp) in input_fingerprints().items():
+            state.record(filename, fp)
+        write_packs(process_and_merge())
+    state.save()
 
 if __name__ == "__main__":
-    scan_everything()
-    final_data = process_and_merge()
-    write_packs(final_data)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Génère le pack de spawns unifié")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de process pour lire les archives (0 = tous les coeurs)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Ne recalcule et ne réécrit que les espèces dont les règles ont changé")
+    parser.add_argument("--zip", action="store_true",
+                        help="Écrit le pack directement dans une archive .zip au lieu d'un dossier")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    args = parser.parse_args()
+    if args.incremental and args.zip:
+        parser.error("--incremental réutilise les fichiers du dossier 01 : incompatible avec --zip")
+    if args.profile: run_report.enable()
+
+    scan_everything(jobs=args.jobs)
+    build_pack(incremental=args.incremental, as_zip=args.zip)
+    run_report.save()
@@ -1,16 +1,26 @@
 import os
+import argparse
 import json
-import copy
+import zipfile
+
+from spawn_rules import SubsumptionIndex
+from biome_table import load_biome_table
+from pack_writer import open_pack, remove_stale_files, fingerprint, BuildState
+import run_report
 
 # ================= CONFIGURATION =================
 # On prend en entrée le pack propre généré à l'étape précédente
 INPUT_PACK_NAME = "01_Unified_Spawns"
 INPUT_DIR = os.path.join(os.getcwd(), INPUT_PACK_NAME, "data", "cobblemon", "spawn_pool_world")
+INPUT_ZIP = os.path.join(os.getcwd(), f"{INPUT_PACK_NAME}.zip")
 
 # Nouveau pack de sortie (Le Final)
 OUTPUT_PACK_NAME = "03_Final_Cleaned_Spawns"
 # =================================================
 
+# Biome -> ID entier partagé par toutes les espèces (IDs de biome_database.json)
+biome_table = load_biome_table()
+
 def calculate_specificity_score(rule):
     """Calcule à quel point une règle est 'restrictive'."""
     score = 0
@@ -63,83 +73,126 @@ def clean_rules(rules):
     if not rules: return [], 0 
     
     kept_rules = []
+    # Index des règles acceptées : même verdict que is_subset(), sans comparer chaque paire
+    index = SubsumptionIndex(biome_table)
     # Tri décroissant : les règles les plus complexes (score haut) en premier
     sorted_rules = sorted(rules, key=calculate_specificity_score, reverse=True)
     
     deleted_count = 0
     
     for candidate in sorted_rules:
-        is_redundant_generalization = False
-        
-        for accepted in kept_rules:
-            # Si une règle déjà acceptée (précise) couvre celle-ci (générale)
-            if is_subset(accepted, candidate):
-                is_redundant_generalization = True
-                break
-        
-        if not is_redundant_generalization:
-            kept_rules.append(candidate)
-        else:
+        # Si une règle déjà acceptée (précise) couvre celle-ci (générale)
+        if index.covers(candidate):
             deleted_count += 1
+        else:
+            kept_rules.append(candidate)
+            index.add(candidate)
             
     return kept_rules, deleted_count
 
-def process_files():
+def read_input_files(as_zip=False):
+    """
+    Fichiers de spawn du pack 01 : (nom, contenu brut), depuis le dossier ou depuis
+    01_Unified_Spawns.zip (généré avec --zip). Si les deux existent, on lit celui du mode
+    en cours (--zip ou pas) : l'autre est un reste d'un lancement précédent.
+    Renvoie None si aucun des deux n'existe.
+    """
+    sources = [INPUT_ZIP, INPUT_DIR] if as_zip else [INPUT_DIR, INPUT_ZIP]
+    existing = [path for path in sources if os.path.exists(path)]
+    if not existing: return None
+    if len(existing) == 2:
+        labels = {INPUT_DIR: f"le dossier {INPUT_PACK_NAME}", INPUT_ZIP: f"{INPUT_PACK_NAME}.zip"}
+        print(f"ℹ️ Pack 01 lu depuis {labels[existing[0]]} (mode {'--zip' if as_zip else 'dossier'}) : {labels[existing[1]]} est ignoré.")
+
+    if existing[0] == INPUT_DIR:
+        files = []
+        for filename in os.listdir(INPUT_DIR):
+            if not filename.endswith(".json"): continue
+            try:
+                with open(os.path.join(INPUT_DIR, filename), 'rb') as f:
+                    files.append((filename, f.read()))
+            except: continue
+        return files
+
+    prefix = "data/cobblemon/spawn_pool_world/"
+    with zipfile.ZipFile(INPUT_ZIP, 'r') as z:
+        return [(name[len(prefix):], z.read(name)) for name in z.namelist()
+                if name.startswith(prefix) and name.endswith(".json") and "/" not in name[len(prefix):]]
+
+@run_report.stage("02_clean_spawns.process_files")
+def process_files(incremental=False, as_zip=False):
+    """
+    Nettoie chaque fichier du pack 01. En incrémental, les fichiers inchangés sont sautés.
+    Avec as_zip, le pack final est écrit directement dans une archive .zip.
+    Tout run en dossier (complet ou non) enregistre les empreintes de ses entrées dans build_state.json,
+    pour que le prochain --incremental compare avec ce qui est vraiment dans le dossier.
+    """
     print(f"--- 🧹 Démarrage du Nettoyage Restrictif (v3) ---")
     
-    if not os.path.exists(INPUT_DIR):
+    input_files = read_input_files(as_zip)
+    if input_files is None:
         print(f"❌ ERREUR : Le dossier source '{INPUT_DIR}' n'existe pas.")
         print("Assure-toi d'avoir lancé le script 'step2_semantic_fusion_v5.py' avant.")
         return
 
-    # Préparation dossier sortie
-    output_base = os.path.join(os.getcwd(), OUTPUT_PACK_NAME)
-    output_json_dir = os.path.join(output_base, "data", "cobblemon", "spawn_pool_world")
-    os.makedirs(output_json_dir, exist_ok=True)
-    
-    with open(os.path.join(output_base, "pack.mcmeta"), "w") as f:
-        json.dump({"pack": {"pack_format": 15, "description": "Cleaned Restrictive Spawns"}}, f, indent=4)
+    output_json_dir = os.path.join(os.getcwd(), OUTPUT_PACK_NAME, "data", "cobblemon", "spawn_pool_world")
+    spawn_dir = "data/cobblemon/spawn_pool_world"
 
+    state = None if as_zip else BuildState(OUTPUT_PACK_NAME)
     total_removed = 0
     files_processed = 0
+    files_skipped = 0
+    files_written = 0
 
-    for filename in os.listdir(INPUT_DIR):
-        if not filename.endswith(".json"): continue
-        
-        filepath = os.path.join(INPUT_DIR, filename)
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except: continue
+    with open_pack(OUTPUT_PACK_NAME, as_zip) as pack:
+        pack.write("pack.mcmeta", json.dumps({"pack": {"pack_format": 15, "description": "Cleaned Restrictive Spawns"}}, indent=4))
 
-        if "spawns" not in data: continue
-        
-        original_rules = data["spawns"]
-        
-        # LE NETTOYAGE
-        cleaned_rules, removed = clean_rules(original_rules)
-        total_removed += removed
-        
-        # Réécriture des IDs (basé sur le nom du fichier déjà nettoyé par l'étape 2)
-        poke_name = filename.replace(".json", "")
-        for i, rule in enumerate(cleaned_rules):
-            rule["id"] = f"{poke_name}-{i}"
-
-        output_data = {
-            "enabled": True,
-            "neededInstalledMods": [],
-            "spawns": cleaned_rules
-        }
-        
-        # On garde le même nom de fichier (qui est déjà propre/aseptisé depuis l'étape 2)
-        with open(os.path.join(output_json_dir, filename), "w") as f:
-            json.dump(output_data, f, indent=2)
+        for filename, content in input_files:
+            if state:
+                fp = fingerprint(content)
+                state.record(filename, fp)
+                if incremental and state.is_fresh(filename, fp) and os.path.exists(os.path.join(output_json_dir, filename)):
+                    files_skipped += 1
+                    continue
+
+            try:
+                data = json.loads(content.decode('utf-8'))
+            except: continue
+
+            if "spawns" not in data: continue
+            
+            original_rules = data["spawns"]
+            
+            # LE NETTOYAGE
+            cleaned_rules, removed = clean_rules(original_rules)
+            total_removed += removed
             
-        files_processed += 1
+            # Réécriture des IDs (basé sur le nom du fichier déjà nettoyé par l'étape 2)
+            poke_name = filename.replace(".json", "")
+            for i, rule in enumerate(cleaned_rules):
+                rule["id"] = f"{poke_name}-{i}"
+
+            output_data = {
+                "enabled": True,
+                "neededInstalledMods": [],
+                "spawns": cleaned_rules
+            }
+            
+            # On garde le même nom de fichier (qui est déjà propre/aseptisé depuis l'étape 2)
+            if pack.write(f"{spawn_dir}/{filename}", json.dumps(output_data, indent=2)):
+                files_written += 1
+                
+            files_processed += 1
+
+    if state: state.save()
+    if incremental:
+        stale = remove_stale_files(output_json_dir, {filename for filename, _ in input_files})
+        if stale: print(f"🗑️ {stale} fichiers obsolètes supprimés.")
 
     print("-" * 40)
     print(f"✅ TERMINÉ !")
-    print(f"📂 Fichiers traités : {files_processed}")
+    print(f"📂 Fichiers traités : {files_processed} ({files_written} modifiés)")
+    if incremental: print(f"⏭️ Fichiers inchangés ignorés : {files_skipped}")
     print(f"🗑️ Règles génériques supprimées : {total_removed}")
     print(f"📦 Nouveau Pack : '{OUTPUT_PACK_NAME}'")
     print("-" * 40)
@@ -149,4 +202,17 @@ def process_files():
     print("   (Ou remplace carrément le 01 par le 05 si tu veux être radical).")
 
 if __name__ == "__main__":
-    process_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Nettoyage restrictif du pack 01")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Ne retraite et ne réécrit que les fichiers du pack 01 qui ont changé")
+    parser.add_argument("--zip", action="store_true",
+                        help="Écrit le pack directement dans une archive .zip au lieu d'un dossier")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    args = parser.parse_args()
+    if args.incremental and args.zip:
+        parser.error("--incremental réutilise les fichiers du dossier de sortie : incompatible avec --zip")
+    if args.profile: run_report.enable()
+
+    process_files(incremental=args.incremental, as_zip=args.zip)
+    run_report.save()
@@ -1,27 +1,29 @@
 import os
-import zipfile
+import argparse
 import json
 import re
 
+from archive_scanner import scan_sources
+from pack_writer import open_pack
+from legendaries import get_matcher
+import run_report
+
 # ================= CONFIGURATION =================
 SOURCE_DIRS = ["mods", "datapacks"]
 OUTPUT_PACK_NAME = "03_Legendary_Protection"
-
-# La liste des cibles à abattre
-LEGENDARIES = [
-    "articuno", "zapdos", "moltres", "mewtwo", "mew",
-    "raikou", "entei", "suicune", "lugia", "hooh", "celebi",
-    "regirock", "regice", "registeel", "latias", "latios", "kyogre", "groudon", "rayquaza", "jirachi", "deoxys",
-    "uxie", "mesprit", "azelf", "dialga", "palkia", "heatran", "regigigas", "giratina", "cresselia", "phione", "manaphy", "darkrai", "shaymin", "arceus",
-    "victini", "cobalion", "terrakion", "virizion", "tornadus", "thundurus", "reshiram", "zekrom", "landorus", "kyurem", "keldeo", "meloetta", "genesect",
-    "xerneas", "yveltal", "zygarde", "diancie", "hoopa", "volcanion",
-    "typenull", "silvally", "tapukoko", "tapulele", "tapubulu", "tapufini", "cosmog", "cosmoem", "solgaleo", "lunala", "nihilego", "buzzwole", "pheromosa", "xurkitree", "celesteela", "kartana", "guzzlord", "necrozma", "magearna", "marshadow", "poipole", "naganadel", "stakataka", "blacephalon", "zeraora", "meltan", "melmetal",
-    "zacian", "zamazenta", "eternatus", "kubfu", "urshifu", "zarude", "regieleki", "regidrago", "glastrier", "spectrier", "calyrex", "enamorus",
-    "koraidon", "miraidon", "walkingwake", "ironleaves", "okidogi", "munkidori", "fezandipiti", "ogerpon", "terapagos", 
-    "roaringmoon", "ironvaliant", "greattusk", "screamtail", "brutebonnet", "fluttermane", "sandyshocks", "ironbundle", "ironhands", "ironjugulis", "ironmoth", "ironthorns", "gougeingfire", "ragingbolt", "ironboulder", "ironcrown"
-]
+# Les légendaires à exclure : legendaries.py (ou legendaries.txt pour ta propre liste)
 # =================================================
 
+# Lecture rapide des fichiers encore bruts : on cherche les champs "pokemon" directement dans
+# les octets au lieu de décoder tout le document. Le regex les trouve à toutes les profondeurs,
+# donc au moins tous ceux que lit le décodage complet (les règles de "spawns") : si aucun n'est
+# un légendaire, le fichier est sûr. Sinon le fichier est décodé pour confirmer (un "pokemon"
+# hors de "spawns" ne compte pas). Une valeur qui n'est pas une simple chaîne, un fichier qui
+# n'est pas un objet, ou une clé écrite avec des \u00xx renvoient aussi vers le décodage complet.
+POKEMON_FIELD = re.compile(rb'"pokemon"\s*:\s*("[^"\\]*(?:\\.[^"\\]*)*")?')
+# \u0070 = "p", \u006b = "k"... : une clé "pokemon" ainsi écrite échapperait au regex
+ESCAPED_KEY_LETTER = re.compile(rb'\\u00(?:70|6[5bBdDeEfF])')
+
 def sanitize_filename(path):
     """Nettoie le chemin pour éviter les crashs (espaces, =, etc)"""
     directory, filename = os.path.split(path)
@@ -30,106 +32,102 @@ def sanitize_filename(path):
     filename = re.sub(r"__+", "_", filename)
     return os.path.join(directory, filename)
 
-def is_legendary_file(content_bytes, filename):
+def is_legendary_file(data, filename):
     """
-    Analyse le contenu (ou le nom) pour voir s'il s'agit d'un légendaire.
+    Analyse le contenu JSON décodé (ou le nom) pour voir s'il s'agit d'un légendaire.
     """
+    matcher = get_matcher() # Liste partagée avec 01_unified_spawns.py (voir legendaries.py)
     try:
         # 1. Check rapide sur le nom de fichier
-        clean_name = filename.lower()
-        for leg in LEGENDARIES:
-            if leg in clean_name:
-                return True, leg
+        leg = matcher.match(filename)
+        if leg: return True, leg
 
         # 2. Check profond sur le contenu JSON
-        data = json.loads(content_bytes)
-        if "spawns" in data and isinstance(data["spawns"], list):
+        if data is not None and "spawns" in data and isinstance(data["spawns"], list):
             for rule in data["spawns"]:
                 if "pokemon" in rule:
-                    poke = rule["pokemon"].replace("cobblemon:", "").lower()
-                    for leg in LEGENDARIES:
-                        if leg in poke:
-                            return True, leg
+                    leg = matcher.match(rule["pokemon"])
+                    if leg: return True, leg
     except:
         pass
     return False, None
 
-def create_blocker_file(relative_path, culprit_name):
+def pokemon_fields(raw):
+    """
+    Valeurs de tous les champs "pokemon" d'un fichier brut, une par une (on peut s'arrêter au premier légendaire).
+    ValueError si le fichier sort du cas simple : il faut alors le décoder entièrement.
+    """
+    if not raw.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"{"): raise ValueError("pas un objet JSON en UTF-8")
+    if ESCAPED_KEY_LETTER.search(raw): raise ValueError("lettres échappées")
+    for found in POKEMON_FIELD.finditer(raw):
+        value = found.group(1)
+        if value is None: raise ValueError("champ pokemon qui n'est pas une chaîne")
+        # Le cas courant (aucun échappement) se décode directement, sinon json gère les \u00e9...
+        yield value[1:-1].decode("utf-8") if b"\\" not in value else json.loads(value)
+
+def is_legendary_entry(entry, filename):
+    """
+    Comme is_legendary_file, sans décoder le JSON quand il n'est encore que des octets :
+    un fichier où aucun champ "pokemon" n'est un légendaire (presque tous) n'est jamais décodé.
+    """
+    if entry.raw is None or entry.decoded:
+        return is_legendary_file(entry.load(), filename)
+
+    matcher = get_matcher()
+    leg = matcher.match(filename)
+    if leg: return True, leg
+    seen = set() # Un fichier multi-espèces répète souvent le même nom
+    try:
+        for poke in pokemon_fields(entry.raw):
+            if poke in seen: continue
+            seen.add(poke)
+            if matcher.match(poke):
+                # Peut-être hors des règles de "spawns" : seul le décodage complet tranche
+                run_report.count("decoded_to_confirm")
+                return is_legendary_file(entry.load(), filename)
+    except ValueError:
+        run_report.count("full_decode_fallbacks")
+        return is_legendary_file(entry.load(), filename)
+    run_report.count("streamed_files")
+    return False, None
+
+def create_blocker_file(pack, relative_path, culprit_name):
     # On aseptise le chemin de sortie
     safe_path = sanitize_filename(relative_path)
-    output_path = os.path.join(os.getcwd(), OUTPUT_PACK_NAME, safe_path)
     
     try:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w") as f:
-            f.write('{"enabled": false, "spawns": []}')
+        pack.write(safe_path, '{"enabled": false, "spawns": []}')
         return True
     except Exception as e:
-        print(f"⚠️ Erreur écriture {output_path}: {e}")
+        print(f"⚠️ Erreur écriture {safe_path}: {e}")
         return False
 
-def process_everything():
+@run_report.stage("03_legendary_blocker.process_everything")
+def process_everything(jobs=1, as_zip=False):
     print(f"--- 🛡️ Génération du {OUTPUT_PACK_NAME} ---")
     print("Stratégie : Scan profond (Contenu + Namespaces) + Aseptisation")
     
-    cwd = os.getcwd()
     files_blocked = 0
     namespaces_found = set()
 
-    # Création du pack.mcmeta
-    os.makedirs(os.path.join(cwd, OUTPUT_PACK_NAME), exist_ok=True)
-    with open(os.path.join(cwd, OUTPUT_PACK_NAME, "pack.mcmeta"), "w") as f:
-        json.dump({"pack": {"pack_format": 15, "description": "Ultimate Legendary Blocker"}}, f, indent=4)
-
-    for folder in SOURCE_DIRS:
-        target_dir = os.path.join(cwd, folder)
-        if not os.path.exists(target_dir): continue
-
-        for root, dirs, files in os.walk(target_dir):
-            for file in files:
-                full_path = os.path.join(root, file)
-                
-                # CAS 1 : Archives (.jar / .zip)
-                if file.lower().endswith((".jar", ".zip")):
-                    try:
-                        with zipfile.ZipFile(full_path, 'r') as z:
-                            for internal in z.namelist():
-                                if "spawn_pool_world" in internal and internal.endswith(".json"):
-                                    with z.open(internal) as f:
-                                        content = f.read()
-                                        is_leg, name = is_legendary_file(content, internal)
-                                        
-                                        if is_leg:
-                                            # On récupère le chemin relatif à partir de "data/"
-                                            parts = internal.split("/")
-                                            if "data" in parts:
-                                                data_idx = parts.index("data")
-                                                relative_path = "/".join(parts[data_idx:])
-                                                
-                                                if create_blocker_file(relative_path, name):
-                                                    files_blocked += 1
-                                                    if len(parts) > data_idx + 1:
-                                                        namespaces_found.add(parts[data_idx+1])
-                    except: pass
-
-                # CAS 2 : Fichiers dézippés
-                elif file.endswith(".json") and "spawn_pool_world" in full_path:
-                    try:
-                        with open(full_path, 'rb') as f:
-                            content = f.read()
-                            is_leg, name = is_legendary_file(content, file)
-                            
-                            if is_leg:
-                                path_parts = full_path.replace("\\", "/").split("/")
-                                if "data" in path_parts:
-                                    data_idx = path_parts.index("data")
-                                    relative_path = "/".join(path_parts[data_idx:])
-                                    
-                                    if create_blocker_file(relative_path, name):
-                                        files_blocked += 1
-                                        if len(path_parts) > data_idx + 1:
-                                            namespaces_found.add(path_parts[data_idx+1])
-                    except: pass
+    scan = scan_sources(SOURCE_DIRS, jobs=jobs)
+
+    with open_pack(OUTPUT_PACK_NAME, as_zip) as pack:
+        # Création du pack.mcmeta
+        pack.write("pack.mcmeta", json.dumps({"pack": {"pack_format": 15, "description": "Ultimate Legendary Blocker"}}, indent=4))
+
+        for entry in scan.spawn_files:
+            # Archives : on teste tout le chemin interne / Dossiers : seulement le nom du fichier
+            is_leg, name = is_legendary_entry(entry, entry.path if entry.archive else entry.filename)
+            if not is_leg: continue
+
+            # On récupère le chemin relatif à partir de "data/"
+            relative_path = entry.data_path()
+            if relative_path and create_blocker_file(pack, relative_path, name):
+                files_blocked += 1
+                parts = relative_path.split("/")
+                if len(parts) > 1:
+                    namespaces_found.add(parts[1])
 
     print("-" * 40)
     print(f"✅ TERMINÉ !")
@@ -143,4 +141,15 @@ def process_everything():
     print("3. Fais /reload")
 
 if __name__ == "__main__":
-    process_everything()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Génère le pack de protection anti-légendaires")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de process pour lire les archives (0 = tous les coeurs)")
+    parser.add_argument("--zip", action="store_true",
+                        help="Écrit le pack directement dans une archive .zip au lieu d'un dossier")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    args = parser.parse_args()
+    if args.profile: run_report.enable()
+
+    process_everything(jobs=args.jobs, as_zip=args.zip)
+    run_report.save()
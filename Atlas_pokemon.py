@@ -1,20 +1,48 @@
 import os
-import zipfile
+import argparse
 import json
 import re
 
+from archive_scanner import scan_sources, read_archive, SPAWN_POOL
+from atlas_formats import WRITERS
+from atlas_index import rule_conditions
+import run_report
+import spawn_odds
+
 # ================= CONFIGURATION =================
 # Les dossiers à scanner
 SOURCE_DIRS = ["mods", "datapacks"]
 # Nom du fichier de sortie
 OUTPUT_FILE = "ATLAS_POKEMON.txt"
+# Index compact lu par le bot Discord
+INDEX_FILE = "ATLAS_INDEX.json"
+# Formats générés à chaque lancement (--formats pour en choisir d'autres) et leurs fichiers
+OUTPUT_FORMATS = ["text", "json", "csv", "html"]
+OUTPUT_FILES = {
+    "text": OUTPUT_FILE,
+    "json": INDEX_FILE,
+    "csv": "ATLAS_POKEMON.csv",
+    "html": "ATLAS_POKEMON.html",
+}
+# Pour développer les tags de biomes dans les recherches du bot (!biome cherry grove)
+BIOME_DB_FILE = "biome_database.json"
 
 # Pour ignorer les dossiers de backup ou les blockers si tu veux
 # (Le script vérifie déjà "enabled": false, donc c'est une sécurité en plus)
 IGNORE_PATHS = ["00_Total_Spawn_Blocker", "03_Legendary_Protection"]
+
+# Seuls ces champs d'une règle servent à l'Atlas : le reste est oublié dès la lecture
+ATLAS_RULE_KEYS = ("context", "spawnablePositionType", "weight", "bucket")
+ATLAS_CONDITION_KEYS = ("biomes", "timeRange", "canSeeSky", "minY", "maxY", "weather")
+
+# Les probabilités sont calculées sur le pack réellement chargé en jeu : la sortie de 02, sinon celle de 01.
+# Les règles des jars (désactivées en jeu par le pack 00) n'y comptent pas.
+ODDS_PACKS = ["03_Final_Cleaned_Spawns", "01_Unified_Spawns"]
 # =================================================
 
+# Nom -> clés compactes de ses règles (un dict sert d'ensemble ordonné : dédoublonnage en O(1))
 pokedex = {}
+encode_key = json.JSONEncoder(separators=(",", ":")).encode
 
 def clean_name(name):
     """Rend le nom du Pokémon joli (ex: 'nidoran_m' -> 'Nidoran M')"""
@@ -81,10 +109,34 @@ def format_condition(rule):
 
     return " | ".join(parts)
 
-def process_file_content(content, filename):
-    try:
-        data = json.load(content)
-    except: return
+def rule_key(rule):
+    """Clé compacte et hashable d'une règle : seulement ce que l'Atlas affiche ou indexe."""
+    cond = rule.get("condition", {})
+    compact = {k: rule[k] for k in ATLAS_RULE_KEYS if k in rule}
+    compact["condition"] = {k: cond[k] for k in ATLAS_CONDITION_KEYS if k in cond}
+    # Les clés sont toujours ajoutées dans le même ordre : pas besoin de sort_keys
+    return encode_key(compact)
+
+def render_species(rules):
+    """Lignes de l'Atlas et conditions (pour le bot) d'une espèce, sans doublons, dans l'ordre de lecture."""
+    locations, seen_locations = [], set()
+    conditions, seen_conditions = [], set()
+    for rule in rules:
+        text = format_condition(rule)
+        if text not in seen_locations:
+            seen_locations.add(text)
+            locations.append(text)
+        cond = rule_conditions(rule)
+        # Même égalité que les dicts (les biomes sont la seule liste)
+        cond_key = tuple((k, tuple(v) if k == "biomes" else v) for k, v in cond.items())
+        if cond_key not in seen_conditions:
+            seen_conditions.add(cond_key)
+            conditions.append(cond)
+    return locations, conditions
+
+def named_rules(data, filename):
+    """(nom affiché, règle) pour chaque règle d'un fichier de spawn actif."""
+    if not isinstance(data, dict): return
 
     # Si le fichier est désactivé (ex: par nos blockers), on l'ignore !
     if data.get("enabled") == False:
@@ -99,73 +151,130 @@ def process_file_content(content, filename):
     for rule in data["spawns"]:
         # Le nom spécifique dans la règle (ex: "Rattata Alolan")
         raw_name = rule.get("pokemon", file_poke_name)
-        nice_name = clean_name(raw_name)
+        yield clean_name(raw_name), rule
 
-        if nice_name not in pokedex:
-            pokedex[nice_name] = []
+def process_file_content(data, filename):
+    for nice_name, rule in named_rules(data, filename):
+        pokedex.setdefault(nice_name, {})[rule_key(rule)] = None
 
-        formatted_location = format_condition(rule)
-        if formatted_location not in pokedex[nice_name]:
-            pokedex[nice_name].append(formatted_location)
-
-def scan_everything():
+@run_report.stage("Atlas_pokemon.scan_everything")
+def scan_everything(jobs=1):
     print("--- 🗺️ Génération de l'Atlas Pokémon ---")
-    cwd = os.getcwd()
-    
-    for folder in SOURCE_DIRS:
-        # On saute les dossiers ignorés
-        if any(ign in folder for ign in IGNORE_PATHS): continue
-        
-        target_dir = os.path.join(cwd, folder)
-        if not os.path.exists(target_dir): continue
-
-        for root, dirs, files in os.walk(target_dir):
-            # On ignore les dossiers de blocker s'ils sont scannés par walk
-            if any(ign in root for ign in IGNORE_PATHS): continue
-
-            for file in files:
-                full_path = os.path.join(root, file)
-                
-                # Archives
-                if file.lower().endswith((".jar", ".zip")):
-                    try:
-                        with zipfile.ZipFile(full_path, 'r') as z:
-                            for internal in z.namelist():
-                                if "spawn_pool_world" in internal and internal.endswith(".json"):
-                                    with z.open(internal) as f:
-                                        process_file_content(f, os.path.basename(internal))
-                    except: pass
-                
-                # Fichiers bruts
-                elif file.endswith(".json") and "spawn_pool_world" in full_path:
-                    try:
-                        with open(full_path, 'r', encoding='utf-8') as f:
-                            process_file_content(f, file)
-                    except: pass
-
-def save_atlas():
-    print(f"--- 📝 Écriture de {OUTPUT_FILE} ---")
-    
-    sorted_names = sorted(pokedex.keys())
-    
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write("==================================================\n")
-        f.write("       ATLAS DE LOCALISATION DES POKÉMONS\n")
-        f.write("==================================================\n\n")
-        
-        for name in sorted_names:
-            locations = pokedex[name]
-            f.write(f"📌 {name}\n")
-            if not locations:
-                f.write("   - ❓ Aucune donnée de spawn trouvée (ou désactivé)\n")
-            else:
-                for loc in locations:
-                    f.write(f"   - {loc}\n")
-            f.write("\n") # Saut de ligne entre chaque Pokémon
-
-    print(f"✅ Atlas généré avec succès ! ({len(sorted_names)} espèces répertoriées)")
-    print(f"👉 Ouvre le fichier '{OUTPUT_FILE}' pour voir où chasser.")
+    scan = scan_sources(SOURCE_DIRS, jobs=jobs)
+
+    for entry in scan.spawn_files:
+        # On ignore les dossiers de blocker s'ils sont dans les sources
+        if any(ign in entry.source for ign in IGNORE_PATHS): continue
+        process_file_content(entry.load(), entry.filename)
+
+def load_biome_db():
+    """biome_database.json de extract_biomes.py (facultatif : sans lui, les tags restent tels quels)"""
+    try:
+        with open(BIOME_DB_FILE, 'r') as f:
+            return json.load(f)
+    except:
+        return {}
+
+def species_rules(name):
+    """Les règles d'une espèce, décodées depuis ses clés compactes (à la demande, jamais toutes à la fois)."""
+    return [json.loads(key) for key in pokedex[name]]
+
+def effective_pack(as_zip=False):
+    """
+    Le premier pack de ODDS_PACKS qui existe, en dossier ou en .zip. Si les deux existent,
+    celui du mode en cours (--zip ou pas) : l'autre est un reste d'un lancement précédent.
+    """
+    for name in ODDS_PACKS:
+        candidates = [f"{name}.zip", name] if as_zip else [name, f"{name}.zip"]
+        for path in candidates:
+            if os.path.exists(path): return path
+    return None
+
+def pack_rules(pack):
+    """{nom: [règles]} d'un pack généré, règle par règle : sans le dédoublonnage de l'affichage."""
+    if os.path.isdir(pack):
+        entries = scan_sources([os.path.abspath(pack)], use_cache=False).spawn_files
+    else:
+        entries = [e for e in read_archive(pack)[3] if e.kind == SPAWN_POOL]
+    rules = {}
+    for entry in entries:
+        for name, rule in named_rules(entry.load(), entry.filename):
+            rules.setdefault(name, []).append(rule)
+    return rules
+
+def species_odds(biome_db=None, as_zip=False):
+    """
+    {nom: meilleures chances}, ou {} sans NumPy ou sans pack généré. Les probabilités dépendent de toutes
+    les règles : elles sont calculées avant d'écrire la première fiche (l'OddsBuilder ne garde que des poids agrégés).
+    """
+    if not spawn_odds.available():
+        print("ℹ️ NumPy n'est pas installé : l'Atlas sera généré sans les probabilités de spawn.")
+        return {}
+    pack = effective_pack(as_zip)
+    if pack is None:
+        print(f"ℹ️ Aucun pack généré ({', '.join(ODDS_PACKS)}) : l'Atlas sera généré sans les probabilités de spawn.")
+        return {}
+    print(f"📂 Probabilités : règles lues dans {pack}.")
+    rules = pack_rules(pack)
+    odds_builder = spawn_odds.OddsBuilder(biome_db)
+    for name in sorted(rules):
+        odds_builder.add(name, rules[name])
+    return compute_odds(odds_builder)
+
+@run_report.stage("Atlas_pokemon.compute_odds")
+def compute_odds(odds_builder):
+    """Probabilités de chaque espèce dans chaque biome (voir spawn_odds.py), puis ses meilleurs biomes."""
+    odds = odds_builder.compute()
+    print(f"📊 Probabilités calculées : {len(odds.species)} espèces x {len(odds.biomes)} biomes.")
+    return odds.best()
+
+@run_report.stage("Atlas_pokemon.write_species")
+def write_species(writers, odds):
+    """Chaque espèce est rendue une fois puis donnée à tous les formats : une seule fiche en mémoire à la fois."""
+    for name in sorted(pokedex.keys()):
+        locations, conditions = render_species(species_rules(name))
+        entry = {"locations": locations, "conditions": conditions}
+        if name in odds: entry["odds"] = odds[name]
+        for writer in writers:
+            writer.add(name, entry)
+
+@run_report.stage("Atlas_pokemon.save_atlas")
+def save_atlas(formats=OUTPUT_FORMATS, as_zip=False):
+    # Lu une fois pour les probabilités et les formats qui développent les tags (index du bot, page web)
+    biome_db = load_biome_db()
+    biome_tags = biome_db.get("tags", {})
+    odds = species_odds(biome_db, as_zip)
+
+    # Un seul scan, un seul rendu par espèce : chaque format n'est qu'un écrivain de plus
+    print(f"--- 📝 Écriture de {', '.join(OUTPUT_FILES[fmt] for fmt in formats)} ---")
+    writers = [WRITERS[fmt](OUTPUT_FILES[fmt], biome_tags) for fmt in formats]
+    write_species(writers, odds)
+    for writer in writers:
+        writer.close()
+
+    print(f"✅ Atlas généré avec succès ! ({len(pokedex)} espèces répertoriées)")
+    if "text" in formats:
+        print(f"👉 Ouvre le fichier '{OUTPUT_FILE}' pour voir où chasser.")
+    if "html" in formats:
+        print(f"🌐 Ou ouvre '{OUTPUT_FILES['html']}' dans un navigateur pour chercher par nom ou par biome.")
 
 if __name__ == "__main__":
-    scan_everything()
-    save_atlas()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Génère l'Atlas des spawns Pokémon")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de process pour lire les archives (0 = tous les coeurs)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    parser.add_argument("--formats", default=",".join(OUTPUT_FORMATS),
+                        help=f"Formats à générer, séparés par des virgules ({', '.join(OUTPUT_FILES)})")
+    parser.add_argument("--zip", action="store_true",
+                        help="Lit les packs générés en .zip (pour les probabilités) plutôt que leurs dossiers")
+    args = parser.parse_args()
+    if args.profile: run_report.enable()
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FILES]
+    if unknown: parser.error(f"format(s) inconnu(s) : {', '.join(unknown)}")
+
+    scan_everything(jobs=args.jobs)
+    save_atlas(formats, as_zip=args.zip)
+    run_report.save()
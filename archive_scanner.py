@@ -0,0 +1,487 @@
+import os
+import json
+import zipfile
+import sqlite3
+import marshal
+import time
+import struct
+import zlib
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import run_report
+
+# ================= CONFIGURATION =================
+SOURCE_DIRS = ["mods", "datapacks"]
+
+# Types d'entrées reconnues pendant le scan
+SPAWN_POOL = "spawn_pool_world"
+BIOME_TAG = "biome_tag"
+PACK_META = "pack_meta"
+
+# Cache des archives déjà analysées (à côté de biome_database.json)
+CACHE_FILE = "scan_cache.sqlite"
+# À incrémenter si le format des entrées en cache change
+CACHE_VERSION = 5
+
+# Une archive dont le répertoire central ne contient aucun de ces noms n'est pas ouverte
+# (la plupart des mods n'ont aucune donnée Cobblemon). Son pack.mcmeta éventuel est ignoré.
+DATA_MARKERS = (b"spawn_pool_world", b"tags/worldgen/biome")
+# =================================================
+
+_scan_results = {}
+
+class ScanEntry:
+    """Un fichier intéressant trouvé dans une archive ou un dossier."""
+    __slots__ = ("kind", "source", "path", "archive", "raw", "body", "_doc", "_loaded", "_twin")
+
+    def __init__(self, kind, source, path, archive, raw, doc=None, loaded=False, body=None):
+        self.kind = kind          # SPAWN_POOL, BIOME_TAG ou PACK_META
+        self.source = source      # Chemin disque (.jar/.zip ou fichier brut)
+        self.path = path          # Chemin interne (archive) ou complet (dossier), avec des "/"
+        self.archive = archive    # True si l'entrée vient d'un .jar/.zip
+        self.raw = raw            # Contenu brut (bytes), None si le JSON vient du cache ou de --jobs (ou pas encore relié à sa copie)
+        self.body = body          # (CRC32, taille) du contenu : deux fichiers identiques ont le même
+        self._doc = doc
+        self._loaded = loaded
+        self._twin = None         # Première entrée au contenu identique : son JSON est réutilisé
+
+    @property
+    def filename(self):
+        return self.path.rsplit("/", 1)[-1]
+
+    def data_path(self):
+        """Chemin relatif à partir de "data/" (ex: data/cobblemon/spawn_pool_world/x.json)"""
+        parts = self.path.split("/")
+        if "data" not in parts: return None
+        return "/".join(parts[parts.index("data"):])
+
+    @property
+    def decoded(self):
+        """True si le JSON est déjà décodé (par une autre étape, par --jobs ou par le cache) : load() est gratuit."""
+        return self._loaded
+
+    def load(self):
+        """Décode le JSON une seule fois (une fois par contenu distinct). Renvoie None si le fichier est illisible."""
+        if not self._loaded:
+            if self._twin is not None:
+                # Document partagé : les étapes le lisent sans jamais le modifier
+                self._doc = self._twin.load()
+                self._loaded = True
+                return self._doc
+            try: self._doc = json.loads(self.raw)
+            except:
+                self._doc = None
+                run_report.count("json_errors")
+            self._loaded = True
+        return self._doc
+
+class ScanResult:
+    """Résultat d'un passage unique sur toutes les sources."""
+
+    def __init__(self):
+        self.entries = []
+        self.errors = []  # (nom du fichier, message) pour les archives illisibles
+        self.archives_scanned = 0
+        self.archives_cached = 0  # Archives inchangées reprises telles quelles du cache
+        self.duplicates = 0       # Entrées au contenu identique à une entrée déjà vue (décodées une seule fois)
+        self.duplicates_not_read = 0  # ... dont le contenu n'a même pas été décompressé
+        self._bodies = {}         # (CRC32, taille) -> première entrée avec ce contenu
+
+    def add(self, entries):
+        """Ajoute des entrées dans l'ordre du scan, en reliant chaque copie à la première entrée identique."""
+        for entry in entries:
+            self.entries.append(entry)
+            if entry.body is None: continue
+            first = self._bodies.setdefault(entry.body, entry)
+            if first is entry: continue
+            self.duplicates += 1
+            if entry.raw is None and not entry._loaded: self.duplicates_not_read += 1
+            if first._loaded:
+                # Même objet en mémoire pour toutes les copies (celles du cache comprises)
+                entry._doc, entry._loaded = first._doc, True
+            elif not entry._loaded:
+                entry._twin = first
+            if first.raw is not None: entry.raw = first.raw
+
+    def of_kind(self, kind):
+        return [e for e in self.entries if e.kind == kind]
+
+    @property
+    def spawn_files(self):
+        return self.of_kind(SPAWN_POOL)
+
+    @property
+    def biome_tags(self):
+        return self.of_kind(BIOME_TAG)
+
+    @property
+    def pack_metas(self):
+        return self.of_kind(PACK_META)
+
+def classify(path):
+    """Détermine le type d'une entrée à partir de son chemin (None = sans intérêt)."""
+    if path.endswith(".json"):
+        if "spawn_pool_world" in path: return SPAWN_POOL
+        if "tags/worldgen/biome" in path: return BIOME_TAG
+    elif path.rsplit("/", 1)[-1] == "pack.mcmeta":
+        return PACK_META
+    return None
+
+def archive_digest(infos):
+    """Empreinte des entrées utiles d'une archive, lue dans le répertoire central (CRC + taille)."""
+    h = hashlib.sha1()
+    for info in infos:
+        h.update(f"{info.filename}:{info.CRC:08x}:{info.file_size}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def read_central_directory(f):
+    """
+    Octets bruts du répertoire central d'un zip (la liste des noms, à la fin du fichier) et
+    décalage du zip dans le fichier, sans construire un ZipInfo par entrée ni rien décompresser.
+    None si le format sort du cas simple (zip64, commentaire piégé...) : il faut alors ouvrir le zip.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    # Fin de répertoire central : 22 octets + un commentaire de 65535 octets au plus
+    tail_size = min(size, 22 + 65535)
+    f.seek(size - tail_size)
+    tail = f.read()
+    pos = tail.rfind(b"PK\x05\x06")
+    if pos < 0 or len(tail) - pos < 22: return None
+    cd_size, cd_offset = struct.unpack("<II", tail[pos + 12:pos + 20])
+    if cd_size == 0xFFFFFFFF or cd_offset == 0xFFFFFFFF: return None
+    # Le répertoire central finit juste avant ce bloc (même si des données précèdent le zip)
+    start = size - tail_size + pos - cd_size
+    if start < 0 or start < cd_offset: return None
+    f.seek(start)
+    directory = f.read(cd_size)
+    if cd_size and not directory.startswith(b"PK\x01\x02"): return None
+    return directory, start - cd_offset
+
+def may_contain_data(directory):
+    """False seulement si l'on est sûr que l'archive n'a ni spawns ni tags de biomes."""
+    return any(marker in directory for marker in DATA_MARKERS)
+
+def parse_central_directory(directory, base):
+    """
+    Les ZipInfo du répertoire central déjà lu, comme zipfile les construirait.
+    None dès qu'une entrée sort de ce qu'on sait lire seul (zip64, chiffrement, compression
+    autre que stored/deflate) : zipfile prend alors le relais.
+    """
+    infos = []
+    pos = 0
+    while pos < len(directory):
+        if directory[pos:pos + 4] != b"PK\x01\x02": return None
+        flags, method, crc, compress_size, file_size, name_len, extra_len, comment_len, offset = \
+            struct.unpack("<8xHH4xIIIHHH8xI", directory[pos:pos + 46])
+        if 0xFFFFFFFF in (compress_size, file_size, offset): return None
+        if flags & 0x1 or method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED): return None
+        name = directory[pos + 46:pos + 46 + name_len].decode("utf-8" if flags & 0x800 else "cp437")
+        info = zipfile.ZipInfo(name)
+        info.flag_bits, info.compress_type, info.CRC = flags, method, crc
+        info.compress_size, info.file_size = compress_size, file_size
+        info.header_offset = base + offset
+        infos.append(info)
+        pos += 46 + name_len + extra_len + comment_len
+    return infos
+
+def read_member(f, info):
+    """Contenu d'une entrée trouvée par parse_central_directory (CRC vérifié, comme zipfile)."""
+    f.seek(info.header_offset)
+    header = f.read(30)
+    if len(header) < 30 or header[:4] != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"En-tête local invalide : {info.filename}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    f.seek(name_len + extra_len, os.SEEK_CUR)
+    data = f.read(info.compress_size)
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(data, -15)
+    if len(data) != info.file_size or zlib.crc32(data) != info.CRC:
+        raise zipfile.BadZipFile(f"CRC invalide : {info.filename}")
+    return data
+
+class ScanCache:
+    """
+    Cache SQLite des archives : chemin + taille + mtime + CRC du répertoire central.
+    On y garde le JSON déjà décodé des entrées (avec ou sans --jobs) : une archive inchangée
+    n'est plus jamais rouverte et ses fichiers ne sont plus jamais redécodés.
+    """
+
+    def __init__(self, db_path=CACHE_FILE):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(CACHE_VERSION):
+            self.conn.execute("DROP TABLE IF EXISTS archives")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS archives ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, entries BLOB)"
+        )
+
+    def get(self, path):
+        """Renvoie (taille, mtime, empreinte, entrées) ou None."""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, digest, entries FROM archives WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None: return None
+        return row[0], row[1], row[2], marshal.loads(row[3])
+
+    def put(self, path, size, mtime_ns, digest, entries):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO archives VALUES (?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, digest, marshal.dumps(entries)),
+        )
+
+    def touch(self, path, size, mtime_ns):
+        self.conn.execute("UPDATE archives SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path))
+
+    def prune(self, seen_paths):
+        """Oublie les archives qui ont disparu des dossiers sources."""
+        for (path,) in self.conn.execute("SELECT path FROM archives").fetchall():
+            if path not in seen_paths:
+                self.conn.execute("DELETE FROM archives WHERE path = ?", (path,))
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+def _entries_from_cache(full_path, cached_entries, result):
+    result.add(ScanEntry(kind, full_path, path, True, None, doc, True, tuple(body) if body else None)
+               for kind, path, doc, body in cached_entries)
+
+def _cache_row(entry):
+    """(type, chemin, document décodé, empreinte) : toujours le document, qu'il vienne de --jobs ou non."""
+    return entry.kind, entry.path, entry.load(), entry.body
+
+def read_archive(full_path, cached_digest=None, decode=False, known_bodies=None):
+    """
+    Ouvre l'archive une seule fois et classe toutes ses entrées en un passage.
+    Renvoie (taille, mtime, empreinte, entrées, stats) ; entrées vaut None si l'empreinte
+    est identique à cached_digest (rien n'est alors décompressé).
+    Avec decode, le JSON est décodé tout de suite (utile dans les process de --jobs).
+    known_bodies : (CRC32, taille) des contenus déjà lus par les archives précédentes. Le répertoire
+    central donne ces deux valeurs sans rien décompresser : une copie d'un fichier déjà lu
+    (les addons embarquent souvent les fichiers de Cobblemon) n'est ni décompressée ni décodée.
+    """
+    st = os.stat(full_path)
+    with open(full_path, "rb") as f:
+        located = read_central_directory(f)
+        if located is not None and not may_contain_data(located[0]):
+            stats = {"entries_inspected": 0, "relevant_entries": 0, "bytes_read": 0, "json_errors": 0, "duplicates_not_read": 0, "prefiltered": True}
+            digest = archive_digest([])
+            return st.st_size, st.st_mtime_ns, digest, None if digest == cached_digest else [], stats
+
+        # Le répertoire central déjà lu pour le préfiltre sert aussi à l'empreinte et à trouver les entrées
+        all_infos = parse_central_directory(*located) if located is not None else None
+        if all_infos is not None:
+            entries, digest, stats = _read_entries(full_path, all_infos, lambda info: read_member(f, info),
+                                                   cached_digest, decode, known_bodies)
+        else:
+            # Cas rare (zip64, chiffrement...) : zipfile relit lui-même le répertoire central
+            with zipfile.ZipFile(f, 'r') as z:
+                entries, digest, stats = _read_entries(full_path, z.infolist(), z.read,
+                                                       cached_digest, decode, known_bodies)
+    return st.st_size, st.st_mtime_ns, digest, entries, stats
+
+def _read_entries(full_path, all_infos, read, cached_digest, decode, known_bodies):
+    """Classe les entrées d'une archive ouverte : (entrées ou None si inchangée, empreinte, stats)."""
+    infos = [i for i in all_infos if classify(i.filename) is not None]
+    stats = {"entries_inspected": len(all_infos), "relevant_entries": len(infos), "bytes_read": 0, "json_errors": 0, "duplicates_not_read": 0}
+    digest = archive_digest(infos)
+    if digest == cached_digest:
+        return None, digest, stats
+
+    entries = []
+    for info in infos:
+        body = (info.CRC, info.file_size)
+        if known_bodies is not None and body in known_bodies:
+            # Copie d'un contenu déjà lu : ScanResult.add la relie à l'original
+            entries.append(ScanEntry(classify(info.filename), full_path, info.filename, True, None, body=body))
+            stats["duplicates_not_read"] += 1
+            continue
+        entry = ScanEntry(classify(info.filename), full_path, info.filename, True, read(info), body=body)
+        stats["bytes_read"] += info.compress_size
+        if decode:
+            # Décodé dans le process --jobs : l'erreur est comptée ici, pas par run_report
+            if entry.load() is None: stats["json_errors"] += 1
+            entry.raw = None  # Inutile de renvoyer les bytes au process principal
+        entries.append(entry)
+    # Seulement une fois l'archive lue en entier : une archive illisible ne sert d'original à personne
+    if known_bodies is not None:
+        known_bodies.update(e.body for e in entries if e.raw is not None or e._loaded)
+    return entries, digest, stats
+
+def _read_archive_job(task):
+    """Tâche exécutée dans un process de --jobs : (résultat, None) ou (None, erreur)."""
+    full_path, cached_digest, decode, known_bodies = task
+    start = time.perf_counter()
+    try:
+        result = read_archive(full_path, cached_digest, decode, known_bodies)
+    except Exception as e:
+        return None, str(e)
+    result[4]["seconds"] = round(time.perf_counter() - start, 4)
+    return result, None
+
+def scan_loose_file(full_path, result):
+    path = full_path.replace("\\", "/")
+    kind = classify(path)
+    if kind is None: return
+    try:
+        with open(full_path, 'rb') as f:
+            raw = f.read()
+    except Exception as e:
+        result.errors.append((os.path.basename(full_path), str(e)))
+        return
+    run_report.count("loose_files")
+    run_report.count("bytes_read", len(raw))
+    # Même empreinte que le répertoire central d'un zip : un datapack copié d'un jar est reconnu
+    result.add([ScanEntry(kind, full_path, path, False, raw, body=(zlib.crc32(raw), len(raw)))])
+
+def list_source_files(source_dirs):
+    """Tous les fichiers des dossiers sources, dans l'ordre de os.walk."""
+    cwd = os.getcwd()
+    files_found = []
+    for folder in source_dirs:
+        target_dir = os.path.join(cwd, folder)
+        if not os.path.exists(target_dir): continue
+
+        for root, dirs, files in os.walk(target_dir):
+            for file in files:
+                files_found.append(os.path.join(root, file))
+    return files_found
+
+def is_archive(path):
+    return path.lower().endswith((".jar", ".zip"))
+
+@run_report.stage("scan")
+def scan_sources(source_dirs=None, use_cache=True, jobs=1):
+    """
+    Parcourt mods/ et datapacks/ une seule fois.
+    Le résultat est gardé en mémoire : les étapes lancées dans le même process le réutilisent.
+    Avec use_cache, les archives inchangées depuis le dernier lancement sont lues depuis CACHE_FILE.
+    Avec jobs > 1 (0 = tous les coeurs), les archives à relire sont réparties sur un pool de process ;
+    les résultats sont réassemblés dans l'ordre du scan, la sortie est donc identique au mode séquentiel.
+    """
+    source_dirs = tuple(source_dirs or SOURCE_DIRS)
+    cwd = os.getcwd()
+    key = (cwd, source_dirs)
+    if key in _scan_results:
+        return _scan_results[key]
+
+    if jobs == 0: jobs = os.cpu_count() or 1
+
+    result = ScanResult()
+    cache = ScanCache(os.path.join(cwd, CACHE_FILE)) if use_cache else None
+    try:
+        files = list_source_files(source_dirs)
+
+        # 1. Archives inchangées (taille + date) : reprises du cache sans être ouvertes
+        cached = {}
+        tasks = []
+        # Contenus déjà lus, partagés d'une archive à l'autre en séquentiel
+        # (avec --jobs, chaque process en reçoit une copie vide : les copies sont alors relues puis partagées)
+        known_bodies = set()
+        for full_path in files:
+            if not is_archive(full_path): continue
+            row = cache.get(os.path.relpath(full_path)) if cache else None
+            try: st = os.stat(full_path)
+            except OSError: st = None
+            cached[full_path] = row
+            if not (row and st and row[0] == st.st_size and row[1] == st.st_mtime_ns):
+                tasks.append((full_path, row[2] if row else None, jobs > 1, known_bodies))
+
+        # 2. Les autres sont relues, en parallèle si demandé
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                outcomes = list(executor.map(_read_archive_job, tasks))
+        else:
+            outcomes = [_read_archive_job(task) for task in tasks]
+        read = {task[0]: outcome for task, outcome in zip(tasks, outcomes)}
+
+        # 3. Assemblage dans l'ordre du parcours
+        for full_path in files:
+            if not is_archive(full_path):
+                scan_loose_file(full_path, result)
+                continue
+
+            row = cached[full_path]
+            relative = os.path.relpath(full_path)
+            if full_path not in read:
+                _entries_from_cache(full_path, row[3], result)
+                result.archives_cached += 1
+                run_report.count("archives_cached")
+                run_report.archive(relative, status="cached", size=row[0], relevant_entries=len(row[3]))
+                continue
+
+            outcome, error = read[full_path]
+            if error is not None:
+                result.errors.append((os.path.basename(full_path), error))
+                run_report.count("archive_errors")
+                run_report.archive(relative, status="error", error=error)
+                continue
+
+            size, mtime_ns, digest, entries, stats = outcome
+            run_report.count("entries_inspected", stats["entries_inspected"])
+            run_report.count("bytes_read", stats["bytes_read"])
+            run_report.count("json_errors", stats["json_errors"])
+            run_report.count("duplicates_not_read", stats["duplicates_not_read"])
+            if entries is None:
+                # Date changée mais contenu utile identique (jar recopié, autre mise à jour...)
+                _entries_from_cache(full_path, row[3], result)
+                cache.touch(relative, size, mtime_ns)
+                result.archives_cached += 1
+                run_report.count("archives_cached")
+                run_report.archive(relative, status="unchanged", size=size, **stats)
+                continue
+
+            result.add(entries)
+            result.archives_scanned += 1
+            status = "skipped" if stats.pop("prefiltered", False) else "read"
+            run_report.count("archives_skipped" if status == "skipped" else "archives_read")
+            if cache:
+                cache.put(relative, size, mtime_ns, digest, [_cache_row(e) for e in entries])
+            # Erreurs JSON connues à ce stade (JSON décodé par --jobs ou pour le cache)
+            stats["json_errors"] = sum(1 for e in entries if e._loaded and e._doc is None)
+            run_report.archive(relative, status=status, size=size, **stats)
+
+        if cache:
+            cache.prune({os.path.relpath(f) for f in files if is_archive(f)})
+    finally:
+        if cache: cache.close()
+
+    if cache:
+        print(f"♻️ Cache : {result.archives_cached} archives inchangées, {result.archives_scanned} relues.")
+    if result.duplicates:
+        print(f"🧬 {result.duplicates} fichiers identiques à un autre (même CRC et taille) : un seul exemplaire décodé"
+              f" et gardé en mémoire, {result.duplicates_not_read} pas même décompressés.")
+    run_report.count("duplicate_bodies", result.duplicates)
+
+    _scan_results[key] = result
+    return result
+
+def load_cache_snapshot(db_path):
+    """
+    Les entrées d'un scan_cache.sqlite (une copie gardée avant une mise à jour, par exemple),
+    sans ouvrir une seule archive. Seules les archives y sont : les fichiers bruts ne sont jamais mis en cache.
+    """
+    if not os.path.isfile(db_path): raise FileNotFoundError("fichier introuvable")
+    conn = sqlite3.connect(db_path)
+    try:
+        try: row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.DatabaseError: row = None
+        if row is None or row[0] != str(CACHE_VERSION):
+            raise ValueError("pas un cache de scan de cette version (relancez un script pour le régénérer)")
+        rows = conn.execute("SELECT path, entries FROM archives ORDER BY path").fetchall()
+    finally:
+        conn.close()
+
+    result = ScanResult()
+    for path, entries in rows:
+        _entries_from_cache(path, marshal.loads(entries), result)
+        result.archives_cached += 1
+    return result
+
+def clear_scan_results():
+    _scan_results.clear()
@@ -0,0 +1,216 @@
+import os
+import csv
+import json
+import html
+
+from atlas_index import build_index, save_index, biome_display_name, format_odds
+from atlas_search import normalize
+
+# ================= CONFIGURATION =================
+# Tampon d'écriture des fichiers générés (1 Mo)
+WRITE_BUFFER = 1 << 20
+# Colonnes du CSV : une ligne par condition de spawn
+CSV_COLUMNS = ["species", "biomes", "time", "weather", "context", "can_see_sky", "min_y", "max_y", "weight", "bucket"]
+HTML_TITLE = "Atlas Pokémon"
+# Meilleures chances affichées par espèce dans le texte et la page web (si NumPy a pu les calculer)
+ODDS_SHOWN = 3
+# =================================================
+
+# Chaque format reçoit les espèces une par une, dans l'ordre alphabétique, de Atlas_pokemon.py :
+# writer.add(nom affiché, {"locations": [...], "conditions": [...]}) plus "odds" (spawn_odds.py)
+# quand NumPy est installé, puis writer.close(). Une espèce n'est rendue qu'une fois pour tous les formats.
+
+def atomic_open(path, newline=None):
+    """Fichier temporaire à renommer avec os.replace : le bot ou le site ne lisent jamais un fichier à moitié écrit."""
+    return open(path + ".tmp", "w", encoding="utf-8", newline=newline, buffering=WRITE_BUFFER)
+
+class TextWriter:
+    """ATLAS_POKEMON.txt, lisible par un humain (et relu par le bot s'il n'a pas l'index), écrit au fil des espèces."""
+
+    def __init__(self, path, biome_tags=None):
+        self.path = path
+        self.file = atomic_open(path)
+        self.file.write("==================================================\n")
+        self.file.write("       ATLAS DE LOCALISATION DES POKÉMONS\n")
+        self.file.write("==================================================\n\n")
+
+    def add(self, name, entry):
+        block = [f"📌 {name}\n"]
+        if not entry["locations"]:
+            block.append("   - ❓ Aucune donnée de spawn trouvée (ou désactivé)\n")
+        else:
+            for loc in entry["locations"]:
+                block.append(f"   - {loc}\n")
+        if entry.get("odds"):
+            # Sans tiret : l'ancien lecteur du texte (parse_atlas_text) n'y voit pas une localisation
+            block.append(f"   📊 Meilleures chances : {' | '.join(format_odds(o) for o in entry['odds'][:ODDS_SHOWN])}\n")
+        block.append("\n") # Saut de ligne entre chaque Pokémon
+        self.file.write("".join(block))
+
+    def close(self):
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+class JsonWriter:
+    """
+    ATLAS_INDEX.json : l'index du bot et de atlas_server.py. Les recherches inverses et la version
+    portent sur toutes les espèces : l'index est construit à la fin, à partir de ce qu'il contiendra.
+    """
+
+    def __init__(self, path, biome_tags=None):
+        self.path = path
+        self.biome_tags = biome_tags
+        self.locations, self.conditions, self.odds = {}, {}, {}
+
+    def add(self, name, entry):
+        self.locations[name] = entry["locations"]
+        self.conditions[name] = entry["conditions"]
+        if "odds" in entry: self.odds[name] = entry["odds"]
+
+    def close(self):
+        save_index(build_index(self.locations, self.conditions, self.biome_tags, self.odds), self.path)
+
+class CsvWriter:
+    """Une ligne par condition de spawn, pour un tableur (les biomes séparés par des ';'), écrite au fil des espèces."""
+
+    def __init__(self, path, biome_tags=None):
+        self.path = path
+        # newline="" : le module csv gère lui-même les fins de ligne
+        self.file = atomic_open(path, newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_COLUMNS)
+
+    def add(self, name, entry):
+        if not entry["conditions"]:
+            self.writer.writerow([name] + [""] * (len(CSV_COLUMNS) - 1))
+        for cond in entry["conditions"]:
+            self.writer.writerow([
+                name,
+                ";".join(cond.get("biomes", [])),
+                cond.get("time", ""),
+                cond.get("weather", ""),
+                cond.get("context", ""),
+                # true / false comme dans les fichiers de spawn, vide si la règle ne dit rien
+                {True: "true", False: "false"}.get(cond.get("canSeeSky"), ""),
+                cond.get("minY", ""),
+                cond.get("maxY", ""),
+                cond.get("weight", ""),
+                cond.get("bucket", ""),
+            ])
+
+    def close(self):
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+HTML_PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 60em; margin: 1em auto; padding: 0 1em; }}
+input, select {{ font-size: 1em; padding: .3em; margin-right: .5em; }}
+article {{ border-bottom: 1px solid #ccc; padding: .5em 0; }}
+h2 {{ margin: 0 0 .3em; font-size: 1.1em; }}
+ul {{ margin: 0; padding-left: 1.2em; }}
+#count {{ color: #666; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p><input id="q" type="search" placeholder="Pokémon..." autofocus>
+<select id="biome"><option value="">Tous les biomes</option></select>
+<span id="count"></span></p>
+<main id="results"></main>
+<script id="atlas-data" type="application/json">{data}</script>
+<script>
+const atlas = JSON.parse(document.getElementById("atlas-data").textContent);
+const q = document.getElementById("q"), biome = document.getElementById("biome");
+const results = document.getElementById("results"), count = document.getElementById("count");
+const LIMIT = 200;
+for (const name of Object.keys(atlas.biomes)) biome.add(new Option(name, name));
+// Même normalisation que le bot : sans accents, ni espaces, ni ponctuation
+const normalize = s => s.normalize("NFKD").toLowerCase().replace(/[^a-z0-9]/g, "");
+function render() {{
+  const norm = normalize(q.value);
+  let ids = biome.value ? atlas.biomes[biome.value] : atlas.species.map((_, i) => i);
+  if (norm) {{
+    // Préfixe d'abord, puis "contient"
+    const starts = ids.filter(i => atlas.species[i].k.startsWith(norm));
+    const inside = ids.filter(i => !atlas.species[i].k.startsWith(norm) && atlas.species[i].k.includes(norm));
+    ids = starts.concat(inside);
+  }}
+  count.textContent = ids.length + " espèce(s)";
+  results.replaceChildren(...ids.slice(0, LIMIT).map(i => {{
+    const s = atlas.species[i], article = document.createElement("article");
+    const h = document.createElement("h2"), ul = document.createElement("ul");
+    h.textContent = "📌 " + s.n;
+    for (const loc of s.l.length ? s.l : ["❓ Aucune donnée de spawn trouvée (ou désactivé)"]) {{
+      const li = document.createElement("li");
+      li.textContent = loc;
+      ul.append(li);
+    }}
+    for (const odds of s.o) {{
+      const li = document.createElement("li");
+      li.textContent = "📊 " + odds;
+      ul.append(li);
+    }}
+    article.append(h, ul);
+    return article;
+  }}));
+}}
+q.addEventListener("input", render);
+biome.addEventListener("change", render);
+render();
+</script>
+</body>
+</html>
+"""
+
+def _script_json(value):
+    # Un "</script>" dans un nom de biome ne doit pas fermer la balise
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+class HtmlWriter:
+    """
+    Page autonome (aucun serveur nécessaire) avec recherche par nom et par biome. Les données de la page
+    sont préparées ici plutôt que dans le navigateur : noms déjà normalisés (même règle que le bot)
+    et biome -> numéros d'espèces, tags développés. Les fiches sont écrites au fil des espèces,
+    seul l'index des biomes attend la fin.
+    """
+
+    def __init__(self, path, biome_tags=None):
+        self.path = path
+        self.biome_tags = biome_tags or {}
+        self.count = 0
+        self.biomes = {}
+        head, self.tail = HTML_PAGE.split("{data}")
+        self.file = atomic_open(path)
+        self.file.write(head.format(title=html.escape(HTML_TITLE)) + '{"species":[')
+
+    def add(self, name, entry):
+        number = self.count
+        self.count += 1
+        species = {"n": name, "k": normalize(name), "l": entry["locations"],
+                   "o": [format_odds(o) for o in entry.get("odds", [])[:ODDS_SHOWN]]}
+        self.file.write(("," if number else "") + _script_json(species))
+        for cond in entry["conditions"]:
+            for biome in cond.get("biomes", []):
+                names = [biome] + (self.biome_tags.get(biome[1:], []) if biome.startswith("#") else [])
+                for biome_name in names:
+                    ids = self.biomes.setdefault(biome_display_name(biome_name), [])
+                    if not ids or ids[-1] != number: ids.append(number)
+
+    def close(self):
+        self.file.write('],"biomes":' + _script_json(dict(sorted(self.biomes.items()))) + "}" + self.tail.format())
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+# Format -> écrivain, tous créés comme Writer(fichier, tags de biomes)
+WRITERS = {
+    "text": TextWriter,
+    "json": JsonWriter,
+    "csv": CsvWriter,
+    "html": HtmlWriter,
+}
@@ -0,0 +1,335 @@
+import os
+import json
+import hashlib
+
+from atlas_search import SpeciesSearch, normalize
+
+# ================= CONFIGURATION =================
+ATLAS_FILE = "ATLAS_POKEMON.txt"
+# Version structurée de l'Atlas, écrite par Atlas_pokemon.py pour le bot
+INDEX_FILE = "ATLAS_INDEX.json"
+INDEX_FORMAT = 2
+
+NO_DATA_TEXT = "❓ Aucune donnée de spawn précise (peut-être désactivé ou event)."
+
+# Recherche par altitude : les règles sont rangées par tranches de Y
+Y_BAND = 16
+WORLD_MIN_Y = -64
+WORLD_MAX_Y = 320
+# Clé des règles qui ne précisent pas la condition (biome, heure, météo...) : valables partout
+ANY = "*"
+
+# Moments du jeu, et ce que couvre chaque valeur de timeRange (une valeur inconnue couvre tout).
+# Même table pour les recherches (!night, !biome ... nuit) et les probabilités (spawn_odds.py)
+TIMES = ("dawn", "day", "dusk", "night")
+TIME_RANGES = {"dawn": ("dawn",), "day": ("day",), "dusk": ("dusk",), "night": ("night",),
+               "morning": ("day",), "noon": ("day",), "afternoon": ("day",), "midnight": ("night",),
+               "predawn": ("night",), "twilight": ("dawn", "dusk")}
+
+# Probabilités de spawn (spawn_odds.py, si NumPy est installé) : combien sur chaque fiche
+ODDS_IN_DESCRIPTION = 3
+TIME_LABELS = {"dawn": "Aube", "day": "Jour", "dusk": "Crépuscule", "night": "Nuit"}
+WEATHER_LABELS = {"clear": "Ciel dégagé", "rain": "Pluie", "thunder": "Orage"}
+CONTEXT_LABELS = {"grounded": "Au sol", "submerged": "Dans l'eau", "surface": "En surface", "air": "En vol",
+                  "seafloor": "Fond marin", "lavafloor": "Dans la lave", "fishing": "Pêche"}
+# =================================================
+
+def format_probability(probability):
+    """0.125 -> '12.5%', 0.00042 -> '0.042%'"""
+    percent = probability * 100
+    return f"{percent:.1f}%" if percent >= 1 else f"{percent:.2g}%"
+
+def format_odds(odds):
+    """Une case de spawn_odds : '12.5% en Cherry Grove (Nuit, Pluie, Au sol)'"""
+    details = []
+    if odds.get("time"): details.append(TIME_LABELS.get(odds["time"], odds["time"]))
+    if odds.get("weather"): details.append(WEATHER_LABELS.get(odds["weather"], odds["weather"]))
+    if odds.get("context"): details.append(CONTEXT_LABELS.get(odds["context"], odds["context"]))
+    text = f"{format_probability(odds['probability'])} en {odds['biome']}"
+    return text + (f" ({', '.join(details)})" if details else "")
+
+def render_description(locations, odds=None):
+    """Texte de l'embed Discord : le biome en gras, puis une ligne par condition (et les meilleures chances)."""
+    desc_text = ""
+    for info in locations:
+        parts = info.split("|")
+        formatted_line = ""
+        for part in parts:
+            if "Biomes" in part:
+                formatted_line += f"**{part.strip()}**\n"
+            else:
+                formatted_line += f"└ {part.strip()}\n"
+        desc_text += formatted_line + "\n"
+
+    if not desc_text:
+        desc_text = NO_DATA_TEXT
+    if odds:
+        desc_text += "**📊 Meilleures chances**\n"
+        desc_text += "".join(f"└ {format_odds(o)}\n" for o in odds[:ODDS_IN_DESCRIPTION])
+    return desc_text
+
+def rule_conditions(rule):
+    """
+    Conditions d'une règle de spawn utiles aux recherches inverses (!biome, !night, !where),
+    plus ce qui la distingue encore dans un tableur (vue du ciel, poids, bucket).
+    """
+    cond = rule.get("condition", {})
+    if not isinstance(cond, dict): cond = {}
+    # Même correction que le pipeline : un biome vide veut dire Overworld
+    biomes = sorted({b if b and b.strip() else "#cobblemon:is_overworld" for b in cond.get("biomes", [])})
+    summary = {
+        "biomes": biomes,
+        "time": cond.get("timeRange"),
+        "weather": cond.get("weather"),
+        "context": rule.get("context", rule.get("spawnablePositionType")),
+        "canSeeSky": cond.get("canSeeSky"),
+        "minY": cond.get("minY"),
+        "maxY": cond.get("maxY"),
+        "weight": rule.get("weight"),
+        "bucket": rule.get("bucket"),
+    }
+    return {k: v for k, v in summary.items() if v not in (None, [])}
+
+def biome_display_name(biome):
+    """'minecraft:cherry_grove' -> 'Cherry Grove', '#cobblemon:is_overworld' -> 'Overworld'"""
+    path = biome.split(":")[-1].replace("#", "")
+    if path.startswith("is_"): path = path[3:]
+    return path.replace("_", " ").replace("/", " ").title()
+
+def y_bands(rule):
+    """Tranches de Y couvertes par une règle qui précise minY et/ou maxY."""
+    low = max(rule.get("minY", WORLD_MIN_Y), WORLD_MIN_Y)
+    high = min(rule.get("maxY", WORLD_MAX_Y), WORLD_MAX_Y)
+    band = (int(low) - WORLD_MIN_Y) // Y_BAND
+    while band * Y_BAND + WORLD_MIN_Y <= high:
+        yield str(band)
+        band += 1
+
+def build_lookup(rules, biome_tags=None):
+    """
+    Index inversés condition -> numéros de règles, pour répondre à "qu'est-ce qui spawn en
+    Cherry Grove la nuit ?" par des intersections d'ensembles au lieu de relire tout l'Atlas.
+    Les tags de biomes (#minecraft:is_forest) sont développés avec biome_database.json :
+    une règle sur un tag apparaît aussi sous chacun de ses biomes.
+    """
+    biome_tags = biome_tags or {}
+    lookup = {"biome": {}, "time": {}, "weather": {}, "context": {}, "y": {}}
+    biome_names = {}
+
+    def add(table, key, rule_id):
+        postings = lookup[table].setdefault(key, [])
+        if not postings or postings[-1] != rule_id: postings.append(rule_id)
+
+    # Biome -> [(clé, nom affiché)] de lui-même et, pour un tag, de ses biomes : calculé une fois par biome
+    expanded = {}
+
+    def biome_keys(biome):
+        keys = expanded.get(biome)
+        if keys is None:
+            names = [biome]
+            if biome.startswith("#"): names += biome_tags.get(biome[1:], [])
+            keys = []
+            for name in names:
+                display = biome_display_name(name)
+                key = normalize(display)
+                if key: keys.append((key, display))
+            expanded[biome] = keys
+        return keys
+
+    for rule_id, rule in enumerate(rules):
+        if not rule.get("biomes"): add("biome", ANY, rule_id)
+        for biome in rule.get("biomes", []):
+            for key, display in biome_keys(biome):
+                biome_names.setdefault(key, display)
+                add("biome", key, rule_id)
+
+        # midnight, twilight... sont rangés sous les moments qu'ils couvrent (twilight : aube et crépuscule)
+        time = rule.get("time")
+        for key in TIME_RANGES.get(str(time).lower(), (ANY,)) if time is not None else (ANY,):
+            add("time", key, rule_id)
+        for table in ("weather", "context"):
+            value = rule.get(table)
+            add(table, str(value).lower() if value is not None else ANY, rule_id)
+
+        if "minY" in rule or "maxY" in rule:
+            for band in y_bands(rule): add("y", band, rule_id)
+        else:
+            add("y", ANY, rule_id)
+
+    return lookup, biome_names
+
+def build_index(pokedex, conditions=None, biome_tags=None, odds=None):
+    """
+    Index du bot à partir de {nom affiché: [lignes de localisation]}.
+    Les clés sont en minuscules (ce que tape le joueur), la description est déjà rendue.
+    'conditions' ({nom affiché: [rule_conditions()]}) alimente les recherches inverses.
+    'odds' ({nom affiché: [meilleures chances]}, de spawn_odds.py) est facultatif.
+    """
+    odds = odds or {}
+    species = {}
+    for name in sorted(pokedex):
+        key = name.lower()
+        species[key] = {
+            "name": key.title(),
+            "locations": list(pokedex[name]),
+            "description": render_description(pokedex[name], odds.get(name)),
+        }
+        if name in odds: species[key]["odds"] = odds[name]
+
+    rules = []
+    conditions = conditions or {}
+    for name in sorted(conditions):
+        for rule in conditions[name]:
+            rules.append(dict(rule, species=name.lower()))
+    lookup, biome_names = build_lookup(rules, biome_tags)
+
+    payload = json.dumps([species, rules], sort_keys=True, ensure_ascii=False)
+    return {
+        "format": INDEX_FORMAT,
+        # Change dès que le contenu change : sert de clé aux caches
+        "version": hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16],
+        "species": species,
+        "rules": rules,
+        "lookup": lookup,
+        "biome_names": biome_names,
+    }
+
+def save_index(index, index_file=INDEX_FILE):
+    # Écrit à côté puis remplace : le bot qui surveille le fichier ne lit jamais un index à moitié écrit
+    tmp_file = index_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        # json.dumps (encodeur C) puis une seule écriture : json.dump encode morceau par morceau en Python
+        f.write(json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+    os.replace(tmp_file, index_file)
+
+def files_stamp(index_file=INDEX_FILE, atlas_file=ATLAS_FILE):
+    """Dates de modification des fichiers de l'Atlas : si elles changent, il faut recharger."""
+    stamp = []
+    for path in (index_file, atlas_file):
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def parse_atlas_text(atlas_file=ATLAS_FILE):
+    """Relit un ATLAS_POKEMON.txt (ancien format) : {nom: [lignes de localisation]}."""
+    pokedex = {}
+    current_poke = None
+    with open(atlas_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("📌"):
+                current_poke = line.replace("📌", "").strip()
+                pokedex[current_poke] = []
+            elif line.startswith("-") and current_poke:
+                clean_line = line.replace("- ", "").strip()
+                pokedex[current_poke].append(clean_line)
+    return pokedex
+
+class AtlasIndex:
+    """Atlas chargé en mémoire, prêt à être interrogé (lecture seule)."""
+
+    def __init__(self, data):
+        self.version = data.get("version", "")
+        self.species = data.get("species", {})
+        self.rules = data.get("rules", [])
+        self.biome_names = data.get("biome_names", {})
+        # Listes JSON -> sets une fois pour toutes : une recherche = quelques intersections
+        self.lookup = {table: {key: set(ids) for key, ids in postings.items()}
+                       for table, postings in data.get("lookup", {}).items()}
+        self._search = None
+        self._biome_search = None
+
+    def __len__(self):
+        return len(self.species)
+
+    def __contains__(self, key):
+        return key in self.species
+
+    def get(self, key):
+        return self.species.get(key)
+
+    def keys(self):
+        return self.species.keys()
+
+    def warm(self):
+        """Construit tout de suite les index de recherche (à appeler hors de la boucle du bot)."""
+        self._searcher()
+        self._biome_searcher()
+        return self
+
+    def _searcher(self):
+        # Construit au premier !find (quelques ms pour 2000 espèces)
+        if self._search is None:
+            self._search = SpeciesSearch(self.species)
+        return self._search
+
+    def search(self, query):
+        """Recherche exacte / préfixe / contient / approchée (voir atlas_search.py)."""
+        return self._searcher().search(query)
+
+    def suggestions(self, query):
+        return self._searcher().suggestions(query)
+
+    def has_lookup(self):
+        """False pour un index reconstruit depuis l'ancien Atlas texte (pas de règles)."""
+        return bool(self.rules)
+
+    def _biome_searcher(self):
+        if self._biome_search is None:
+            self._biome_search = SpeciesSearch(self.biome_names)
+        return self._biome_search
+
+    def resolve_biome(self, query):
+        """Clé du biome demandé (fautes et préfixes tolérés), ou None."""
+        matches = self._biome_searcher().search(query).matches
+        return normalize(matches[0]) if matches else None
+
+    def _matching(self, table, key, strict):
+        postings = self.lookup.get(table, {})
+        ids = postings.get(key, set())
+        if strict: return ids
+        return ids | postings.get(ANY, set())
+
+    def find_species(self, biome=None, time=None, weather=None, context=None, y=None, strict=False):
+        """
+        Espèces dont au moins UNE règle remplit toutes les conditions demandées.
+        Une règle qui ne précise pas une condition la remplit (pas d'heure = jour et nuit),
+        sauf avec strict=True : "!night" seul ne liste que les spawns réservés à la nuit.
+        """
+        selected = None
+        wanted = [("biome", biome), ("time", time), ("weather", weather), ("context", context)]
+        for table, key in wanted:
+            if key is None: continue
+            ids = self._matching(table, key, strict)
+            selected = ids if selected is None else selected & ids
+            if not selected: return []
+
+        if y is not None:
+            band = str((int(y) - WORLD_MIN_Y) // Y_BAND)
+            ids = {i for i in self.lookup.get("y", {}).get(band, ())
+                   if self.rules[i].get("minY", WORLD_MIN_Y) <= y <= self.rules[i].get("maxY", WORLD_MAX_Y)}
+            if not strict: ids |= self.lookup.get("y", {}).get(ANY, set())
+            selected = ids if selected is None else selected & ids
+
+        if selected is None: return []
+        return sorted({self.rules[i]["species"] for i in selected})
+
+    @classmethod
+    def load(cls, index_file=INDEX_FILE, atlas_file=ATLAS_FILE):
+        """
+        Charge l'index structuré. S'il n'existe pas encore (Atlas généré par une ancienne
+        version), on le reconstruit depuis le texte de l'Atlas.
+        """
+        try:
+            with open(index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == INDEX_FORMAT:
+                return cls(data)
+            print(f"⚠️ {index_file} est périmé (format {data.get('format')}, attendu {INDEX_FORMAT}) : lecture de {atlas_file} à la place,"
+                  f" sans recherches inverses ni probabilités. Relance Atlas_pokemon.py pour le régénérer.")
+        except FileNotFoundError:
+            print(f"⚠️ {index_file} introuvable : lecture de {atlas_file} à la place,"
+                  f" sans recherches inverses ni probabilités. Relance Atlas_pokemon.py pour le générer.")
+        return cls(build_index(parse_atlas_text(atlas_file)))
@@ -0,0 +1,155 @@
+import re
+import bisect
+import unicodedata
+
+# ================= CONFIGURATION =================
+# Au-delà, le bot propose des suggestions au lieu d'afficher les fiches
+MAX_RESULTS = 5
+MAX_SUGGESTIONS = 10
+# =================================================
+
+def normalize(text):
+    """'Nidoran-M', 'nidoran m' et 'Nidorán_M' donnent tous 'nidoranm'."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return re.sub(r"[^a-z0-9]", "", text)
+
+def max_typos(query):
+    """Nombre de fautes tolérées selon la longueur de la recherche."""
+    if len(query) <= 3: return 0
+    if len(query) <= 5: return 1
+    return 2
+
+def bounded_levenshtein(a, b, limit):
+    """Distance d'édition, ou limit + 1 dès qu'on sait qu'elle dépasse limit."""
+    # Début et fin communs ne coûtent rien : "pikachuu" / "pikachu" se réduit à "u" / ""
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]: start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]: end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if abs(len(a) - len(b)) > limit: return limit + 1
+    if not a or not b: return max(len(a), len(b))
+
+    # Seule une bande de largeur 2 * limit autour de la diagonale peut rester sous la limite
+    too_far = limit + 1
+    previous = [j if j <= limit else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [too_far] * (len(b) + 1)
+        if i <= limit: current[0] = i
+        ca = a[i - 1]
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != b[j - 1]))
+        if min(current[low - 1:high + 1]) > limit: return too_far
+        previous = current
+    return min(previous[-1], too_far)
+
+def bigrams_of(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class SearchResult:
+    """Résultat d'une recherche : 'kind' vaut exact, prefix, contains, fuzzy ou none."""
+    __slots__ = ("kind", "matches", "total")
+
+    def __init__(self, kind, matches, total=None):
+        self.kind = kind
+        self.matches = matches
+        self.total = len(matches) if total is None else total
+
+class SpeciesSearch:
+    """
+    Index de recherche construit une fois au chargement de l'Atlas :
+    - noms normalisés triés (recherche par préfixe avec bisect),
+    - bigrammes -> noms (recherche "contient" sans parcourir toute la liste),
+    - ces mêmes bigrammes pour les fautes de frappe ("pikachuu", "charizrd") : une faute
+      détruit au plus 2 bigrammes, on ne calcule la distance que pour les noms qui
+      partagent assez de bigrammes avec la recherche.
+    """
+
+    def __init__(self, keys):
+        self.by_norm = {}
+        for key in keys:
+            self.by_norm.setdefault(normalize(key), []).append(key)
+        self.sorted_norms = sorted(self.by_norm)
+
+        self.bigrams = {}
+        for norm in self.sorted_norms:
+            for gram in bigrams_of(norm):
+                self.bigrams.setdefault(gram, set()).add(norm)
+
+    def _keys(self, norms):
+        keys = []
+        for norm in norms: keys.extend(self.by_norm[norm])
+        return keys
+
+    def prefix(self, norm):
+        start = bisect.bisect_left(self.sorted_norms, norm)
+        # Les noms normalisés sont en [a-z0-9] : "{" vient juste après "z"
+        end = bisect.bisect_left(self.sorted_norms, norm + "{")
+        return self.sorted_norms[start:end]
+
+    def contains(self, norm):
+        if len(norm) < 2:
+            return [n for n in self.sorted_norms if norm in n]
+        candidates = None
+        for i in range(len(norm) - 1):
+            postings = self.bigrams.get(norm[i:i + 2])
+            if not postings: return []
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates: return []
+        return [n for n in candidates if norm in n]
+
+    def close_to(self, norm, limit):
+        """[(distance, nom)] des noms à au plus 'limit' fautes de 'norm', les plus proches d'abord."""
+        grams = bigrams_of(norm)
+        needed = len(grams) - 2 * limit
+        if len(norm) - 1 > 2 * limit:
+            # Même si les bigrammes se répètent ("zzzzzz"), il en reste au moins un en commun
+            needed = max(needed, 1)
+        if needed > 0:
+            shared = {}
+            for gram in grams:
+                for candidate in self.bigrams.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            candidates = [c for c, count in shared.items() if count >= needed]
+        else:
+            # Recherche trop courte pour filtrer : on teste tout (rare, max_typos les évite)
+            candidates = self.sorted_norms
+
+        found = []
+        for candidate in candidates:
+            if abs(len(candidate) - len(norm)) > limit: continue
+            distance = bounded_levenshtein(norm, candidate, limit)
+            if distance <= limit: found.append((distance, candidate))
+        found.sort(key=lambda item: (item[0], len(item[1]), item[1]))
+        return found
+
+    def search(self, query):
+        """Résultats classés : exact, puis préfixe, puis contient, puis approché."""
+        norm = normalize(query)
+        if not norm: return SearchResult("none", [])
+
+        if norm in self.by_norm:
+            return SearchResult("exact", self._keys([norm]))
+
+        prefixed = self.prefix(norm)
+        inside = [n for n in self.contains(norm) if not n.startswith(norm)]
+        if prefixed or inside:
+            # Les noms les plus courts d'abord : "eevee" avant "eevee alpha"
+            ranked = sorted(prefixed, key=lambda n: (len(n), n)) + sorted(inside, key=lambda n: (len(n), n))
+            return SearchResult("prefix" if prefixed else "contains", self._keys(ranked))
+
+        limit = max_typos(norm)
+        if limit:
+            close = self.close_to(norm, limit)
+            if close:
+                best = close[0][0]
+                return SearchResult("fuzzy", self._keys([n for d, n in close if d == best]))
+        return SearchResult("none", [])
+
+    def suggestions(self, query):
+        """Quelques noms proches, pour un "Vouliez-vous dire ?"."""
+        norm = normalize(query)
+        limit = max(1, max_typos(norm))
+        close = self.close_to(norm, limit)
+        return self._keys([n for d, n in close])[:MAX_SUGGESTIONS]
@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import gzip
+import json
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from atlas_index import AtlasIndex, files_stamp
+
+# ================= CONFIGURATION =================
+HOST = "127.0.0.1"
+PORT = 8080
+ATLAS_FILE = "ATLAS_POKEMON.txt"
+INDEX_FILE = "ATLAS_INDEX.json"
+
+# Comme le bot : l'Atlas régénéré est rechargé sans redémarrer le serveur
+RELOAD_INTERVAL = 30
+# Une connexion keep-alive inactive est fermée au bout de X secondes
+KEEP_ALIVE_TIMEOUT = 15
+# En dessous, compresser coûte plus que ça ne rapporte
+GZIP_MIN_SIZE = 512
+# Réponses déjà encodées (JSON + gzip) gardées en mémoire
+RESPONSE_CACHE_SIZE = 1024
+MAX_HEADER_SIZE = 16 * 1024
+# =================================================
+
+atlas = None
+atlas_stamp = None
+response_cache = OrderedDict() # (version, cible, gzip) -> (statut, corps, encodage)
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+def load_atlas():
+    global atlas, atlas_stamp
+    stamp = files_stamp(INDEX_FILE, ATLAS_FILE)
+    atlas = AtlasIndex.load(INDEX_FILE, ATLAS_FILE).warm()
+    atlas_stamp = stamp
+    print(f"✅ Atlas chargé : {len(atlas)} Pokémons (version {atlas.version}).")
+
+async def watch_atlas():
+    """Recharge l'Atlas dans un thread quand il change, puis le remplace d'un coup"""
+    global atlas, atlas_stamp
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        stamp = files_stamp(INDEX_FILE, ATLAS_FILE)
+        if stamp == atlas_stamp: continue
+        try:
+            new_atlas = await asyncio.to_thread(lambda: AtlasIndex.load(INDEX_FILE, ATLAS_FILE).warm())
+        except Exception as e:
+            print(f"⚠️ Rechargement de l'Atlas impossible : {e}")
+            continue
+        atlas, atlas_stamp = new_atlas, stamp
+        print(f"🔄 Atlas rechargé : {len(atlas)} Pokémons (version {atlas.version}).")
+
+# --- ROUTES ---
+# Chaque route reçoit (index, morceau de chemin, paramètres) et renvoie (statut, objet JSON)
+
+def species_payload(index, key):
+    entry = index.get(key)
+    return {"key": key, "name": entry["name"], "locations": entry["locations"], "odds": entry.get("odds", [])}
+
+def route_species(index, name, params):
+    """/species/<nom> : fiche exacte, ou le plus proche si une seule espèce correspond"""
+    result = index.search(name)
+    if len(result.matches) == 1:
+        return 200, dict(species_payload(index, result.matches[0]), match=result.kind)
+    return 404, {"error": "not found", "suggestions": (result.matches or index.suggestions(name))[:10]}
+
+def route_search(index, rest, params):
+    """/search?q=pika : noms classés (exact, préfixe, contient, approché)"""
+    query = params.get("q", "")
+    result = index.search(query)
+    return 200, {"query": query, "kind": result.kind, "total": result.total,
+                 "matches": [index.get(k)["name"] for k in result.matches]}
+
+def route_lookup(index, rest, params):
+    """/lookup?biome=cherry+grove&time=night : espèces qui remplissent toutes les conditions"""
+    filters = {k: params[k].lower() for k in ("time", "weather", "context") if params.get(k)}
+    biome_key = None
+    if params.get("biome"):
+        biome_key = index.resolve_biome(params["biome"])
+        if biome_key is None: return 404, {"error": "unknown biome", "biome": params["biome"]}
+    y = None
+    if params.get("y"):
+        try:
+            y = int(params["y"])
+        except ValueError:
+            return 400, {"error": "y must be an integer"}
+    if biome_key is None and not filters and y is None:
+        return 400, {"error": "give at least one of biome, time, weather, context, y"}
+    keys = index.find_species(biome=biome_key, y=y, strict=biome_key is None, **filters)
+    return 200, {"biome": index.biome_names.get(biome_key), "filters": filters, "y": y,
+                 "total": len(keys), "species": [index.get(k)["name"] if k in index else k for k in keys]}
+
+def route_biomes(index, rest, params):
+    return 200, {"biomes": sorted(index.biome_names.values())}
+
+def route_version(index, rest, params):
+    return 200, {"version": index.version, "species": len(index)}
+
+ROUTES = {
+    "species": route_species,
+    "search": route_search,
+    "lookup": route_lookup,
+    "biomes": route_biomes,
+    "version": route_version,
+}
+
+def render(index, target, use_gzip):
+    """Corps de la réponse, mis en cache par version de l'Atlas : une URL populaire n'est encodée qu'une fois."""
+    cache_key = (index.version, target, use_gzip)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        response_cache.move_to_end(cache_key)
+        return cached
+
+    url = urlsplit(target)
+    params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    parts = unquote(url.path).strip("/").split("/", 1)
+    route = ROUTES.get(parts[0])
+    if route is None:
+        status, payload = 404, {"error": "unknown endpoint", "endpoints": sorted(ROUTES)}
+    else:
+        status, payload = route(index, parts[1] if len(parts) > 1 else "", params)
+
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    encoding = None
+    if use_gzip and len(body) >= GZIP_MIN_SIZE:
+        # mtime=0 : même contenu, mêmes octets
+        body, encoding = gzip.compress(body, mtime=0), "gzip"
+
+    cached = (status, body, encoding)
+    response_cache[cache_key] = cached
+    if len(response_cache) > RESPONSE_CACHE_SIZE:
+        response_cache.popitem(last=False)
+    return cached
+
+# --- HTTP ---
+
+def build_response(status, body=b"", headers=None, keep_alive=True):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+def handle_request(head):
+    """Requête brute (ligne + en-têtes) -> (octets de la réponse, garder la connexion ?)"""
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        return build_response(400, keep_alive=False), False
+
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    # Le serveur ne lit jamais de corps : s'il en annonce un, ses octets seraient lus comme la requête
+    # suivante sur la même connexion. On répond puis on ferme.
+    if "content-length" in headers or "transfer-encoding" in headers: keep_alive = False
+
+    if method not in ("GET", "HEAD"):
+        return build_response(405, headers={"Allow": "GET, HEAD"}, keep_alive=False), False
+
+    # Copie locale : un rechargement pendant la requête ne change rien
+    index = atlas
+    # ETag faible : le contenu ne dépend que de l'URL et de la version de l'Atlas (gzip ou non)
+    etag = f'W/"{index.version}"'
+    common = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    use_gzip = "gzip" in headers.get("accept-encoding", "")
+    try:
+        status, body, encoding = render(index, target, use_gzip)
+    except Exception as e:
+        # Une route qui plante ne doit pas couper la connexion sans réponse
+        print(f"⚠️ Erreur sur {target} : {e!r}")
+        body = b"" if method == "HEAD" else json.dumps({"error": "internal error"}).encode("utf-8")
+        return build_response(500, body, {"Content-Type": "application/json; charset=utf-8"}, keep_alive=False), False
+    # Comparaison faible (RFC 9110) : W/"v" et "v" désignent la même version
+    client_tags = {tag.strip().removeprefix("W/") for tag in headers.get("if-none-match", "").split(",")}
+    if status == 200 and (f'"{index.version}"' in client_tags or "*" in client_tags):
+        return build_response(304, headers=common, keep_alive=keep_alive), keep_alive
+
+    response_headers = dict(common, **{"Content-Type": "application/json; charset=utf-8"})
+    if encoding: response_headers["Content-Encoding"] = encoding
+    response = build_response(status, body, response_headers, keep_alive)
+    if method == "HEAD":
+        # Mêmes en-têtes (Content-Length compris), sans le corps
+        response = response[:len(response) - len(body)]
+    return response, keep_alive
+
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            response, keep_alive = handle_request(head[:-4])
+            writer.write(response)
+            await writer.drain()
+            if not keep_alive: break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def serve(host, port):
+    server = await asyncio.start_server(handle_connection, host, port, limit=MAX_HEADER_SIZE)
+    # Référence gardée : asyncio ne garde qu'une référence faible vers ses tâches
+    watcher = asyncio.create_task(watch_atlas())
+    print(f"🌐 API de l'Atlas sur http://{host}:{port}/ (species, search, lookup, biomes, version)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur HTTP/JSON de l'Atlas (mêmes recherches que le bot)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    load_atlas()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 Serveur arrêté.")
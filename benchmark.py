@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import tempfile
+import tracemalloc
+
+from archive_scanner import scan_sources, clear_scan_results, SOURCE_DIRS, CACHE_FILE
+from atlas_index import AtlasIndex
+from run_pipeline import load_script
+import spawn_odds
+import spawn_diff
+
+# ================= CONFIGURATION =================
+# Taille du faux modpack par défaut (modifiable en ligne de commande)
+DEFAULT_JARS = 40
+DEFAULT_SPAWN_FILES = 25   # fichiers de spawn par jar
+DEFAULT_RULES = 3          # règles par fichier (= par espèce)
+DEFAULT_TAG_DEPTH = 6      # profondeur des tags de biomes qui s'incluent les uns les autres
+DEFAULT_FILLER = 200       # fichiers inutiles (.class, textures) par jar, comme un vrai mod
+DEFAULT_PLAIN_JARS = 100   # mods sans aucune donnée Cobblemon (la majorité d'un vrai modpack)
+DEFAULT_ADDON_JARS = 20    # addons qui embarquent une copie à l'identique des spawns du premier jar
+DEFAULT_SEARCHES = 2000    # recherches !find simulées
+# =================================================
+
+SYLLABLES = ["ka", "zu", "mi", "ro", "pi", "chu", "bul", "sa", "ur", "ee", "vee", "gen", "gar", "dra",
+             "ni", "to", "lu", "gia", "mew", "on", "ri", "ta", "so", "ly", "nx", "char", "ma", "der"]
+TIMES = ["day", "night", "dusk", "dawn"]
+WEATHERS = ["rain", "thunder", "clear"]
+CONTEXTS = ["grounded", "submerged", "air"]
+
+# --- GÉNÉRATEUR DE MODPACK ---
+
+def species_names(rng, count):
+    """Noms prononçables et tous différents (des noms comme poke00012 faussent la recherche approchée)"""
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(names)
+
+def make_rule(rng, species, index, biomes):
+    rule = {
+        "id": f"{species}-{index}",
+        "pokemon": species,
+        "presets": ["natural"],
+        "type": "pokemon",
+        "context": rng.choice(CONTEXTS),
+        "bucket": rng.choice(["common", "uncommon", "rare", "ultra-rare"]),
+        "level": f"{rng.randint(1, 30)}-{rng.randint(31, 70)}",
+        "weight": rng.choice([0.1, 0.5, 1, 2.5, 5, 9.3, 10, 12]),
+    }
+    cond = {}
+    if rng.random() < 0.9: cond["biomes"] = rng.sample(biomes, rng.randint(1, 3))
+    if rng.random() < 0.4: cond["timeRange"] = rng.choice(TIMES)
+    if rng.random() < 0.25: cond["weather"] = rng.choice(WEATHERS)
+    if rng.random() < 0.3: cond["canSeeSky"] = rng.random() < 0.5
+    if rng.random() < 0.3: cond["minY"] = rng.randint(-60, 60)
+    if rng.random() < 0.2: cond["maxY"] = rng.randint(61, 250)
+    if cond: rule["condition"] = cond
+    return rule
+
+def generate_modpack(root, jars=DEFAULT_JARS, spawn_files=DEFAULT_SPAWN_FILES, rules=DEFAULT_RULES,
+                     tag_depth=DEFAULT_TAG_DEPTH, filler=DEFAULT_FILLER, seed=42, plain_jars=DEFAULT_PLAIN_JARS,
+                     addon_jars=DEFAULT_ADDON_JARS):
+    """
+    Crée root/mods/*.jar et root/datapacks/ avec des spawns et des tags de biomes réalistes.
+    Chaque jar définit une chaîne de tags #modN:level_0 -> level_1 -> ... -> biomes concrets,
+    plus des ajouts à #cobblemon:is_overworld (plusieurs mods complètent le même tag).
+    Renvoie le nombre d'octets écrits.
+    """
+    rng = random.Random(seed)
+    shutil.rmtree(os.path.join(root, "mods"), ignore_errors=True)
+    shutil.rmtree(os.path.join(root, "datapacks"), ignore_errors=True)
+    os.makedirs(os.path.join(root, "mods"))
+    os.makedirs(os.path.join(root, "datapacks"))
+
+    vanilla = [f"minecraft:biome_{i}" for i in range(60)]
+    species_count = jars * spawn_files // 2 or 1  # des espèces reviennent dans plusieurs mods
+    species = species_names(rng, species_count)
+    total_bytes = 0
+    bundled = [] # (chemin, contenu) des spawns du premier jar, recopiés par les addons
+
+    for j in range(jars):
+        ns = f"mod{j:03d}"
+        own = [f"{ns}:biome_{i}" for i in range(5)]
+        tags = [f"#{ns}:level_{d}" for d in range(tag_depth)]
+        biomes = vanilla[:20] + own + tags + ["#cobblemon:is_overworld", "#minecraft:is_forest"]
+
+        path = os.path.join(root, "mods", f"{ns}.jar")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("META-INF/MANIFEST.MF", "Manifest-Version: 1.0\n")
+            for i in range(filler):
+                z.writestr(f"com/{ns}/Class{i}.class", os.urandom(256))
+            for k in range(spawn_files):
+                name = rng.choice(species)
+                doc = {"enabled": True, "neededInstalledMods": [], "neededUninstalledMods": [],
+                       "spawns": [make_rule(rng, name, r, biomes) for r in range(rules)]}
+                spawn_path = f"data/cobblemon/spawn_pool_world/{k:04d}_{name}.json"
+                z.writestr(spawn_path, json.dumps(doc, indent=2))
+                if j == 0: bundled.append((spawn_path, json.dumps(doc, indent=2)))
+            for d in range(tag_depth):
+                values = rng.sample(own + vanilla, 3)
+                if d + 1 < tag_depth: values.append(f"#{ns}:level_{d + 1}")
+                z.writestr(f"data/{ns}/tags/worldgen/biome/level_{d}.json", json.dumps({"values": values}))
+            z.writestr("data/cobblemon/tags/worldgen/biome/is_overworld.json",
+                       json.dumps({"values": own[:2] + [f"#{ns}:level_0"]}))
+            z.writestr("data/minecraft/tags/worldgen/biome/is_forest.json",
+                       json.dumps({"values": rng.sample(vanilla, 4)}))
+            z.writestr("pack.mcmeta", json.dumps({"pack": {"pack_format": 15, "description": ns}}))
+        total_bytes += os.path.getsize(path)
+
+    for j in range(plain_jars):
+        path = os.path.join(root, "mods", f"plain{j:03d}.jar")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("META-INF/MANIFEST.MF", "Manifest-Version: 1.0\n")
+            for i in range(filler):
+                z.writestr(f"net/plain{j:03d}/Class{i}.class", os.urandom(256))
+            z.writestr("pack.mcmeta", json.dumps({"pack": {"pack_format": 15, "description": f"plain{j}"}}))
+        total_bytes += os.path.getsize(path)
+
+    for j in range(addon_jars):
+        path = os.path.join(root, "mods", f"addon{j:03d}.jar")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("META-INF/MANIFEST.MF", "Manifest-Version: 1.0\n")
+            for i in range(filler):
+                z.writestr(f"net/addon{j:03d}/Class{i}.class", os.urandom(256))
+            for spawn_path, content in bundled:
+                z.writestr(spawn_path, content)
+        total_bytes += os.path.getsize(path)
+
+    # Un datapack en dossier, comme ceux qu'on ajoute à la main
+    loose = os.path.join(root, "datapacks", "custom", "data", "cobblemon", "spawn_pool_world")
+    os.makedirs(loose)
+    for k in range(spawn_files):
+        name = rng.choice(species)
+        doc = {"enabled": True, "spawns": [make_rule(rng, name, r, vanilla[:20]) for r in range(rules)]}
+        with open(os.path.join(loose, f"{name}.json"), "w") as f:
+            json.dump(doc, f, indent=2)
+            total_bytes += f.tell()
+    return total_bytes
+
+# --- MESURE ---
+
+class Bench:
+    """Chronomètre les étapes et note le pic mémoire Python (tracemalloc) de chacune."""
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.results = []
+
+    def run(self, stage, func, count_func=None, unit="éléments"):
+        if self.track_memory: tracemalloc.reset_peak()
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if self.track_memory else None
+        count = count_func(value) if count_func else None
+        self.results.append({
+            "stage": stage,
+            "seconds": round(elapsed, 4),
+            "count": count,
+            "unit": unit,
+            "per_second": round(count / elapsed, 1) if count and elapsed > 0 else None,
+            "peak_mb": round(peak / 1e6, 2) if peak is not None else None,
+        })
+        return value
+
+    def print_table(self):
+        print(f"\n{'Étape':<34}{'Temps':>10}{'Débit':>28}{'Pic mémoire':>14}")
+        print("-" * 86)
+        for r in self.results:
+            rate = f"{r['per_second']:,.0f} {r['unit']}/s" if r["per_second"] else ""
+            peak = f"{r['peak_mb']:.1f} Mo" if r["peak_mb"] is not None else ""
+            print(f"{r['stage']:<34}{r['seconds']:>9.3f}s{rate:>28}{peak:>14}")
+        print("-" * 86)
+        print(f"{'Total':<34}{sum(r['seconds'] for r in self.results):>9.3f}s")
+
+def run_stages(bench, jobs=1, searches=DEFAULT_SEARCHES):
+    """Toutes les étapes du pipeline, dans le dossier courant (le faux modpack)."""
+    clear_scan_results()
+    # Un --workdir réutilisé garde le cache du run précédent : le premier scan serait déjà chaud
+    if os.path.exists(CACHE_FILE): os.remove(CACHE_FILE)
+    bench.run("scan (sans cache)", lambda: scan_sources(SOURCE_DIRS, jobs=jobs),
+              lambda scan: len(scan.entries), "fichiers")
+    clear_scan_results()
+    bench.run("scan (cache chaud)", lambda: scan_sources(SOURCE_DIRS, jobs=jobs),
+              lambda scan: len(scan.entries), "fichiers")
+
+    biomes = load_script("extract_biomes")
+    bench.run("extract_biomes.scan_archives", biomes.scan_archives, lambda _: len(biomes.raw_tags), "tags")
+    bench.run("extract_biomes.resolve_all_tags", biomes.resolve_all_tags, lambda _: len(biomes.resolved_tags), "tags")
+    bench.run("extract_biomes.save_database", biomes.save_database)
+
+    blocker = load_script("00_full_block")
+    bench.run("00.process_everything", blocker.process_everything)
+
+    unified = load_script("01_unified_spawns")
+    bench.run("01.scan_everything", unified.scan_everything,
+              lambda _: sum(len(rules) for rules in unified.raw_spawns.values()), "règles")
+    content = bench.run("01.process_and_merge", unified.process_and_merge, len, "espèces")
+    bench.run("01.write_packs", lambda: unified.write_packs(content))
+
+    cleaner = load_script("02_clean_spawns")
+    bench.run("02.process_files (clean_rules)", cleaner.process_files)
+
+    bench.run("spawn_diff (pack 01 -> pack 02)",
+              lambda: spawn_diff.diff_tables(spawn_diff.load_table(cleaner.INPUT_PACK_NAME),
+                                             spawn_diff.load_table(cleaner.OUTPUT_PACK_NAME)),
+              lambda changelog: changelog["summary"]["species_after"], "espèces")
+
+    legendary = load_script("03_legendary_blocker")
+    bench.run("03.process_everything", legendary.process_everything)
+
+    atlas = load_script("Atlas_pokemon")
+    bench.run("Atlas.scan_everything", atlas.scan_everything, lambda _: len(atlas.pokedex), "espèces")
+    if spawn_odds.available():
+        bench.run("Atlas.compute_odds (NumPy)", lambda: atlas.species_odds(atlas.load_biome_db()), len, "espèces")
+    bench.run("Atlas.save_atlas", atlas.save_atlas)
+
+    index = bench.run("bot : chargement de l'index", lambda: AtlasIndex.load().warm(), len, "espèces")
+    # Mélange de recherches exactes, de débuts de noms et de fautes de frappe
+    rng = random.Random(1)
+    names = sorted(index.keys())
+    queries = []
+    for i in range(searches):
+        name = rng.choice(names) if names else "pikachu"
+        kind = i % 3
+        if kind == 1: name = name[:4]
+        elif kind == 2 and len(name) > 4: name = name[:2] + name[3:]
+        queries.append(name)
+    bench.run("bot : !find", lambda: [index.search(q) for q in queries], len, "recherches")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le temps et la mémoire de chaque étape sur un faux modpack")
+    parser.add_argument("--jars", type=int, default=DEFAULT_JARS)
+    parser.add_argument("--spawn-files", type=int, default=DEFAULT_SPAWN_FILES, help="Fichiers de spawn par jar")
+    parser.add_argument("--rules", type=int, default=DEFAULT_RULES, help="Règles par fichier de spawn")
+    parser.add_argument("--tag-depth", type=int, default=DEFAULT_TAG_DEPTH, help="Profondeur des chaînes de tags de biomes")
+    parser.add_argument("--filler", type=int, default=DEFAULT_FILLER, help="Fichiers inutiles par jar")
+    parser.add_argument("--plain-jars", type=int, default=DEFAULT_PLAIN_JARS, help="Jars sans données Cobblemon")
+    parser.add_argument("--addon-jars", type=int, default=DEFAULT_ADDON_JARS,
+                        help="Jars qui recopient à l'identique les spawns du premier jar")
+    parser.add_argument("--searches", type=int, default=DEFAULT_SEARCHES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de process pour lire les archives (0 = tous les coeurs)")
+    parser.add_argument("--workdir", help="Dossier de travail (par défaut un dossier temporaire supprimé à la fin)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Sans tracemalloc : temps plus fidèles, mais pas de pic mémoire")
+    parser.add_argument("--json", help="Écrit aussi les résultats dans ce fichier (pour comparer deux versions)")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="cobble_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    json_file = os.path.abspath(args.json) if args.json else None
+    previous_dir = os.getcwd()
+
+    print(f"--- 🏗️ Génération du modpack de test dans {workdir} ---")
+    start = time.perf_counter()
+    size = generate_modpack(workdir, args.jars, args.spawn_files, args.rules, args.tag_depth, args.filler,
+                            args.seed, args.plain_jars, args.addon_jars)
+    print(f"✅ {args.jars} jars (+{args.plain_jars} sans Cobblemon, +{args.addon_jars} copies), {args.jars * args.spawn_files} fichiers de spawn, "
+          f"{size / 1e6:.1f} Mo en {time.perf_counter() - start:.1f}s")
+
+    bench = Bench(track_memory=not args.no_memory)
+    if bench.track_memory: tracemalloc.start()
+    os.chdir(workdir)
+    # Les scripts parlent beaucoup : on ne garde que le tableau final
+    stdout = sys.stdout
+    try:
+        with open(os.devnull, "w") as devnull:
+            sys.stdout = devnull
+            run_stages(bench, jobs=args.jobs, searches=args.searches)
+    finally:
+        sys.stdout = stdout
+        os.chdir(previous_dir)
+        if bench.track_memory: tracemalloc.stop()
+        if not args.workdir: shutil.rmtree(workdir, ignore_errors=True)
+
+    bench.print_table()
+    if json_file:
+        with open(json_file, "w") as f:
+            json.dump({"params": vars(args), "bytes": size, "stages": bench.results}, f, indent=2)
+        print(f"💾 Résultats écrits dans {json_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+
+# ================= CONFIGURATION =================
+BIOME_DB_FILE = "biome_database.json"
+# =================================================
+
+class BiomeTable:
+    """
+    Table d'interning des biomes : chaque ID ("minecraft:plains", "#cobblemon:is_overworld"...)
+    reçoit un entier, qui est aussi son numéro de bit. Une liste de biomes devient un masque
+    (int) et les unions / inclusions se font en une opération : a | b, a & ~b == 0.
+
+    Dans biome_database.json, l'ID d'un biome est sa position dans la liste triée "biomes".
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names: self.intern(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        """ID du biome (attribué au premier passage)."""
+        biome_id = self.ids.get(name)
+        if biome_id is None:
+            biome_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return biome_id
+
+    def bit(self, name):
+        return 1 << self.intern(name)
+
+    def mask(self, names):
+        mask = 0
+        for name in names: mask |= 1 << self.intern(name)
+        return mask
+
+    def names_of(self, mask):
+        """Biomes d'un masque, dans l'ordre des IDs."""
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(self.names[low.bit_length() - 1])
+            mask ^= low
+        return names
+
+    @classmethod
+    def from_database(cls, db):
+        """Table dont les premiers IDs sont ceux de biome_database.json."""
+        return cls(db.get("biomes", []))
+
+def mask_to_hex(mask):
+    # En texte : les entiers de plus de 53 bits ne survivent pas à tous les lecteurs JSON
+    return hex(mask)
+
+def mask_from_hex(text):
+    return int(text, 16)
+
+def load_biome_table(db_file=BIOME_DB_FILE):
+    """Table des biomes du modpack, vide si extract_biomes.py n'a pas encore été lancé."""
+    try:
+        with open(db_file, 'r') as f:
+            return BiomeTable.from_database(json.load(f))
+    except:
+        return BiomeTable()
@@ -0,0 +1,496 @@
+import os
+import sys
+import json
+import random
+import shutil
+import filecmp
+import zipfile
+import argparse
+import tempfile
+import subprocess
+
+from run_pipeline import load_script
+
+# ================= CONFIGURATION =================
+# Nombre de cas aléatoires par vérification (modifiable en ligne de commande)
+DEFAULT_ROUNDS = 3000
+
+# Scripts lancés sur le modpack de test, dans l'ordre du README
+PIPELINE_SCRIPTS = ["extract_biomes", "00_full_block", "01_unified_spawns", "02_clean_spawns",
+                    "03_legendary_blocker", "Atlas_pokemon"]
+# Ce que le pipeline lit ou garde pour lui dans le dossier : pas comparé
+NOT_OUTPUTS = {"mods", "datapacks", "scan_cache.sqlite", "run_report.json", "build_state.json"}
+# =================================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Vérifications disponibles : nom -> fonction(args), remplies par @check
+CHECKS = {}
+
+class Skipped(Exception):
+    """Vérification impossible ici (dépendance facultative absente)."""
+
+def check(name):
+    def register(func):
+        CHECKS[name] = func
+        return func
+    return register
+
+# --- 02 : SubsumptionIndex contre l'ancienne boucle is_subset ---
+
+def pairwise_clean_rules(cleaner, rules):
+    """clean_rules d'avant SubsumptionIndex : chaque candidate comparée à toutes les règles gardées."""
+    kept_rules, deleted_count = [], 0
+    for candidate in sorted(rules, key=cleaner.calculate_specificity_score, reverse=True):
+        if any(cleaner.is_subset(accepted, candidate) for accepted in kept_rules): deleted_count += 1
+        else: kept_rules.append(candidate)
+    return kept_rules, deleted_count
+
+def random_clean_rule(rng):
+    """Règle avec les cas limites de is_subset : biome vide, weather en liste, canSeeSky en 0/1..."""
+    rule = {}
+    if rng.random() < 0.5: rule["context"] = rng.choice(["grounded", "air"])
+    elif rng.random() < 0.2: rule["spawnablePositionType"] = rng.choice(["grounded", "air"])
+    if rng.random() < 0.9:
+        cond = {}
+        if rng.random() < 0.7: cond["biomes"] = [rng.choice(["a", "b", "c", "d", "#t", ""]) for _ in range(rng.randint(0, 3))]
+        if rng.random() < 0.4: cond["timeRange"] = rng.choice(["day", "night"])
+        if rng.random() < 0.3: cond["weather"] = rng.choice(["rain", "clear", ["rain"]])
+        if rng.random() < 0.3: cond["canSeeSky"] = rng.choice([True, False, 1, 0])
+        if rng.random() < 0.2: cond["minY"] = 3
+        rule["condition"] = cond
+    if rng.random() < 0.2: rule["anticondition"] = {"biomes": ["minecraft:desert"]}
+    return rule
+
+@check("subsumption")
+def check_subsumption(args):
+    """02_clean_spawns.clean_rules garde exactement les mêmes règles, dans le même ordre."""
+    cleaner = load_script("02_clean_spawns")
+    rng = random.Random(args.seed)
+    for _ in range(args.rounds):
+        rules = [random_clean_rule(rng) for _ in range(rng.randint(0, 25))]
+        kept, deleted = cleaner.clean_rules(rules)
+        expected_kept, expected_deleted = pairwise_clean_rules(cleaner, rules)
+        # Mêmes objets : la copie d'une règle gardée à la place d'une autre serait une différence
+        assert deleted == expected_deleted and [id(r) for r in kept] == [id(r) for r in expected_kept], rules
+    return f"{args.rounds} listes de règles"
+
+# --- LÉGENDAIRES : LegendaryMatcher contre la boucle sur les sous-chaînes ---
+
+def random_species_name(rng, words):
+    """Morceaux de noms collés avec casse, séparateurs, namespace et aspects : 'Cobblemon:MEW_tWo alolan'."""
+    parts = [rng.choice(words)[rng.randint(0, 2):] for _ in range(rng.randint(1, 3))]
+    name = rng.choice(["", "_", " ", "-"]).join(parts)
+    name = "".join(c.upper() if rng.random() < 0.2 else c for c in name)
+    if rng.random() < 0.3: name = rng.choice(["cobblemon:", "mod:", "0150_"]) + name
+    if rng.random() < 0.2: name += rng.choice([" alolan", " shiny", ".json"])
+    return name
+
+@check("legendaries")
+def check_legendaries(args):
+    """Mode 'contient' : un nom est bloqué si et seulement si un mot de la liste y apparaît (liste fournie ou aléatoire)."""
+    from legendaries import LEGENDARIES, LegendaryMatcher
+    rng = random.Random(args.seed)
+    lists = [LEGENDARIES] + [["".join(rng.choice("abmetwo") for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 12))]
+                             for _ in range(20)]
+    for names in lists:
+        matcher = LegendaryMatcher(names)
+        words = list(names) + ["pikachu", "eevee", "mewt", "zap", "tapu", "iron"]
+        for _ in range(args.rounds):
+            name = random_species_name(rng, words)
+            expected = any(legendary in name.lower() for legendary in names)
+            found = matcher.match(name)
+            assert (found is not None) == expected and (found is None or found in name.lower()), (names[:5], name, found)
+    return f"{args.rounds} noms sur {len(lists)} listes"
+
+# --- 03 : lecture des octets contre le JSON décodé ---
+
+def random_json_value(rng, names, depth):
+    roll = rng.random()
+    if depth > 3 or roll < 0.3: return rng.choice([1, None, True, rng.choice(names)])
+    if roll < 0.6: return [random_json_value(rng, names, depth + 1) for _ in range(rng.randint(0, 3))]
+    return {rng.choice(["pokemon", "spawns", "a"]): random_json_value(rng, names, depth + 1) for _ in range(rng.randint(0, 3))}
+
+def random_spawn_bytes(rng, names):
+    """
+    Fichier de spawn brut : "pokemon" à toutes les profondeurs (hors des règles aussi), valeurs qui ne sont
+    pas des chaînes, accents échappés ou non, clés écrites en \\u00xx, indentation variable.
+    """
+    doc = {}
+    for _ in range(rng.randint(0, 4)):
+        key = rng.choice(["spawns", "a", "pokemon"])
+        if key == "spawns" and rng.random() < 0.7:
+            doc[key] = [{"pokemon": rng.choice(names) if rng.random() < 0.9 else random_json_value(rng, names, 2),
+                         "condition": random_json_value(rng, names, 2)} for _ in range(rng.randint(0, 4))]
+        else:
+            doc[key] = random_json_value(rng, names, 1)
+    raw = json.dumps(doc, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2])).encode("utf-8")
+    if rng.random() < 0.05: raw = raw.replace(b'"pokemon"', b'"\\u0070okemon"', 1)
+    return raw
+
+@check("legendary-bytes")
+def check_legendary_bytes(args):
+    """03 : is_legendary_entry sur les octets bruts donne le même verdict (et le même nom) que sur le JSON décodé."""
+    from archive_scanner import ScanEntry, SPAWN_POOL
+    blocker = load_script("03_legendary_blocker")
+    rng = random.Random(args.seed)
+    names = ["pidgey", "mewtwo", "lugia", "rattata alolan", "flabébé", "pok\"emon", "zapdos galarian", "cobblemon:celebi"]
+    verdicts = {True: 0, False: 0}
+    for _ in range(args.rounds):
+        raw = random_spawn_bytes(rng, names)
+        expected = blocker.is_legendary_file(json.loads(raw), "spawn.json")
+        found = blocker.is_legendary_entry(ScanEntry(SPAWN_POOL, "fuzz", "spawn.json", False, raw), "spawn.json")
+        assert found == expected, (raw, found, expected)
+        verdicts[expected[0]] += 1
+    return f"{args.rounds} fichiers, {verdicts[True]} légendaires"
+
+# --- PROBABILITÉS : SpawnOdds contre le calcul à la main ---
+
+def random_odds_pack(rng):
+    """Petit pack : tags (dont un inconnu), biome hors base, poids invalides, buckets et heures inconnus, twilight."""
+    from biome_table import BiomeTable, mask_to_hex
+    import spawn_odds
+    biomes = [f"minecraft:b{i}" for i in range(rng.randint(1, 8))]
+    tags = {f"cobblemon:t{i}": sorted(rng.sample(biomes, rng.randint(1, len(biomes)))) for i in range(3)}
+    tags["cobblemon:is_overworld"] = list(biomes)
+    table = BiomeTable(biomes)
+    biome_db = {"biomes": biomes, "tags": tags, "tag_masks": {t: mask_to_hex(table.mask(v)) for t, v in tags.items()}}
+    choices = biomes + ["#" + t for t in tags] + ["#cobblemon:unknown", "minecraft:extra", ""]
+    species = {}
+    for s in range(rng.randint(1, 6)):
+        rules = []
+        for _ in range(rng.randint(1, 4)):
+            rule = {"weight": rng.choice([0.1, 1, 5, 10, 0, -2, "x"]), "bucket": rng.choice(spawn_odds.BUCKETS + ["legendary"])}
+            if rng.random() < 0.8: rule["context"] = rng.choice(["grounded", "submerged", "Surface"])
+            cond = {}
+            if rng.random() < 0.8: cond["biomes"] = rng.sample(choices, rng.randint(1, 3))
+            if rng.random() < 0.5: cond["timeRange"] = rng.choice(["day", "night", "twilight", "morning", "noon", "eclipse"])
+            if rng.random() < 0.4: cond["weather"] = rng.choice(["rain", "thunder", "clear", "snow"])
+            if cond: rule["condition"] = cond
+            rules.append(rule)
+        species[f"s{s}"] = rules
+    return biome_db, species
+
+def brute_force_odds(builder, biome_db, species):
+    """
+    probabilités[case][espèce][biome] calculées règle par règle, en float64, sans NumPy :
+    tirage d'un bucket parmi ceux présents, puis d'une règle de ce bucket au prorata de son poids.
+    """
+    import spawn_odds
+    from atlas_index import TIMES, TIME_RANGES
+    names = builder.table.names
+    contexts = list(builder.contexts)
+    n_cells = len(contexts) * len(TIMES) * len(spawn_odds.WEATHERS)
+    placed = [] # (espèce, bucket, poids, cases, biomes)
+    for s, rules in enumerate(species.values()):
+        for rule in rules:
+            weight = rule["weight"]
+            if not isinstance(weight, (int, float)) or weight <= 0: continue
+            cond = rule.get("condition", {})
+            bucket = rule["bucket"] if rule["bucket"] in spawn_odds.BUCKET_WEIGHTS else spawn_odds.DEFAULT_BUCKET
+            context = contexts.index(str(rule.get("context", spawn_odds.DEFAULT_CONTEXT)).lower())
+            times = TIME_RANGES.get(str(cond["timeRange"]).lower(), TIMES) if "timeRange" in cond else TIMES
+            weathers = spawn_odds.WEATHER_RANGES.get(cond["weather"], spawn_odds.WEATHERS) if "weather" in cond else spawn_odds.WEATHERS
+            cells = {(context * len(TIMES) + TIMES.index(t)) * len(spawn_odds.WEATHERS) + spawn_odds.WEATHERS.index(w)
+                     for t in times for w in weathers}
+            where = set(range(len(names))) if not cond.get("biomes") else set()
+            for biome in cond.get("biomes", []):
+                biome = biome or "#cobblemon:is_overworld"  # Biome vide = Overworld
+                if not biome.startswith("#"): where.add(names.index(biome))
+                else: where.update(names.index(b) for b in biome_db["tags"].get(biome[1:], []))
+            placed.append((s, bucket, weight, cells, where))
+    grid = [[[0.0] * len(names) for _ in species] for _ in range(n_cells)]
+    for x in range(n_cells):
+        for b in range(len(names)):
+            here = [p for p in placed if x in p[3] and b in p[4]]
+            totals = {}
+            for _, bucket, weight, _, _ in here: totals[bucket] = totals.get(bucket, 0.0) + weight
+            shares = sum(spawn_odds.BUCKET_WEIGHTS[k] for k in totals)
+            for s, bucket, weight, _, _ in here:
+                grid[x][s][b] += spawn_odds.BUCKET_WEIGHTS[bucket] / shares * weight / totals[bucket]
+    return grid
+
+@check("odds")
+def check_odds(args):
+    """
+    spawn_odds : chaque case de SpawnOdds contre le calcul à la main, puis best() contre la réduction
+    naïve des mêmes cases empilées (meilleure case par biome, meilleurs biomes, moment et météo cités
+    seulement s'ils changent la chance). Un petit pack aléatoire pour 10 rounds.
+    """
+    import spawn_odds
+    from atlas_index import TIMES
+    if not spawn_odds.available(): raise Skipped("NumPy absent")
+    np = spawn_odds.np
+    rng = random.Random(args.seed)
+    packs = max(1, args.rounds // 10)
+    for _ in range(packs):
+        biome_db, species = random_odds_pack(rng)
+        builder = spawn_odds.OddsBuilder(biome_db)
+        for name, rules in species.items(): builder.add(name, rules)
+        # Le tag inconnu est voulu : pas besoin de son avertissement à chaque pack
+        stdout = sys.stdout
+        try:
+            with open(os.devnull, "w") as devnull:
+                sys.stdout = devnull
+                odds = builder.compute()
+        finally:
+            sys.stdout = stdout
+        if not odds.n_cells:
+            # Aucune règle au poids valide
+            assert odds.best() == {name: [] for name in species}, species
+            continue
+        expected = brute_force_odds(builder, biome_db, species)
+        cells = np.array([odds.cell(x) for x in range(odds.n_cells)])
+        assert np.allclose(cells, np.array(expected), atol=1e-6), (biome_db, species)
+
+        # Réduction naïve : tout le tenseur en mémoire, comme avant le calcul case par case
+        shape = (len(odds.contexts), len(TIMES), len(spawn_odds.WEATHERS))
+        best = odds.best()
+        for s, name in enumerate(odds.species):
+            values = cells[:, s, :].max(axis=0)
+            ranked = sorted(range(len(odds.biomes)), key=lambda b: (-values[b], odds.biomes[b]))[:spawn_odds.ODDS_PER_SPECIES]
+            kept = [b for b in ranked if values[b] >= spawn_odds.MIN_PROBABILITY]
+            got = best[name]
+            # Égalités en bord de classement : seules les valeurs sont imposées, pas lequel des biomes ex aequo
+            assert [e["probability"] for e in got] == [round(float(values[b]), 6) for b in kept], (species, name, got)
+            for entry in got:
+                b = odds.biomes.index(entry["biome"])
+                assert entry["probability"] == round(float(values[b]), 6), (species, name, entry)
+                c, t, w = np.unravel_index(int(cells[:, s, b].argmax()), shape)
+                by_cell = cells[:, s, b].reshape(shape)
+                assert entry["context"] == odds.contexts[c], (species, name, entry)
+                timed = not np.isclose(by_cell[c, :, w], values[b]).all()
+                weathered = not np.isclose(by_cell[c, t, :], values[b]).all()
+                assert entry.get("time") == (TIMES[t] if timed else None), (species, name, entry)
+                assert entry.get("weather") == (spawn_odds.WEATHERS[w] if weathered else None), (species, name, entry)
+    return f"{packs} packs aléatoires"
+
+# --- PIPELINE COMPLET SUR UN MODPACK DE TEST ---
+
+FIXTURE_SPECIES = ["pikachu", "bulbasaur", "eevee", "mewtwo", "mew", "abra", "nidoran_m", "rattata", "zubat", "geodude",
+                   "raichu alolan", "absol", "lugia", "altaria", "ironmoth", "magikarp"]
+FIXTURE_BIOMES = ["minecraft:plains", "minecraft:forest", "#cobblemon:is_overworld", "#minecraft:is_forest", "minecraft:desert",
+                  "#cobblemon:is_hills", "terralith:alpine", "", "#cobblemon:is_ocean"]
+
+def fixture_spawn_file(rng, species):
+    """Fichier de spawn avec les pièges habituels : spawnablePositionType, biome vide, tag inconnu, alpha..."""
+    rules = []
+    for i in range(rng.randint(1, 4)):
+        rule = {"id": f"{species}-{i}", "pokemon": species + (" alpha" if rng.random() < 0.1 else ""), "presets": ["natural"],
+                "type": "pokemon", "bucket": rng.choice(["common", "rare"]), "level": "5-30",
+                "weight": rng.choice([0.1, 1, 2.5, 6, 9.3, 10, 12])}
+        if rng.random() < 0.5: rule["context"] = rng.choice(["grounded", "submerged", "air"])
+        else: rule["spawnablePositionType"] = rng.choice(["grounded", "submerged"])
+        cond = {}
+        if rng.random() < 0.85: cond["biomes"] = rng.sample(FIXTURE_BIOMES, rng.randint(1, 3))
+        if rng.random() < 0.4: cond["timeRange"] = rng.choice(["day", "night", "dusk"])
+        if rng.random() < 0.3: cond["weather"] = rng.choice(["rain", "thunder", "clear"])
+        if rng.random() < 0.3: cond["canSeeSky"] = rng.choice([True, False])
+        if rng.random() < 0.3: cond["minY"] = rng.randint(-60, 60)
+        if rng.random() < 0.2: cond["maxY"] = rng.randint(60, 200)
+        if cond: rule["condition"] = cond
+        if rng.random() < 0.15: rule["anticondition"] = {"biomes": ["minecraft:desert", "minecraft:badlands"][:rng.randint(1, 2)]}
+        rules.append(rule)
+    return json.dumps({"enabled": True, "neededInstalledMods": [], "spawns": rules}, indent=2)
+
+def make_fixture(root, seed=7):
+    """
+    Petit modpack qui passe par tous les cas du pipeline : spawns hors namespace cobblemon, tags imbriqués
+    et en boucle, JSON cassé, jar corrompu, jar recopié à l'identique, datapack en zip et en dossier, légendaires.
+    """
+    rng = random.Random(seed)
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(os.path.join(root, "mods"))
+    os.makedirs(os.path.join(root, "datapacks"))
+    tag = lambda values: json.dumps({"values": values})
+    for j in range(6):
+        with zipfile.ZipFile(os.path.join(root, "mods", f"mod{j}.jar"), "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("META-INF/MANIFEST.MF", "x")
+            z.writestr(f"com/mod{j}/Main.class", "x" * 100)
+            for k, species in enumerate(rng.sample(FIXTURE_SPECIES, 6)):
+                namespace = "cobblemon" if j % 3 else f"mod{j}"
+                z.writestr(f"data/{namespace}/spawn_pool_world/{k:04d}_{species}.json", fixture_spawn_file(rng, species))
+            z.writestr("data/cobblemon/spawn_pool_world/npc_trainer.json", fixture_spawn_file(rng, "pikachu"))
+            z.writestr(f"data/mod{j}/tags/worldgen/biome/is_cool.json",
+                       tag(["minecraft:plains", {"id": "#cobblemon:is_hills", "required": False}, f"mod{j}:biome_{j}"]))
+            z.writestr("data/cobblemon/tags/worldgen/biome/is_hills.json",
+                       tag(["minecraft:windswept_hills", f"#mod{j}:is_cool", "#minecraft:is_forest"]))
+            z.writestr("data/minecraft/tags/worldgen/biome/is_forest.json", tag(["forest", "birch_forest", "#cobblemon:deep/nested"]))
+            z.writestr("data/cobblemon/tags/worldgen/biome/deep/nested.json", tag(["minecraft:dark_forest"]))
+            z.writestr("data/cobblemon/tags/worldgen/biome/is_overworld.json",
+                       tag(["#cobblemon:is_hills", "#minecraft:is_forest", "minecraft:desert"]))
+            z.writestr("data/cobblemon/tags/worldgen/biome/broken.json", "{not json")
+            z.writestr("pack.mcmeta", json.dumps({"pack": {"pack_format": 15, "description": "m"}}))
+    shutil.copy(os.path.join(root, "mods", "mod1.jar"), os.path.join(root, "mods", "mod1_copy.jar"))
+    with zipfile.ZipFile(os.path.join(root, "mods", "plain.jar"), "w") as z:
+        z.writestr("a/b.class", "x")
+    with open(os.path.join(root, "mods", "corrupt.jar"), "wb") as f:
+        f.write(b"not a zip")
+    with zipfile.ZipFile(os.path.join(root, "datapacks", "dp.zip"), "w") as z:
+        z.writestr("pack.mcmeta", "{}")
+        z.writestr("data/cobblemon/spawn_pool_world/eevee.json", fixture_spawn_file(rng, "eevee"))
+        z.writestr("data/cobblemon/spawn_pool_world/zapdos.json", fixture_spawn_file(rng, "zapdos"))
+        z.writestr("data/cobblemon/spawn_pool_world/bad.json", "{bad")
+        z.writestr("data/cobblemon/spawn_pool_world/disabled.json", json.dumps({"enabled": False, "spawns": []}))
+    loose = os.path.join(root, "datapacks", "loose", "data", "cobblemon")
+    os.makedirs(os.path.join(loose, "spawn_pool_world"))
+    for species in ["magikarp", "Raichu Alolan", "celebi"]:
+        with open(os.path.join(loose, "spawn_pool_world", f"{species}.json"), "w") as f:
+            f.write(fixture_spawn_file(rng, species))
+    os.makedirs(os.path.join(loose, "tags", "worldgen", "biome"))
+    with open(os.path.join(loose, "tags", "worldgen", "biome", "loose_tag.json"), "w") as f:
+        f.write(tag(["minecraft:beach"]))
+    # Tags qui s'incluent en boucle
+    with zipfile.ZipFile(os.path.join(root, "mods", "zcycle.jar"), "w") as z:
+        z.writestr("data/a/tags/worldgen/biome/x.json", tag(["#a:y", "minecraft:x"]))
+        z.writestr("data/a/tags/worldgen/biome/y.json", tag(["#a:x", "minecraft:y"]))
+        z.writestr("data/a/tags/worldgen/biome/z.json", tag(["#a:y"]))
+
+def run_script(script_dir, root, name, *options):
+    done = subprocess.run([sys.executable, os.path.join(script_dir, f"{name}.py"), *options], cwd=root,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    assert done.returncode == 0, f"{name}.py ({root}) :\n{done.stderr}"
+
+def run_fixture(script_dir, root):
+    """Génère le modpack de test dans root et y lance chaque script de script_dir, un process par script."""
+    make_fixture(root)
+    for name in PIPELINE_SCRIPTS:
+        run_script(script_dir, root, name)
+
+def output_files(root):
+    files = set()
+    for folder, dirs, names in os.walk(root):
+        if folder == root: dirs[:] = [d for d in dirs if d not in NOT_OUTPUTS]
+        files.update(os.path.relpath(os.path.join(folder, n), root) for n in names)
+    return files - NOT_OUTPUTS
+
+def compare_outputs(expected_root, root):
+    """Mêmes fichiers produits, octet pour octet. Renvoie leur nombre."""
+    expected, produced = output_files(expected_root), output_files(root)
+    assert expected == produced, f"fichiers en plus : {sorted(produced - expected)}, en moins : {sorted(expected - produced)}"
+    different = [f for f in sorted(produced) if not filecmp.cmp(os.path.join(expected_root, f), os.path.join(root, f), shallow=False)]
+    assert not different, f"{len(different)} fichier(s) : {', '.join(different[:10])}"
+    return len(produced)
+
+@check("pipeline")
+def check_pipeline(args):
+    """
+    Tout le pipeline sur le modpack de test, comparé à une autre copie des scripts (--against,
+    par exemple un 'git worktree' d'un commit plus ancien) ou, sans --against, à un second lancement
+    des mêmes scripts (les sorties ne doivent pas dépendre du hasard des ensembles Python).
+    Les scripts de cette copie sont aussi relancés avec le cache chaud, puis en un seul process
+    (run_pipeline.py, un seul scan partagé par toutes les étapes) avec --jobs : mêmes sorties attendues.
+    """
+    reference_dir = os.path.abspath(args.against) if args.against else SCRIPT_DIR
+    with tempfile.TemporaryDirectory(prefix="cobble_check_") as tmp:
+        expected, produced = os.path.join(tmp, "reference"), os.path.join(tmp, "current")
+        run_fixture(reference_dir, expected)
+        run_fixture(SCRIPT_DIR, produced)
+        count = compare_outputs(expected, produced)
+        # Même dossier : les archives viennent cette fois de scan_cache.sqlite
+        for name in PIPELINE_SCRIPTS:
+            run_script(SCRIPT_DIR, produced, name)
+        compare_outputs(expected, produced)
+        single = os.path.join(tmp, "run_pipeline")
+        make_fixture(single)
+        run_script(SCRIPT_DIR, single, "run_pipeline", "--jobs", "2")
+        compare_outputs(expected, single)
+    return f"{count} fichiers produits, contre {reference_dir} ; cache chaud et run_pipeline --jobs 2 compris"
+
+# --- SCAN : cache, --jobs et contenus partagés contre une lecture naïve ---
+
+def naive_scan(source_dirs):
+    """
+    Chaque archive ouverte avec zipfile et chaque fichier décodé pour lui-même : ni cache, ni répertoire
+    central lu à la main, ni contenu partagé. Les archives sans aucun nom de DATA_MARKERS sont ignorées, comme au scan.
+    """
+    from archive_scanner import list_source_files, is_archive, classify, DATA_MARKERS
+    rows, errors = [], set()
+    def decode(raw):
+        try: return json.loads(raw)
+        except ValueError: return None
+    for full_path in list_source_files(source_dirs):
+        if not is_archive(full_path):
+            path = full_path.replace("\\", "/")
+            if classify(path) is None: continue
+            with open(full_path, "rb") as f:
+                rows.append((classify(path), full_path, path, decode(f.read())))
+            continue
+        try:
+            with zipfile.ZipFile(full_path) as z:
+                infos = z.infolist()
+                if not any(marker.decode() in i.filename for marker in DATA_MARKERS for i in infos): continue
+                rows += [(classify(i.filename), full_path, i.filename, decode(z.read(i))) for i in infos if classify(i.filename)]
+        except zipfile.BadZipFile:
+            errors.add(os.path.basename(full_path))
+    return rows, errors
+
+@check("scan")
+def check_scan(args):
+    """
+    scan_sources (à froid, cache chaud, --jobs 2) contre naive_scan : mêmes entrées, dans le même ordre,
+    chacune avec le JSON de ses propres octets, y compris les copies qui partagent le document d'un original.
+    """
+    import archive_scanner
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="cobble_check_") as tmp:
+        make_fixture(tmp)
+        # Une copie d'un fichier de jar en datapack, et un jar entier recopié : les deux cas de contenus partagés
+        with zipfile.ZipFile(os.path.join(tmp, "mods", "mod2.jar")) as z:
+            name = next(n for n in z.namelist() if "spawn_pool_world" in n)
+            copied = os.path.join(tmp, "datapacks", "copied", "data", "cobblemon", "spawn_pool_world")
+            os.makedirs(copied)
+            with open(os.path.join(copied, name.rsplit("/", 1)[-1]), "wb") as f:
+                f.write(z.read(name))
+        shutil.copy(os.path.join(tmp, "mods", "mod2.jar"), os.path.join(tmp, "mods", "zz_mod2_addon.jar"))
+        os.chdir(tmp)
+        # Le scan parle beaucoup : seules les différences nous intéressent
+        stdout = sys.stdout
+        try:
+            expected = naive_scan(archive_scanner.SOURCE_DIRS)
+            modes = [("sans cache", {"use_cache": False}), ("à froid", {}), ("cache chaud", {}),
+                     ("--jobs 2 à froid", {"jobs": 2}), ("cache chaud écrit par --jobs", {})]
+            with open(os.devnull, "w") as devnull:
+                sys.stdout = devnull
+                for label, options in modes:
+                    archive_scanner.clear_scan_results()
+                    if label == "--jobs 2 à froid": os.remove(archive_scanner.CACHE_FILE)
+                    scan = archive_scanner.scan_sources(archive_scanner.SOURCE_DIRS, **options)
+                    rows = [(e.kind, e.source, e.path, e.load()) for e in scan.entries]
+                    errors = {name for name, _ in scan.errors}
+                    assert (rows, errors) == expected, f"scan {label}"
+                    if label == "sans cache":
+                        assert scan.duplicates_not_read > 0, "aucune copie reconnue sans être décompressée"
+                        copies = scan.duplicates
+        finally:
+            sys.stdout = stdout
+            archive_scanner.clear_scan_results()
+            os.chdir(previous_dir)
+    return f"{len(expected[0])} entrées dont {copies} copies, {len(modes)} modes"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les versions optimisées du pipeline à une référence simple")
+    parser.add_argument("checks", nargs="*", metavar="CHECK",
+                        help=f"Vérifications à lancer (par défaut toutes) : {', '.join(sorted(CHECKS))}")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Cas aléatoires par vérification")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--against", help="pipeline : dossier d'une autre version des scripts, à comparer à celle-ci")
+    args = parser.parse_args()
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown: parser.error(f"vérification inconnue : {', '.join(unknown)}")
+
+    failed = 0
+    for name in args.checks or sorted(CHECKS):
+        try:
+            summary = CHECKS[name](args)
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name} : différence trouvée sur {e}")
+        except Skipped as e:
+            print(f"⏭️ {name} : ignorée ({e})")
+        else:
+            print(f"✅ {name} : identique ({summary})")
+    if failed: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
-import os
+import argparse
 import json
-import zipfile
 import re
+import time
+
+from archive_scanner import scan_sources
+from biome_table import BiomeTable, mask_to_hex
+import run_report
 
 # ================= CONFIGURATION =================
 SOURCE_DIRS = ["mods", "datapacks"] 
@@ -10,121 +14,173 @@ OUTPUT_FILE = "biome_database.json"
 
 raw_tags = {} # Stocke le contenu brut des fichiers JSON trouvés
 resolved_tags = {} # Stocke la liste finale des biomes par tag
+resolved_masks = {} # Même chose en masque de bits (voir biome_table.py)
 unique_biomes_found = set() # Liste de tous les biomes concrets rencontrés
+resolution_cycles = [] # Groupes de tags qui s'incluent mutuellement
+biome_table = BiomeTable() # Biome -> ID entier (= numéro de bit)
 
 def normalize_id(resource_id):
     """Ajoute minecraft: si absent"""
     if ":" not in resource_id: return f"minecraft:{resource_id}"
     return resource_id
 
-def scan_archives():
+@run_report.stage("extract_biomes.scan_archives")
+def scan_archives(jobs=1):
     print("--- 🕵️‍♂️ Phase 1 : Scan des fichiers de Tags ---")
-    cwd = os.getcwd()
-    
+    scan = scan_sources(SOURCE_DIRS, jobs=jobs)
+
     files_scanned = 0
-    
-    for folder in SOURCE_DIRS:
-        target_dir = os.path.join(cwd, folder)
-        if not os.path.exists(target_dir): continue
-
-        for root, dirs, files in os.walk(target_dir):
-            for file in files:
-                full_path = os.path.join(root, file)
-                
-                # On traite les .jar et .zip
-                if file.lower().endswith((".zip", ".jar")):
-                    try:
-                        with zipfile.ZipFile(full_path, 'r') as z:
-                            for internal_file in z.namelist():
-                                # On cherche spécifiquement les tags de BIOMES
-                                if "tags/worldgen/biome" in internal_file and internal_file.endswith(".json"):
-                                    # Extraction de l'ID du tag depuis le chemin
-                                    # Format: data/<namespace>/tags/worldgen/biome/<path>.json
-                                    parts = internal_file.split("/")
-                                    try:
-                                        if "data" in parts:
-                                            data_idx = parts.index("data")
-                                            namespace = parts[data_idx+1]
-                                            # On recupère tout ce qui est après "biome/"
-                                            if "biome" in parts:
-                                                biome_idx = parts.index("biome")
-                                                tag_path = parts[biome_idx+1:]
-                                                tag_name = "/".join(tag_path).replace(".json", "")
-                                                
-                                                tag_id = f"{namespace}:{tag_name}"
-                                                
-                                                with z.open(internal_file) as f:
-                                                    content = json.load(f)
-                                                    # Le format standard contient une liste "values"
-                                                    if "values" in content:
-                                                        if tag_id not in raw_tags:
-                                                            raw_tags[tag_id] = []
-                                                        # On étend la liste (car plusieurs mods peuvent ajouter au même tag)
-                                                        raw_tags[tag_id].extend(content["values"])
-                                                        files_scanned += 1
-                                    except Exception as e:
-                                        # print(f"Erreur parsing chemin {internal_file}: {e}")
-                                        pass
-                    except Exception as e:
-                        print(f"⚠️ Impossible de lire {file}: {e}")
+
+    for file, error in scan.errors:
+        print(f"⚠️ Impossible de lire {file}: {error}")
+
+    # On cherche spécifiquement les tags de BIOMES dans les .jar et .zip
+    for entry in scan.biome_tags:
+        if not entry.archive: continue
+        # Extraction de l'ID du tag depuis le chemin
+        # Format: data/<namespace>/tags/worldgen/biome/<path>.json
+        parts = entry.path.split("/")
+        try:
+            if "data" in parts:
+                data_idx = parts.index("data")
+                namespace = parts[data_idx+1]
+                # On recupère tout ce qui est après "biome/"
+                if "biome" in parts:
+                    biome_idx = parts.index("biome")
+                    tag_path = parts[biome_idx+1:]
+                    tag_name = "/".join(tag_path).replace(".json", "")
+
+                    tag_id = f"{namespace}:{tag_name}"
+
+                    content = entry.load()
+                    # Le format standard contient une liste "values"
+                    if content is not None and "values" in content:
+                        if tag_id not in raw_tags:
+                            raw_tags[tag_id] = []
+                        # On étend la liste (car plusieurs mods peuvent ajouter au même tag)
+                        raw_tags[tag_id].extend(content["values"])
+                        files_scanned += 1
+        except Exception as e:
+            # print(f"Erreur parsing chemin {entry.path}: {e}")
+            pass
 
     print(f"✅ Scan terminé. {files_scanned} fichiers de tags analysés.")
     print(f"📋 {len(raw_tags)} Tags uniques identifiés (ex: cobblemon:is_overworld).")
 
+def tag_entries(tag_id):
+    """Valeurs normalisées d'un tag (parfois c'est un dict {"id": "...", "required": false})"""
+    for entry in raw_tags[tag_id]:
+        val = entry
+        if isinstance(entry, dict):
+            val = entry.get("id", "")
+        yield normalize_id(val)
+
+def strongly_connected_components(nodes, edges):
+    """
+    Tarjan itératif (pas de récursion Python, donc pas de limite de profondeur).
+    Les composantes sont renvoyées dans l'ordre topologique inverse :
+    chaque composante arrive après toutes celles qu'elle inclut.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in nodes:
+        if root in index: continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges[root]))]
+
+        while work:
+            node, children = work[-1]
+            descended = False
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges[child])))
+                    descended = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            if descended: continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node: break
+                components.append(component)
+    return components
+
+@run_report.stage("extract_biomes.resolve_all_tags")
 def resolve_all_tags():
     print("--- 🧠 Phase 2 : Résolution des Inclusions ---")
-    
-    # Fonction récursive pour aplatir les tags
-    def resolve_recursive(tag_id, stack):
-        # Si on l'a déjà résolu, on retourne le résultat mis en cache
-        if tag_id in resolved_tags:
-            return resolved_tags[tag_id]
-        
-        # Si le tag n'est pas défini dans nos fichiers, c'est probablement un biome concret
-        # ou un tag vide/inexistant.
-        if tag_id not in raw_tags:
-            # Si ça ne commence pas par #, c'est un biome
-            if not tag_id.startswith("#"):
-                unique_biomes_found.add(tag_id)
-                return {tag_id}
-            return set()
-
-        # Protection boucle infinie (Tag A contient Tag B qui contient Tag A)
-        if tag_id in stack:
-            return set()
-
-        stack.add(tag_id)
-        final_biomes = set()
-        
-        for entry in raw_tags[tag_id]:
-            val = entry
-            # Parfois c'est un dict {"id": "...", "required": false}
-            if isinstance(entry, dict):
-                val = entry.get("id", "")
-            
-            val = normalize_id(val)
-            
-            if val.startswith("#"):
-                # C'est un tag -> Récursion
-                sub_tag_id = val[1:]
-                resolved = resolve_recursive(sub_tag_id, stack)
-                final_biomes.update(resolved)
+    start = time.perf_counter()
+
+    # Pré-passage : tous les biomes concrets, triés, reçoivent leur ID avant la résolution.
+    # Un tag référencé mais jamais défini est traité comme un biome.
+    concrete = set()
+    for tag_id in raw_tags:
+        for val in tag_entries(tag_id):
+            if not val.startswith("#"): concrete.add(val)
+            elif val[1:] not in raw_tags: concrete.add(val[1:])
+    for name in sorted(concrete): biome_table.intern(name)
+
+    # Graphe des inclusions : biomes directs (en masque) + sous-tags définis
+    direct_masks = {}
+    edges = {}
+    for tag_id in raw_tags:
+        mask = 0
+        children = []
+        for val in tag_entries(tag_id):
+            if val.startswith("#") and val[1:] in raw_tags:
+                children.append(val[1:])
             else:
-                # C'est un biome direct
-                unique_biomes_found.add(val)
-                final_biomes.add(val)
-        
-        stack.remove(tag_id)
-        resolved_tags[tag_id] = final_biomes
-        return final_biomes
+                mask |= biome_table.bit(val[1:] if val.startswith("#") else val)
+        direct_masks[tag_id] = mask
+        edges[tag_id] = children
+
+    # Chaque groupe de tags qui s'incluent mutuellement (boucle A -> B -> A) est résolu
+    # d'un bloc : tous ses membres reçoivent la même liste. Chaque tag est calculé une fois.
+    component_masks = {}
+    cycles = []
+    for component in strongly_connected_components(list(raw_tags), edges):
+        members = set(component)
+        mask = 0
+        for tag_id in component:
+            mask |= direct_masks[tag_id]
+            for child in edges[tag_id]:
+                if child not in members: mask |= component_masks[child]
+        for tag_id in component:
+            component_masks[tag_id] = mask
+        if len(component) > 1 or component[0] in edges[component[0]]:
+            cycles.append(sorted(component))
 
-    # On lance la résolution pour chaque tag trouvé
-    for tag_id in list(raw_tags.keys()):
-        resolve_recursive(tag_id, set())
+    # On garde l'ordre de découverte des tags pour la base de données
+    for tag_id in raw_tags:
+        resolved_masks[tag_id] = component_masks[tag_id]
+        resolved_tags[tag_id] = set(biome_table.names_of(component_masks[tag_id]))
+    unique_biomes_found.update(biome_table.names)
+    resolution_cycles.extend(sorted(cycles))
 
-    print(f"✅ Résolution terminée.")
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"✅ Résolution terminée en {elapsed:.1f} ms ({len(raw_tags)} tags, {len(cycles)} boucles).")
+    for cycle in resolution_cycles:
+        print(f"🔁 Tags qui s'incluent mutuellement : {', '.join(cycle)}")
     print(f"🌍 {len(unique_biomes_found)} Biomes uniques trouvés au total.")
 
+@run_report.stage("extract_biomes.save_database")
 def save_database():
     print("--- 💾 Phase 3 : Sauvegarde de la Base de Données ---")
     
@@ -132,7 +188,8 @@ def save_database():
     output_data = {
         "stats": {
             "total_tags": len(resolved_tags),
-            "total_biomes": len(unique_biomes_found)
+            "total_biomes": len(unique_biomes_found),
+            "cycles": len(resolution_cycles)
         },
         "biomes": sorted(list(unique_biomes_found)),
         "tags": {}
@@ -140,6 +197,11 @@ def save_database():
     
     for tag, biomes in resolved_tags.items():
         output_data["tags"][tag] = sorted(list(biomes))
+
+    # Version compacte : l'ID d'un biome est sa position dans "biomes" ci-dessus
+    # (les IDs ont été attribués dans l'ordre trié, les deux listes concordent)
+    output_data["cycles"] = resolution_cycles
+    output_data["tag_masks"] = {tag: mask_to_hex(mask) for tag, mask in resolved_masks.items()}
         
     with open(OUTPUT_FILE, "w") as f:
         json.dump(output_data, f, indent=2)
@@ -148,6 +210,15 @@ def save_database():
     print("Tu peux l'ouvrir pour vérifier que les tags contiennent bien les bons biomes.")
 
 if __name__ == "__main__":
-    scan_archives()
+    parser = argparse.ArgumentParser(description="Extrait les biomes et tags de biomes du modpack")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de process pour lire les archives (0 = tous les coeurs)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    args = parser.parse_args()
+    if args.profile: run_report.enable()
+
+    scan_archives(jobs=args.jobs)
     resolve_all_tags()
-    save_database()
\ No newline at end of file
+    save_database()
+    run_report.save()
@@ -0,0 +1,103 @@
+import os
+import re
+
+# ================= CONFIGURATION =================
+# Liste perso (un nom par ligne, '#' pour commenter) : si le fichier existe, il remplace la liste ci-dessous
+LEGENDARY_FILE = "legendaries.txt"
+# False : un nom qui CONTIENT un légendaire est bloqué (prudent, "mewtwo_armored" est attrapé)
+# True : seulement l'espèce exacte ("mew" ne bloque plus ce qui contient "mew" par hasard)
+EXACT_SPECIES = False
+
+# La liste des cibles à abattre
+LEGENDARIES = [
+    "articuno", "zapdos", "moltres", "mewtwo", "mew",
+    "raikou", "entei", "suicune", "lugia", "hooh", "celebi",
+    "regirock", "regice", "registeel", "latias", "latios", "kyogre", "groudon", "rayquaza", "jirachi", "deoxys",
+    "uxie", "mesprit", "azelf", "dialga", "palkia", "heatran", "regigigas", "giratina", "cresselia", "phione", "manaphy", "darkrai", "shaymin", "arceus",
+    "victini", "cobalion", "terrakion", "virizion", "tornadus", "thundurus", "reshiram", "zekrom", "landorus", "kyurem", "keldeo", "meloetta", "genesect",
+    "xerneas", "yveltal", "zygarde", "diancie", "hoopa", "volcanion",
+    "typenull", "silvally", "tapukoko", "tapulele", "tapubulu", "tapufini", "cosmog", "cosmoem", "solgaleo", "lunala", "nihilego", "buzzwole", "pheromosa", "xurkitree", "celesteela", "kartana", "guzzlord", "necrozma", "magearna", "marshadow", "poipole", "naganadel", "stakataka", "blacephalon", "zeraora", "meltan", "melmetal",
+    "zacian", "zamazenta", "eternatus", "kubfu", "urshifu", "zarude", "regieleki", "regidrago", "glastrier", "spectrier", "calyrex", "enamorus",
+    "koraidon", "miraidon", "walkingwake", "ironleaves", "okidogi", "munkidori", "fezandipiti", "ogerpon", "terapagos",
+    "roaringmoon", "ironvaliant", "greattusk", "screamtail", "brutebonnet", "fluttermane", "sandyshocks", "ironbundle", "ironhands", "ironjugulis", "ironmoth", "ironthorns", "gougeingfire", "ragingbolt", "ironboulder", "ironcrown"
+]
+# =================================================
+
+def clean_legendary(name):
+    """'Tapu Koko', 'cobblemon:tapu_koko' -> 'tapukoko' (même forme que la liste)"""
+    return re.sub(r"[^a-z0-9]", "", name.lower().split(":")[-1])
+
+def species_key(name):
+    """
+    Espèce d'un nom de fichier, d'un chemin ou d'un champ 'pokemon' :
+    'data/cobblemon/spawn_pool_world/0150_mewtwo.json' -> 'mewtwo', 'cobblemon:vulpix alolan' -> 'vulpix'
+    """
+    name = name.lower().rsplit("/", 1)[-1].split(":")[-1]
+    if name.endswith(".json"): name = name[:-5]
+    name = re.sub(r"^\d+_", "", name)
+    words = name.split() # Après l'espace : les aspects (formes régionales, shiny...)
+    return re.sub(r"[^a-z0-9]", "", words[0]) if words else ""
+
+def load_legendaries(path=LEGENDARY_FILE):
+    if not os.path.exists(path): return list(LEGENDARIES)
+    names = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line: names.append(line)
+    print(f"📜 Liste des légendaires chargée depuis {path} ({len(names)} noms).")
+    return names
+
+def trie_pattern(names):
+    """
+    Expression régulière en forme d'arbre de préfixes : "mew", "mewtwo", "meltan" donnent
+    me(?:ltan|w(?:two)?). Le moteur avance lettre par lettre sans réessayer chaque nom
+    (le principe d'Aho-Corasick), et à position égale le nom le plus long l'emporte : "mewtwo" plutôt que "mew".
+    """
+    trie = {}
+    for name in names:
+        node = trie
+        for char in name: node = node.setdefault(char, {})
+        node[""] = None # Fin d'un nom
+
+    def pattern(node):
+        alternatives = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not alternatives: return ""
+        optional = "" in node
+        if len(alternatives) == 1 and (not optional or len(alternatives[0]) == 1):
+            body = alternatives[0]
+        else:
+            body = "(?:" + "|".join(alternatives) + ")"
+        return body + "?" if optional else body
+
+    return pattern(trie)
+
+class LegendaryMatcher:
+    """
+    Toute la liste compilée une fois : une seule expression régulière pour le mode "contient",
+    un ensemble pour l'espèce exacte. Un nom est testé en un seul passage au lieu d'une boucle sur ~130 mots.
+    """
+
+    def __init__(self, names, exact=False):
+        self.names = {clean_legendary(n) for n in names} - {""}
+        self.exact = exact
+        # Une liste vide ne doit rien bloquer (une regex vide trouverait tout)
+        self._search = re.compile(trie_pattern(self.names)).search if self.names else None
+
+    def match(self, name):
+        """Le légendaire reconnu dans 'name', ou None."""
+        if self.exact:
+            key = species_key(name)
+            return key if key in self.names else None
+        if self._search is None: return None
+        found = self._search(name.lower())
+        return found.group(0) if found else None
+
+_matcher = None
+
+def get_matcher():
+    """Le matcher partagé par 01 et 03, construit au premier appel."""
+    global _matcher
+    if _matcher is None:
+        _matcher = LegendaryMatcher(load_legendaries(), exact=EXACT_SPECIES)
+    return _matcher
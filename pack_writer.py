@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+import zipfile
+import filecmp
+
+import run_report
+
+# ================= CONFIGURATION =================
+# Empreintes des entrées de chaque pack, pour le mode --incremental
+STATE_FILE = "build_state.json"
+
+# Date fixe des entrées zip : deux générations identiques donnent le même .zip à l'octet près
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# =================================================
+
+def write_if_changed(path, text):
+    """
+    Écrit le fichier seulement si son contenu change.
+    Le reload des datapacks et le rsync vers le serveur ne voient ainsi que les vrais changements.
+    Renvoie True si le fichier a été (ré)écrit.
+    """
+    try:
+        with open(path, "r") as f:
+            if f.read() == text:
+                run_report.count("files_unchanged")
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    run_report.count("files_written")
+    return True
+
+def remove_stale_files(directory, keep_files, extension=".json"):
+    """Supprime les fichiers générés lors d'un run précédent qui n'ont plus lieu d'être."""
+    removed = 0
+    if not os.path.isdir(directory): return removed
+    for filename in os.listdir(directory):
+        if filename.endswith(extension) and filename not in keep_files:
+            os.remove(os.path.join(directory, filename))
+            removed += 1
+    return removed
+
+def fingerprint(value):
+    """Empreinte stable d'une valeur JSON (ou de bytes bruts)."""
+    if not isinstance(value, bytes):
+        value = json.dumps(value, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(value).hexdigest()
+
+class BuildState:
+    """
+    Empreintes des entrées utilisées au dernier run, par pack.
+    Seules les clés enregistrées pendant ce run sont sauvegardées : les disparus sont oubliés.
+    """
+
+    def __init__(self, stage, state_file=STATE_FILE):
+        self.stage = stage
+        self.state_file = state_file
+        try:
+            with open(state_file, "r") as f:
+                self.data = json.load(f)
+        except:
+            self.data = {}
+        self.previous = self.data.get(stage, {})
+        self.current = {}
+
+    def is_fresh(self, key, fp):
+        return self.previous.get(key) == fp
+
+    def record(self, key, fp):
+        self.current[key] = fp
+
+    def save(self):
+        self.data[self.stage] = self.current
+        with open(self.state_file, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+
+class DirectoryPack:
+    """Pack écrit en dossier (mode par défaut) : un fichier n'est réécrit que s'il change."""
+
+    def __init__(self, name):
+        self.name = name
+        self.root = os.path.join(os.getcwd(), name)
+        os.makedirs(self.root, exist_ok=True)
+
+    def write(self, relative_path, text):
+        """Renvoie True si le fichier a été (ré)écrit."""
+        return write_if_changed(os.path.join(self.root, relative_path), text)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class ZipPack(DirectoryPack):
+    """
+    Pack écrit directement dans <nom>.zip, avec une seule archive ouverte pour tout le run :
+    pas de makedirs ni d'open par fichier. Le zip est construit à côté puis remplace
+    l'ancien seulement si son contenu a changé.
+    Si un même chemin est écrit deux fois, la première version est gardée.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.path = os.path.join(os.getcwd(), f"{name}.zip")
+        self.tmp_path = self.path + ".tmp"
+        self.zip = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED)
+        self.names = set()
+
+    def write(self, relative_path, text):
+        name = relative_path.replace(os.sep, "/")
+        if name in self.names: return False
+        self.names.add(name)
+        info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self.zip.writestr(info, text)
+        run_report.count("files_written")
+        return True
+
+    def close(self):
+        self.zip.close()
+        if os.path.exists(self.path) and filecmp.cmp(self.tmp_path, self.path, shallow=False):
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, self.path)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Run interrompu : on garde l'ancien zip intact
+            self.zip.close()
+            os.remove(self.tmp_path)
+
+def open_pack(name, as_zip=False):
+    """Dossier <nom>/ par défaut, ou archive <nom>.zip avec as_zip."""
+    return ZipPack(name) if as_zip else DirectoryPack(name)
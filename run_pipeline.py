@@ -0,0 +1,63 @@
+import os
+import argparse
+import importlib.util
+
+from archive_scanner import scan_sources, SOURCE_DIRS
+import run_report
+
+# ================= CONFIGURATION =================
+# Les scripts sont lancés dans cet ordre, dans le même process :
+# mods/ et datapacks/ ne sont parcourus qu'une seule fois pour tout le monde.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# =================================================
+
+def load_script(name):
+    """Importe un script (ex: 01_unified_spawns.py) malgré son nom qui commence par un chiffre."""
+    path = os.path.join(SCRIPT_DIR, f"{name}.py")
+    spec = importlib.util.spec_from_file_location(name.lstrip("0123456789_") or name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@run_report.stage("run_pipeline")
+def run_all(jobs=1, incremental=False, as_zip=False):
+    print("--- 🚀 Pipeline complet (scan unique) ---")
+    scan = scan_sources(SOURCE_DIRS, jobs=jobs)
+    print(f"📦 {scan.archives_scanned} archives lues, {len(scan.entries)} fichiers utiles trouvés.")
+
+    biomes = load_script("extract_biomes")
+    biomes.scan_archives()
+    biomes.resolve_all_tags()
+    biomes.save_database()
+
+    load_script("00_full_block").process_everything(as_zip=as_zip)
+
+    # Importé après extract_biomes : il charge biome_database.json au démarrage
+    unified = load_script("01_unified_spawns")
+    unified.scan_everything()
+    unified.build_pack(incremental=incremental, as_zip=as_zip)
+
+    load_script("02_clean_spawns").process_files(incremental=incremental, as_zip=as_zip)
+    load_script("03_legendary_blocker").process_everything(as_zip=as_zip)
+
+    atlas = load_script("Atlas_pokemon")
+    atlas.scan_everything()
+    atlas.save_atlas(as_zip=as_zip)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lance toute la chaîne de génération avec un seul scan")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de process pour lire les archives (0 = tous les coeurs)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Ne recalcule et ne réécrit que les espèces dont les règles ont changé")
+    parser.add_argument("--zip", action="store_true",
+                        help="Écrit chaque pack directement dans une archive .zip au lieu d'un dossier")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    args = parser.parse_args()
+    if args.incremental and args.zip:
+        parser.error("--incremental réutilise les fichiers des dossiers générés : incompatible avec --zip")
+    if args.profile: run_report.enable()
+
+    run_all(jobs=args.jobs, incremental=args.incremental, as_zip=args.zip)
+    run_report.save()
@@ -1,91 +1,258 @@
+import asyncio
+from collections import OrderedDict
+
 import discord
-from discord.ext import commands
-import re
+from discord.ext import commands, tasks
+
+from atlas_index import AtlasIndex, files_stamp, format_odds
+from atlas_search import MAX_RESULTS, MAX_SUGGESTIONS
 
 # ================= CONFIGURATION =================
 # ⚠️ REMETS TON TOKEN ICI AVANT DE LANCER
 TOKEN = "" 
 ATLAS_FILE = "ATLAS_POKEMON.txt"
+INDEX_FILE = "ATLAS_INDEX.json"
+
+# Mots reconnus à la fin des recherches inverses (!biome cherry grove nuit pluie)
+TIME_WORDS = {"nuit": "night", "night": "night", "jour": "day", "day": "day",
+              "aube": "dawn", "dawn": "dawn", "crépuscule": "dusk", "crepuscule": "dusk", "dusk": "dusk"}
+WEATHER_WORDS = {"pluie": "rain", "rain": "rain", "orage": "thunder", "thunder": "thunder",
+                 "dégagé": "clear", "degage": "clear", "clear": "clear"}
+# Nombre max de noms affichés dans une réponse
+MAX_LISTED = 60
+# Embeds déjà construits gardés en mémoire (starters, Évoli... demandés en boucle)
+EMBED_CACHE_SIZE = 256
+# Limites Discord par message : 10 embeds, 6000 caractères au total
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_MESSAGE_CHARS = 6000
+# Toutes les X secondes, on regarde si l'Atlas a été régénéré (rechargement sans redémarrer)
+RELOAD_INTERVAL = 30
 # =================================================
 
 intents = discord.Intents.default()
 intents.message_content = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
-pokedex_data = {}
+atlas = None
+atlas_stamp = None # Dates de modification des fichiers lus au dernier chargement
+embed_cache = OrderedDict() # (version de l'Atlas, espèce) -> Embed, du plus ancien au plus récent
+
+def build_atlas():
+    """
+    Construit un Atlas complet (lecture + index de recherche) sans toucher à celui en service.
+    Tourne dans un thread : les commandes continuent de répondre avec l'ancien pendant ce temps.
+    """
+    stamp = files_stamp(INDEX_FILE, ATLAS_FILE)
+    return AtlasIndex.load(INDEX_FILE, ATLAS_FILE).warm(), stamp
 
 def load_atlas():
-    """Charge le fichier texte en mémoire"""
+    """Premier chargement de l'Atlas, avant la connexion du bot"""
+    global atlas, atlas_stamp
     print("--- Chargement de l'Atlas... ---")
-    current_poke = None
     try:
-        with open(ATLAS_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith("📌"):
-                    current_poke = line.replace("📌", "").strip().lower()
-                    pokedex_data[current_poke] = []
-                elif line.startswith("-") and current_poke:
-                    clean_line = line.replace("- ", "").strip()
-                    pokedex_data[current_poke].append(clean_line)
-        print(f"✅ Atlas chargé : {len(pokedex_data)} Pokémons en mémoire.")
+        atlas, atlas_stamp = build_atlas()
+        print(f"✅ Atlas chargé : {len(atlas)} Pokémons en mémoire.")
     except FileNotFoundError:
+        atlas, atlas_stamp = AtlasIndex({}), files_stamp(INDEX_FILE, ATLAS_FILE)
         print(f"❌ ERREUR : Le fichier {ATLAS_FILE} est introuvable.")
+    except (OSError, ValueError) as e:
+        # Index tronqué ou en cours d'écriture : le bot démarre quand même, watch_atlas le rechargera dès qu'il change
+        atlas, atlas_stamp = AtlasIndex({}), files_stamp(INDEX_FILE, ATLAS_FILE)
+        print(f"❌ ERREUR : Atlas illisible ({e}), le bot démarre sans.")
+
+@tasks.loop(seconds=RELOAD_INTERVAL)
+async def watch_atlas():
+    """Recharge l'Atlas quand Atlas_pokemon.py l'a régénéré"""
+    global atlas, atlas_stamp
+    if files_stamp(INDEX_FILE, ATLAS_FILE) == atlas_stamp: return
+    try:
+        new_atlas, stamp = await asyncio.to_thread(build_atlas)
+    except Exception as e:
+        # Fichier absent ou en cours d'écriture : on garde l'ancien et on réessaiera
+        print(f"⚠️ Rechargement de l'Atlas impossible : {e}")
+        return
+    # Une seule affectation : une commande voit l'ancien Atlas ou le nouveau, jamais un mélange
+    atlas, atlas_stamp = new_atlas, stamp
+    print(f"🔄 Atlas rechargé : {len(atlas)} Pokémons (version {atlas.version}).")
 
 @bot.event
 async def on_ready():
-    load_atlas()
+    # on_ready est rappelé à chaque reconnexion : l'Atlas est déjà en mémoire
+    if atlas is None:
+        load_atlas()
+    if not watch_atlas.is_running():
+        watch_atlas.start()
     print(f'🤖 Bot connecté en tant que {bot.user}')
-    print("Commandes dispos : !find <nom>, !spawn <nom>")
+    print("Commandes dispos : !find <nom>, !spawn <nom>, !biome <biome> [nuit|jour|pluie...], !night [biome], !day [biome], !where <y> [biome], !odds <nom>")
 
 # C'est ici que j'ai changé : nom de fonction 'find' + alias 'spawn'
 @bot.command(aliases=['spawn'])
 async def find(ctx, *, pokemon_name: str):
     """Cherche un Pokémon dans l'Atlas"""
     query = pokemon_name.lower().strip()
-    
-    # Recherche exacte
-    if query in pokedex_data:
-        matches = [query]
-    else:
-        # Recherche partielle
-        matches = [name for name in pokedex_data.keys() if query in name]
-    
+    # Copie locale : un rechargement pendant la commande ne change pas l'Atlas sous nos pieds
+    index = atlas
+
+    # Exact, puis début du nom, puis morceau du nom, puis faute de frappe
+    result = index.search(query)
+    matches = result.matches
+
     if not matches:
+        close = index.suggestions(query)
+        if close:
+            names = ", ".join(index.get(k)['name'] for k in close)
+            await ctx.send(f"❌ Désolé, je n'ai aucune info sur **{pokemon_name}**. Vouliez-vous dire : {names} ?")
+        else:
+            await ctx.send(f"❌ Désolé, je n'ai aucune info sur **{pokemon_name}** dans l'Atlas.")
+        return
+
+    if len(matches) > MAX_RESULTS:
+        # Les plus courts d'abord : souvent celui que le joueur cherchait
+        names = ", ".join(index.get(k)['name'] for k in matches[:MAX_SUGGESTIONS])
+        await ctx.send(f"⚠️ Trop de résultats ({len(matches)}) pour '{query}'. Vouliez-vous dire : {names} ?")
+        return
+
+    note = None
+    if result.kind == "fuzzy":
+        note = f"🔎 **{pokemon_name}** n'est pas dans l'Atlas, voici le plus proche :"
+
+    await send_embeds(ctx, [species_embed(index, k) for k in matches], note)
+
+def species_embed(index, poke_key):
+    """
+    Fiche d'un Pokémon, construite une seule fois par version de l'Atlas (cache LRU).
+    Après un rechargement, la version change : les anciennes fiches ne servent plus
+    et finissent par sortir du cache.
+    """
+    cache_key = (index.version, poke_key)
+    embed = embed_cache.get(cache_key)
+    if embed is not None:
+        embed_cache.move_to_end(cache_key)
+        return embed
+
+    entry = index.get(poke_key)
+    embed = discord.Embed(title=f"📌 Où trouver : {entry['name']}", color=0x00ff00)
+    # Description déjà mise en forme par Atlas_pokemon.py
+    embed.description = entry["description"]
+    embed.set_footer(text="Atlas Pokejadou • Données extraites du serveur")
+
+    embed_cache[cache_key] = embed
+    if len(embed_cache) > EMBED_CACHE_SIZE:
+        embed_cache.popitem(last=False)
+    return embed
+
+async def send_embeds(ctx, embeds, content=None):
+    """Regroupe les embeds dans le moins de messages possible (un seul appel à Discord en général)"""
+    batch, size = [], 0
+    for embed in embeds:
+        if batch and (len(batch) == MAX_EMBEDS_PER_MESSAGE or size + len(embed) > MAX_MESSAGE_CHARS):
+            await ctx.send(content=content, embeds=batch)
+            batch, size, content = [], 0, None
+        batch.append(embed)
+        size += len(embed)
+    if batch:
+        await ctx.send(content=content, embeds=batch)
+
+# --- RECHERCHES INVERSES : conditions -> Pokémon ---
+def parse_filters(text):
+    """'cherry grove nuit pluie' -> ('cherry grove', {'time': 'night', 'weather': 'rain'})"""
+    filters = {}
+    words = []
+    for word in (text or "").lower().split():
+        if word in TIME_WORDS: filters["time"] = TIME_WORDS[word]
+        elif word in WEATHER_WORDS: filters["weather"] = WEATHER_WORDS[word]
+        else: words.append(word)
+    return " ".join(words), filters
+
+async def send_species_list(ctx, index, title, keys):
+    if not keys:
+        await ctx.send(f"❌ Aucun Pokémon trouvé pour : {title}")
+        return
+    names = [index.get(k)['name'] if k in index else k.title() for k in keys]
+    text = ", ".join(names[:MAX_LISTED])
+    if len(names) > MAX_LISTED:
+        text += f"\n… et {len(names) - MAX_LISTED} autres."
+    embed = discord.Embed(title=f"🔎 {title}", color=0x00ff00, description=text)
+    embed.set_footer(text=f"{len(names)} Pokémon • Atlas Pokejadou")
+    await ctx.send(embed=embed)
+
+async def reverse_lookup(ctx, text, y=None, **filters):
+    """
+    Commun à !biome, !night, !day et !where.
+    Sans biome, seuls les spawns qui exigent la condition sont listés (sinon tout l'Atlas
+    sortirait) ; avec un biome, les règles sans heure / météo / altitude comptent aussi.
+    """
+    index = atlas
+    if not index.has_lookup():
+        await ctx.send("⚠️ L'index de l'Atlas est trop ancien pour cette commande : relancez Atlas_pokemon.py.")
+        return
+
+    biome_text, parsed = parse_filters(text)
+    filters.update(parsed)
+    labels = []
+
+    biome_key = None
+    if biome_text:
+        biome_key = index.resolve_biome(biome_text)
+        if biome_key is None:
+            await ctx.send(f"❌ Biome inconnu : **{biome_text}**")
+            return
+        labels.append(index.biome_names[biome_key])
+    elif not filters and y is None:
+        await ctx.send("⚠️ Précisez un biome, une heure, une météo ou une altitude (ex: !biome cherry grove nuit).")
+        return
+
+    labels += [f"{k} = {v}" for k, v in sorted(filters.items())]
+    if y is not None: labels.append(f"Y = {y}")
+    keys = index.find_species(biome=biome_key, y=y, strict=biome_key is None, **filters)
+    await send_species_list(ctx, index, " • ".join(labels), keys)
+
+@bot.command(aliases=['biomes'])
+async def biome(ctx, *, query: str):
+    """Pokémon d'un biome, avec en option une heure et une météo (!biome cherry grove nuit)"""
+    await reverse_lookup(ctx, query)
+
+@bot.command(aliases=['nuit'])
+async def night(ctx, *, biome_name: str = None):
+    """Pokémon de nuit (!night, ou !night forest)"""
+    await reverse_lookup(ctx, biome_name, time="night")
+
+@bot.command(aliases=['jour'])
+async def day(ctx, *, biome_name: str = None):
+    """Pokémon de jour (!day, ou !day forest)"""
+    await reverse_lookup(ctx, biome_name, time="day")
+
+@bot.command(aliases=['altitude'])
+async def where(ctx, y: int, *, biome_name: str = None):
+    """Pokémon qu'on trouve à une altitude donnée (!where -40, ou !where -40 lush caves)"""
+    await reverse_lookup(ctx, biome_name, y=y)
+
+# --- PROBABILITÉS (calculées par Atlas_pokemon.py avec spawn_odds.py) ---
+@bot.command(aliases=['chances'])
+async def odds(ctx, *, pokemon_name: str):
+    """Meilleures chances de tomber sur un Pokémon (!odds pikachu)"""
+    index = atlas
+    result = index.search(pokemon_name.lower().strip())
+    if not result.matches:
         await ctx.send(f"❌ Désolé, je n'ai aucune info sur **{pokemon_name}** dans l'Atlas.")
         return
 
-    if len(matches) > 5:
-        await ctx.send(f"⚠️ Trop de résultats ({len(matches)}) pour '{query}'. Soyez plus précis !")
+    entry = index.get(result.matches[0])
+    if "odds" not in entry:
+        await ctx.send("⚠️ Pas de probabilités dans l'Atlas : installez NumPy et relancez Atlas_pokemon.py.")
+        return
+    if not entry["odds"]:
+        await ctx.send(f"❓ **{entry['name']}** n'apparaît nulle part avec une chance notable.")
         return
 
-    for poke_key in matches:
-        real_name = poke_key.title()
-        infos = pokedex_data[poke_key]
-        
-        embed = discord.Embed(title=f"📌 Où trouver : {real_name}", color=0x00ff00)
-        
-        desc_text = ""
-        for info in infos:
-            parts = info.split("|")
-            formatted_line = ""
-            for part in parts:
-                if "Biomes" in part:
-                    formatted_line +=f"**{part.strip()}**\n"
-                else:
-                    formatted_line += f"└ {part.strip()}\n"
-            desc_text += formatted_line + "\n"
-            
-        if not desc_text:
-            desc_text = "❓ Aucune donnée de spawn précise (peut-être désactivé ou event)."
-            
-        embed.description = desc_text
-        embed.set_footer(text="Atlas Pokejadou • Données extraites du serveur")
-        
-        await ctx.send(embed=embed)
+    lines = [f"└ {format_odds(o)}" for o in entry["odds"]]
+    embed = discord.Embed(title=f"📊 Chances de trouver : {entry['name']}", color=0x00ff00, description="\n".join(lines))
+    embed.set_footer(text="Sachant qu'un Pokémon apparaît à cet endroit • Atlas Pokejadou")
+    await ctx.send(embed=embed)
 
 if __name__ == "__main__":
     if TOKEN == "":
         print("❌ ERREUR : Veuillez configurer votre TOKEN Discord dans le script avant de lancer le bot.")
     else:
+        load_atlas()
         bot.run(TOKEN)
\ No newline at end of file
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import time
+import functools
+
+try:
+    import resource  # Absent sous Windows : pas de mémoire max dans le rapport
+except ImportError:
+    resource = None
+
+# ================= CONFIGURATION =================
+# Rapport écrit par les scripts lancés avec --profile
+REPORT_FILE = "run_report.json"
+# =================================================
+
+_report = None  # None = instrumentation coupée (le cas normal, sans --profile)
+
+def peak_rss_mb():
+    """Mémoire max du process (et de ses process --jobs) depuis son lancement, en Mo."""
+    if resource is None: return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux compte en Ko, macOS en octets
+    unit = 1 if sys.platform == "darwin" else 1024
+    return round(max(own, children) * unit / 1e6, 1)
+
+class Report:
+    def __init__(self):
+        self.stages = {}
+        self.order = []
+        self.archives = []
+        self.stack = []
+
+    def begin(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "counters": {}}
+            if self.stack: stage["parent"] = self.stack[-1][0]
+            self.order.append(name)
+        self.stack.append((name, time.perf_counter(), time.process_time()))
+
+    def end(self):
+        name, wall, cpu = self.stack.pop()
+        stage = self.stages[name]
+        stage["calls"] += 1
+        stage["wall_s"] = round(stage["wall_s"] + time.perf_counter() - wall, 4)
+        stage["cpu_s"] = round(stage["cpu_s"] + time.process_time() - cpu, 4)
+        stage["peak_rss_mb"] = peak_rss_mb()
+
+    def count(self, key, n):
+        if not self.stack: return
+        counters = self.stages[self.stack[-1][0]]["counters"]
+        counters[key] = counters.get(key, 0) + n
+
+def enable():
+    """À appeler par les scripts lancés avec --profile."""
+    global _report
+    if _report is None: _report = Report()
+
+def is_enabled():
+    return _report is not None
+
+def stage(name):
+    """
+    Décorateur : temps réel, temps CPU, compteurs et mémoire max d'une étape.
+    Sans --profile, la fonction est appelée telle quelle.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _report is None: return func(*args, **kwargs)
+            _report.begin(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _report.end()
+        return wrapper
+    return decorate
+
+def count(key, n=1):
+    """Ajoute n au compteur 'key' de l'étape en cours (octets lus, erreurs JSON...)."""
+    if _report is not None: _report.count(key, n)
+
+def archive(path, **metrics):
+    """Détail d'une archive du scan (statut, taille, entrées, temps...)."""
+    if _report is not None: _report.archives.append(dict(path=path, **metrics))
+
+def save(report_file=REPORT_FILE):
+    """
+    Écrit le rapport. Les étapes d'un run précédent (autre script) sont gardées :
+    lancer les scripts un par un avec --profile donne un rapport complet à la fin.
+    """
+    if _report is None: return
+    try:
+        with open(report_file, "r") as f:
+            data = json.load(f)
+    except:
+        data = {}
+
+    stages = data.get("stages", {})
+    for name in _report.order:
+        stages[name] = dict(_report.stages[name], finished_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    data["stages"] = stages
+    if _report.archives:
+        data["archives"] = _report.archives
+    data["peak_rss_mb"] = peak_rss_mb()
+
+    with open(report_file, "w") as f:
+        json.dump(data, f, indent=2)
+
+    print(f"--- 📊 Profil ({os.path.basename(report_file)}) ---")
+    for name in _report.order:
+        s = _report.stages[name]
+        indent = "   " if "parent" in s else ""
+        extras = ", ".join(f"{k} {v}" for k, v in sorted(s["counters"].items()))
+        print(f"{indent}⏱️ {name} : {s['wall_s']:.2f}s (CPU {s['cpu_s']:.2f}s)" + (f" — {extras}" if extras else ""))
@@ -0,0 +1,216 @@
+import os
+import re
+import json
+import hashlib
+import zipfile
+import argparse
+
+from archive_scanner import scan_sources, load_cache_snapshot, read_archive, is_archive, ScanResult
+from atlas_formats import atomic_open
+import run_report
+
+# ================= CONFIGURATION =================
+# Changelog lisible et version structurée (pour un bot, un site, un script de release...)
+OUTPUT_FILE = "SPAWN_DIFF.txt"
+JSON_FILE = "SPAWN_DIFF.json"
+# Champs ignorés pour comparer deux règles : 01 et 02 renumérotent les "id" à chaque génération
+IGNORED_RULE_KEYS = ("id",)
+# Une règle sans liste de biomes compte pour ce "biome"
+EVERYWHERE = "partout"
+# =================================================
+
+encode_rule = json.JSONEncoder(sort_keys=True, separators=(",", ":")).encode
+
+def load_snapshot(path):
+    """
+    Un état des spawns, selon ce qu'on donne :
+    - un dossier (pack généré par 01/02, datapacks, mods...) : scanné comme les autres scripts, sans cache ;
+    - un .zip / .jar : lu directement ;
+    - un autre fichier : une copie de scan_cache.sqlite (rien n'est relu, c'est le plus rapide).
+    """
+    if os.path.isdir(path):
+        return scan_sources([os.path.abspath(path)], use_cache=False)
+    if is_archive(path):
+        result = ScanResult()
+        result.add(read_archive(path)[3])
+        return result
+    return load_cache_snapshot(path)
+
+def species_name(raw):
+    """'cobblemon:rattata alolan', '0019_rattata' -> 'rattata alolan', 'rattata'"""
+    name = str(raw).lower().replace("cobblemon:", "")
+    name = re.sub(r"^\d+_", "", name)
+    return " ".join(name.replace("_", " ").split())
+
+def rule_digest(rule):
+    """Empreinte d'une règle (sans son id) : deux règles identiques ont la même, quel que soit l'ordre des clés."""
+    compact = {k: v for k, v in rule.items() if k not in IGNORED_RULE_KEYS}
+    return hashlib.blake2b(encode_rule(compact).encode(), digest_size=16).digest()
+
+@run_report.stage("spawn_diff.spawn_table")
+def spawn_table(scan):
+    """
+    {espèce: {empreinte de règle: règle}} pour tous les fichiers actifs. Les copies d'une même règle
+    (addons, datapacks qui recopient un jar) se confondent, comme dans l'Atlas.
+    """
+    table = {}
+    docs_seen = set() # Un contenu identique (même document partagé par le scan) n'est parcouru qu'une fois
+    for entry in scan.spawn_files:
+        data = entry.load()
+        if id(data) in docs_seen or not isinstance(data, dict): continue
+        docs_seen.add(id(data))
+        if data.get("enabled") == False: continue
+        if not isinstance(data.get("spawns"), list): continue
+
+        default_name = entry.filename.replace(".json", "")
+        for rule in data["spawns"]:
+            if not isinstance(rule, dict): continue
+            name = species_name(rule.get("pokemon", default_name))
+            table.setdefault(name, {})[rule_digest(rule)] = rule
+    return table
+
+def species_digest(rules):
+    """Empreinte d'une espèce : ses règles, dans n'importe quel ordre."""
+    return hashlib.blake2b(b"".join(sorted(rules)), digest_size=16).digest()
+
+def rule_biomes(rule):
+    cond = rule.get("condition", {})
+    biomes = cond.get("biomes") if isinstance(cond, dict) else None
+    return set(biomes) if biomes else {EVERYWHERE}
+
+def describe_rule(rule):
+    """Résumé d'une règle pour le changelog : 'common, grounded, #minecraft:is_forest, night'"""
+    cond = rule.get("condition", {})
+    if not isinstance(cond, dict): cond = {}
+    parts = [str(rule.get("bucket", "common")), str(rule.get("context", "grounded"))]
+    parts.append(", ".join(cond.get("biomes") or [EVERYWHERE]))
+    for key in ("timeRange", "weather", "canSeeSky", "minY", "maxY"):
+        if key in cond: parts.append(f"{key}={cond[key]}")
+    return ", ".join(parts)
+
+def compare_species(old_rules, new_rules):
+    """Détail d'une espèce dont l'empreinte a changé : biomes gagnés / perdus, poids modifiés, règles en plus / en moins."""
+    removed = [old_rules[h] for h in old_rules if h not in new_rules]
+    added = [new_rules[h] for h in new_rules if h not in old_rules]
+
+    # Même règle à part le poids : c'est un changement de poids, pas une règle de plus et une de moins
+    weights = []
+    by_shape = {}
+    for rule in removed:
+        shape = rule_digest({k: v for k, v in rule.items() if k != "weight"})
+        by_shape.setdefault(shape, []).append(rule)
+    still_added = []
+    for rule in added:
+        candidates = by_shape.get(rule_digest({k: v for k, v in rule.items() if k != "weight"}))
+        if candidates:
+            old = candidates.pop(0)
+            weights.append({"rule": describe_rule(rule), "old": old.get("weight"), "new": rule.get("weight")})
+        else:
+            still_added.append(rule)
+    still_removed = [rule for rules in by_shape.values() for rule in rules]
+
+    old_biomes = set().union(*(rule_biomes(r) for r in old_rules.values()))
+    new_biomes = set().union(*(rule_biomes(r) for r in new_rules.values()))
+    return {
+        "biomes_gained": sorted(new_biomes - old_biomes),
+        "biomes_lost": sorted(old_biomes - new_biomes),
+        "weights": weights,
+        "rules_added": [describe_rule(r) for r in still_added],
+        "rules_removed": [describe_rule(r) for r in still_removed],
+    }
+
+@run_report.stage("spawn_diff.diff_tables")
+def diff_tables(old, new):
+    """
+    Changelog structuré entre deux tables de spawn_table. Les empreintes par espèce sont comparées
+    d'abord : seules les espèces qui ont vraiment changé sont examinées règle par règle.
+    """
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = []
+    unchanged = 0
+    for name in sorted(set(old) & set(new)):
+        if species_digest(old[name]) == species_digest(new[name]):
+            unchanged += 1
+            continue
+        changed.append(dict(species=name, **compare_species(old[name], new[name])))
+
+    return {
+        "summary": {"species_before": len(old), "species_after": len(new), "added": len(added),
+                    "removed": len(removed), "changed": len(changed), "unchanged": unchanged},
+        "added": [{"species": name, "rules": len(new[name]),
+                   "biomes": sorted(set().union(*(rule_biomes(r) for r in new[name].values())))} for name in added],
+        "removed": [{"species": name, "rules": len(old[name])} for name in removed],
+        "changed": changed,
+    }
+
+def write_text(changelog, path, old_label, new_label):
+    summary = changelog["summary"]
+    with atomic_open(path) as f:
+        f.write("==================================================\n")
+        f.write("       CHANGEMENTS DES SPAWNS\n")
+        f.write("==================================================\n\n")
+        f.write(f"Avant : {old_label} ({summary['species_before']} espèces)\n")
+        f.write(f"Après : {new_label} ({summary['species_after']} espèces)\n\n")
+
+        if changelog["added"]:
+            f.write(f"➕ Nouvelles espèces ({summary['added']})\n")
+            for item in changelog["added"]:
+                f.write(f"   - {item['species'].title()} : {', '.join(item['biomes'])}\n")
+            f.write("\n")
+        if changelog["removed"]:
+            f.write(f"➖ Espèces disparues ({summary['removed']})\n")
+            for item in changelog["removed"]:
+                f.write(f"   - {item['species'].title()}\n")
+            f.write("\n")
+
+        for item in changelog["changed"]:
+            block = [f"📌 {item['species'].title()}\n"]
+            if item["biomes_gained"]: block.append(f"   🌍 Biomes gagnés : {', '.join(item['biomes_gained'])}\n")
+            if item["biomes_lost"]: block.append(f"   🚫 Biomes perdus : {', '.join(item['biomes_lost'])}\n")
+            for change in item["weights"]:
+                block.append(f"   ⚖️ Poids {change['old']} → {change['new']} ({change['rule']})\n")
+            for rule in item["rules_added"]: block.append(f"   ➕ Règle : {rule}\n")
+            for rule in item["rules_removed"]: block.append(f"   ➖ Règle : {rule}\n")
+            block.append("\n")
+            f.write("".join(block))
+    os.replace(path + ".tmp", path)
+
+def write_json(changelog, path, old_label, new_label):
+    with atomic_open(path) as f:
+        json.dump(dict(before=old_label, after=new_label, **changelog), f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+@run_report.stage("spawn_diff.load")
+def load_table(path):
+    return spawn_table(load_snapshot(path))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare les spawns de deux versions du modpack")
+    parser.add_argument("before", help="Ancien état : copie de scan_cache.sqlite, pack généré (dossier ou .zip), ou dossier de mods")
+    parser.add_argument("after", help="Nouvel état (mêmes possibilités)")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Changelog lisible")
+    parser.add_argument("--json", default=JSON_FILE, help="Changelog structuré")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Mesure chaque étape (temps, CPU, octets lus, mémoire) dans {run_report.REPORT_FILE}")
+    args = parser.parse_args()
+    if args.profile: run_report.enable()
+
+    print("--- 🔍 Comparaison des spawns ---")
+    tables = []
+    for path in (args.before, args.after):
+        try:
+            tables.append(load_table(path))
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            parser.error(f"impossible de lire {path} : {e}")
+        print(f"📂 {path} : {len(tables[-1])} espèces.")
+
+    changelog = diff_tables(*tables)
+    write_text(changelog, args.output, args.before, args.after)
+    write_json(changelog, args.json, args.before, args.after)
+
+    summary = changelog["summary"]
+    print(f"✅ {summary['added']} nouvelles espèces, {summary['removed']} disparues, "
+          f"{summary['changed']} modifiées, {summary['unchanged']} inchangées.")
+    print(f"👉 Ouvre '{args.output}' (ou '{args.json}').")
+    run_report.save()
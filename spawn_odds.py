@@ -0,0 +1,254 @@
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # Facultatif : sans NumPy, l'Atlas et le bot n'affichent simplement pas les probabilités
+    np = None
+
+from atlas_index import biome_display_name, rule_conditions, TIMES, TIME_RANGES
+from biome_table import BiomeTable, mask_from_hex
+
+# ================= CONFIGURATION =================
+# Chance de chaque "bucket" de Cobblemon (valeurs par défaut de la config du mod)
+BUCKET_WEIGHTS = {"common": 94.4, "uncommon": 5.0, "rare": 0.5, "ultra-rare": 0.1}
+DEFAULT_BUCKET = "common"
+DEFAULT_CONTEXT = "grounded"
+
+# Cases de météo, et ce que couvre chaque valeur des règles (une valeur inconnue couvre tout).
+# Les moments (TIMES, TIME_RANGES) viennent de atlas_index : les recherches du bot utilisent la même table
+WEATHERS = ("clear", "rain", "thunder")
+# Il pleut aussi pendant un orage
+WEATHER_RANGES = {"clear": ("clear",), "rain": ("rain", "thunder"), "thunder": ("thunder",)}
+
+# Meilleurs biomes gardés par espèce (Atlas, index du bot)
+ODDS_PER_SPECIES = 5
+# En dessous, la chance n'est pas affichée
+MIN_PROBABILITY = 1e-4
+# Nom de la seule colonne quand aucun biome n'est connu (pas de biome_database.json, règles globales)
+EVERYWHERE = "Partout"
+# =================================================
+
+BUCKETS = list(BUCKET_WEIGHTS)
+
+def available():
+    return np is not None
+
+def _cells(value, ranges, axis):
+    """Indices des cases couvertes par une valeur de règle (None = toutes)."""
+    if value is None: return tuple(range(len(axis)))
+    covered = ranges.get(str(value).lower(), axis)
+    return tuple(axis.index(v) for v in covered)
+
+def _display_names(names):
+    """Noms affichés des colonnes. Deux biomes qui donneraient le même nom gardent leur namespace."""
+    display = [biome_display_name(b) if b != EVERYWHERE else b for b in names]
+    counts = Counter(display)
+    display = [f"{d} ({b.split(':')[0]})" if counts[d] > 1 and ":" in b else d for d, b in zip(display, names)]
+    # Même namespace aussi ('mod:foo_bar' et 'mod:foo/bar') : l'identifiant complet
+    counts = Counter(display)
+    return [b if counts[d] > 1 else d for d, b in zip(display, names)]
+
+class OddsBuilder:
+    """
+    Reçoit les règles espèce par espèce (pendant l'écriture de l'Atlas), puis prépare
+    les probabilités avec NumPy (voir SpawnOdds).
+
+    Le modèle : à un endroit (biome, moment, météo, contexte), le jeu tire un bucket parmi ceux
+    qui ont au moins un spawn possible (selon BUCKET_WEIGHTS), puis une règle de ce bucket au
+    prorata de son poids. La probabilité d'une espèce est donc, sachant qu'un Pokémon apparaît :
+        somme sur ses règles de  chance(bucket) * poids(règle) / poids total du bucket ici
+    L'altitude et la vue du ciel ne sont pas des axes : une règle compte dans tout le biome.
+    """
+
+    def __init__(self, biome_db=None):
+        biome_db = biome_db or {}
+        self.table = BiomeTable.from_database(biome_db)
+        self.tag_masks = {tag: mask_from_hex(m) for tag, m in biome_db.get("tag_masks", {}).items()}
+        self.species = []
+        self.contexts = {}
+        self.patterns = {}  # (contexte, cases de temps, cases de météo) -> numéro
+        self.masks = {}     # liste de biomes d'une règle -> masque (None = partout)
+        self.groups = {}    # (bucket, motif, espèce, masque) -> poids total
+        self.unknown_tags = set()
+
+    def _mask(self, biomes):
+        key = tuple(biomes)
+        if key in self.masks: return self.masks[key]
+        mask = None
+        if biomes:
+            mask = 0
+            for biome in biomes:
+                if not biome.startswith("#"):
+                    mask |= self.table.bit(biome)
+                elif biome[1:] in self.tag_masks:
+                    mask |= self.tag_masks[biome[1:]]
+                else:
+                    # Tag absent de biome_database.json : on ne sait pas où il s'applique, la règle n'y compte pas
+                    # (en faire une colonne lui donnerait une chance gonflée, seul dans un "biome" imaginaire)
+                    self.unknown_tags.add(biome)
+        self.masks[key] = mask
+        return mask
+
+    def add(self, name, rules):
+        s = len(self.species)
+        self.species.append(name)
+        for rule in rules:
+            weight = rule.get("weight", 1.0)
+            if not isinstance(weight, (int, float)) or weight <= 0: continue
+            cond = rule_conditions(rule)
+            k = BUCKETS.index(rule["bucket"]) if rule.get("bucket") in BUCKET_WEIGHTS else BUCKETS.index(DEFAULT_BUCKET)
+            context = self.contexts.setdefault(str(cond.get("context", DEFAULT_CONTEXT)).lower(), len(self.contexts))
+            pattern_key = (context, _cells(cond.get("time"), TIME_RANGES, TIMES),
+                           _cells(cond.get("weather"), WEATHER_RANGES, WEATHERS))
+            p = self.patterns.setdefault(pattern_key, len(self.patterns))
+            group = (k, p, s, self._mask(cond.get("biomes", [])))
+            self.groups[group] = self.groups.get(group, 0.0) + weight
+
+    def compute(self):
+        """Poids par espèce et facteurs de chaque bucket dans chaque case (voir SpawnOdds)."""
+        if self.unknown_tags:
+            shown = ", ".join(sorted(self.unknown_tags)[:5]) + (", ..." if len(self.unknown_tags) > 5 else "")
+            print(f"⚠️ {len(self.unknown_tags)} tag(s) absent(s) de biome_database.json, ignoré(s) pour les probabilités : {shown}")
+        if not len(self.table) and self.groups: self.table.intern(EVERYWHERE)
+        n_biomes = len(self.table)
+        n_cells = len(self.contexts) * len(TIMES) * len(WEATHERS)
+        odds = SpawnOdds(self.species, _display_names(self.table.names), list(self.contexts))
+        if not self.groups: return odds
+
+        # Masques (int) -> lignes de booléens, une fois par masque distinct
+        everywhere = (1 << n_biomes) - 1
+        distinct = {}
+        keys = sorted(self.groups, key=lambda g: (g[0], g[1], g[2]))
+        mask_ids = [distinct.setdefault(everywhere if g[3] is None else g[3], len(distinct)) for g in keys]
+        n_bytes = (n_biomes + 7) // 8
+        packed = np.frombuffer(b"".join(m.to_bytes(n_bytes, "little") for m in distinct), dtype=np.uint8)
+        rows = np.unpackbits(packed.reshape(len(distinct), n_bytes), axis=1, bitorder="little")[:, :n_biomes]
+
+        # Poids par (bucket, motif, espèce) et par biome : une somme par groupe de lignes consécutives
+        weights = np.array([self.groups[g] for g in keys], dtype=np.float32)
+        weighted = rows[mask_ids] * weights[:, None]
+        group_ids = np.array([g[:3] for g in keys], dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, (np.diff(group_ids, axis=0) != 0).any(axis=1)])
+        per_species = weighted[starts]
+        # La plupart des groupes n'ont qu'une ligne : on ne somme que les autres
+        lengths = np.diff(np.r_[starts, len(keys)])
+        several = lengths > 1
+        if several.any():
+            merged = weighted[np.repeat(several, lengths)]
+            merged_starts = np.r_[0, np.cumsum(lengths[several])[:-1]]
+            per_species[several] = np.add.reduceat(merged, merged_starts, axis=0)
+        del weighted
+        kps = group_ids[starts]
+
+        # Blocs (bucket, motif) : les espèces y sont toutes différentes, les += vectorisés sont sûrs
+        block_starts = np.flatnonzero(np.r_[True, (np.diff(kps[:, :2], axis=0) != 0).any(axis=1)])
+        block_ends = np.r_[block_starts[1:], len(kps)]
+        cells = self._pattern_cells()
+
+        # 1. Poids total de chaque bucket dans chaque case, et les blocs qui touchent chaque case
+        totals = np.zeros((len(BUCKETS), n_cells, n_biomes))
+        blocks = [[] for _ in range(n_cells)]
+        for start, end in zip(block_starts.tolist(), block_ends.tolist()):
+            k, p = int(kps[start, 0]), int(kps[start, 1])
+            totals[k, cells[p], :] += per_species[start:end].sum(axis=0)
+            for x in cells[p].tolist():
+                blocks[x].append((start, end, k))
+
+        # 2. Chance de chaque bucket là où il a au moins un spawn, puis facteur chance / poids total
+        present = totals > 0
+        bucket_share = np.array([BUCKET_WEIGHTS[b] for b in BUCKETS])[:, None, None] * present
+        share_sum = bucket_share.sum(axis=0)
+        np.divide(bucket_share, share_sum, out=bucket_share, where=share_sum > 0)
+        factor = np.divide(bucket_share, totals, out=np.zeros_like(totals), where=present)
+
+        odds.weights, odds.species_ids = per_species, kps[:, 2]
+        odds.blocks, odds.factor = blocks, factor.astype(np.float32)
+        return odds
+
+    def _pattern_cells(self):
+        """Motif -> indices des cases (contexte, moment, météo) qu'il couvre."""
+        cells = [None] * len(self.patterns)
+        for (context, times, weathers), p in self.patterns.items():
+            cells[p] = np.array([(context * len(TIMES) + t) * len(WEATHERS) + w for t in times for w in weathers])
+        return cells
+
+class SpawnOdds:
+    """
+    Probabilités case par case, avec case = (contexte, moment, météo) aplatie : cell(x)[espèce, biome]
+    est la chance que le Pokémon qui apparaît soit cette espèce. Chaque case où quelque chose spawn
+    somme à 1. Le tenseur complet (cases x espèces x biomes) n'est jamais construit : chaque case est
+    calculée puis réduite aussitôt, la mémoire reste celle d'une case.
+    """
+
+    def __init__(self, species, biomes, contexts):
+        self.species = species
+        self.biomes = biomes
+        self.contexts = contexts
+        self.n_cells = len(contexts) * len(TIMES) * len(WEATHERS)
+        # Rempli par OddsBuilder.compute()
+        self.weights = None        # lignes (bucket, motif, espèce) x biome
+        self.species_ids = None    # espèce de chaque ligne
+        self.blocks = [[] for _ in range(self.n_cells)] # case -> [(début, fin, bucket)] des lignes qui la touchent
+        self.factor = None         # [bucket, case, biome] : chance du bucket / poids total du bucket
+
+    def cell(self, x):
+        """Tableau espèce x biome d'une case."""
+        probabilities = np.zeros((len(self.species), len(self.biomes)), dtype=np.float32)
+        for start, end, k in self.blocks[x]:
+            probabilities[self.species_ids[start:end]] += self.weights[start:end] * self.factor[k, x]
+        return probabilities
+
+    def filled_cells(self):
+        return [x for x in range(self.n_cells) if self.blocks[x]]
+
+    def best(self, count=ODDS_PER_SPECIES):
+        """
+        {espèce: [meilleures chances]} : pour chaque biome, la meilleure case, puis les 'count'
+        meilleurs biomes. Le moment (ou la météo) n'est cité que s'il change quelque chose.
+        """
+        result = {}
+        if not len(self.biomes) or not len(self.species): return result
+        # Aucune règle au poids valide : pas une seule case, personne n'apparaît nulle part
+        if not self.contexts: return {name: [] for name in self.species}
+        n_species = len(self.species)
+        count = min(count, len(self.biomes))
+
+        # 1er passage : meilleure valeur (et première case qui l'atteint) de chaque espèce dans chaque biome
+        best_value = np.zeros((n_species, len(self.biomes)), dtype=np.float32)
+        best_cell = np.zeros(best_value.shape, dtype=np.int32)
+        for x in self.filled_cells():
+            probabilities = self.cell(x)
+            better = probabilities > best_value
+            np.copyto(best_value, probabilities, where=better)
+            best_cell[better] = x
+        top = np.argpartition(-best_value, count - 1, axis=1)[:, :count]
+        species_ids = np.arange(n_species)[:, None]
+        value = best_value[species_ids, top]
+        c, t, w = np.unravel_index(best_cell[species_ids, top], (len(self.contexts), len(TIMES), len(WEATHERS)))
+        del best_value, best_cell
+
+        # 2e passage : seulement les meilleurs biomes de chaque espèce, dans toutes les cases,
+        # pour savoir si le moment ou la météo changent la chance (les cases voisines de la gagnante)
+        at_top = np.zeros((self.n_cells, n_species, count), dtype=np.float32)
+        for x in self.filled_cells():
+            at_top[x] = self.cell(x)[species_ids, top]
+        grid = at_top.reshape(len(self.contexts), len(TIMES), len(WEATHERS), n_species, count)
+        s, j = species_ids[..., None], np.arange(count)[None, :, None]
+        by_time = grid[c[..., None], np.arange(len(TIMES)), w[..., None], s, j]
+        by_weather = grid[c[..., None], t[..., None], np.arange(len(WEATHERS)), s, j]
+        time_matters = ~np.isclose(by_time, value[..., None]).all(axis=-1)
+        weather_matters = ~np.isclose(by_weather, value[..., None]).all(axis=-1)
+
+        rows = zip(top.tolist(), value.tolist(), c.tolist(), t.tolist(), w.tolist(),
+                   time_matters.tolist(), weather_matters.tolist())
+        for name, row in zip(self.species, rows):
+            entries = []
+            for b, probability, c, t, w, timed, weathered in sorted(
+                    zip(*row), key=lambda e: (-e[1], self.biomes[e[0]])):
+                if probability < MIN_PROBABILITY: break
+                entry = {"biome": self.biomes[b], "probability": round(probability, 6), "context": self.contexts[c]}
+                if timed: entry["time"] = TIMES[t]
+                if weathered: entry["weather"] = WEATHERS[w]
+                entries.append(entry)
+            result[name] = entries
+        return result
@@ -0,0 +1,112 @@
+from biome_table import BiomeTable
+
+# ================= CONFIGURATION =================
+# Biome utilisé quand un fichier de spawn contient un biome vide ("")
+OVERWORLD_FALLBACK = "#cobblemon:is_overworld"
+
+# Clés qui ne comptent pas pour savoir si deux règles sont "les mêmes" (hors biomes)
+SIGNATURE_IGNORED_KEYS = ("id", "_comment", "weight", "q", "bucket_weight")
+# =================================================
+
+def freeze(value):
+    """
+    Version hashable d'une valeur JSON.
+    Deux valeurs gelées sont égales si et seulement si json.dumps(sort_keys=True) l'est :
+    les bool et les float sont étiquetés pour que 1, 1.0 et true restent différents.
+    """
+    if isinstance(value, dict):
+        return ("{", tuple(sorted((k, freeze(v)) for k, v in value.items())))
+    if isinstance(value, list):
+        return ("[", tuple(freeze(v) for v in value))
+    if isinstance(value, (bool, float)):
+        return (type(value).__name__, value)
+    return value
+
+def _sorted_lists(cond, skip=None):
+    return {k: sorted(v) if isinstance(v, list) else v for k, v in cond.items() if k != skip}
+
+def core_signature(rule):
+    """Tout ce qui définit une règle, sauf ses biomes, son poids et son id."""
+    items = []
+    for k, v in rule.items():
+        if k in SIGNATURE_IGNORED_KEYS: continue
+        # Les listes des conditions sont triées : l'ordre n'y a pas de sens
+        if k == "condition" and isinstance(v, dict): v = _sorted_lists(v, skip="biomes")
+        elif k == "anticondition" and isinstance(v, dict): v = _sorted_lists(v)
+        items.append((k, freeze(v)))
+    return tuple(sorted(items))
+
+class SpawnRule:
+    """
+    Règle de spawn normalisée une seule fois à la collecte.
+    'data' est le JSON d'origine (jamais modifié), 'biomes' la liste déjà corrigée
+    (vide pour une règle globale) et 'signature' la clé de regroupement hashable.
+    Avec une BiomeTable, 'biome_ids' donne l'ID entier de chaque biome de 'biomes'.
+    """
+    __slots__ = ("data", "biomes", "biome_ids", "signature", "weight")
+
+    def __init__(self, data, biome_table=None):
+        self.data = data
+        biomes = data.get("condition", {}).get("biomes", [])
+        if biomes:
+            # On remplace le vide par Overworld (sinon le spawn disparaît du jeu)
+            self.biomes = tuple(OVERWORLD_FALLBACK if not b or b.strip() == "" else b for b in biomes)
+        else:
+            self.biomes = ()
+        self.biome_ids = tuple(biome_table.intern(b) for b in self.biomes) if biome_table is not None else None
+        self.signature = core_signature(data)
+        self.weight = data.get("weight", 1.0)
+
+# --- NETTOYAGE : INDEX DE SUBSOMPTION ---
+# Conditions qui doivent être identiques quand la règle générale les précise
+CONDITION_MATCH_KEYS = ("timeRange", "weather", "canSeeSky")
+
+def _hashable(value):
+    """Clé de dict qui garde l'égalité Python (contrairement à freeze, 1 == 1.0 == True ici)."""
+    if isinstance(value, dict):
+        return ("{", frozenset((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ("[", tuple(_hashable(v) for v in value))
+    return value
+
+class SubsumptionIndex:
+    """
+    Règles déjà gardées par clean_rules(), indexées pour savoir en une recherche si l'une
+    d'elles est un cas particulier d'une nouvelle règle (même résultat que is_subset()).
+
+    Chaque règle gardée est rangée sous les 8 combinaisons possibles de clés de
+    CONDITION_MATCH_KEYS : une règle candidate ne consulte que le seau qui correspond
+    exactement aux clés qu'elle précise. Dans un seau, les biomes sont des masques
+    d'entiers : "A est inclus dans B" devient A & ~B == 0.
+    """
+
+    def __init__(self, biome_table=None):
+        self.buckets = {}  # (contexte, clés précisées, valeurs) -> set de masques de biomes
+        # Les biomes sont comparés comme des IDs opaques : un tag n'est pas développé
+        self.biome_table = biome_table if biome_table is not None else BiomeTable()
+
+    def _describe(self, rule):
+        ctx = rule.get("context", rule.get("spawnablePositionType", "grounded"))
+        cond = rule.get("condition", {})
+        values = tuple(_hashable(cond.get(k)) for k in CONDITION_MATCH_KEYS)
+        return _hashable(ctx), values, self.biome_table.mask(cond.get("biomes", []))
+
+    def add(self, rule):
+        ctx, values, mask = self._describe(rule)
+        for keys in range(1 << len(CONDITION_MATCH_KEYS)):
+            picked = tuple(v for i, v in enumerate(values) if keys & (1 << i))
+            self.buckets.setdefault((ctx, keys, picked), set()).add(mask)
+
+    def covers(self, rule):
+        """True si une règle gardée est un cas particulier de 'rule' (qui est donc redondante)."""
+        ctx, values, mask = self._describe(rule)
+        keys = 0
+        for i, v in enumerate(values):
+            if v is not None: keys |= 1 << i
+        picked = tuple(v for v in values if v is not None)
+        masks = self.buckets.get((ctx, keys, picked))
+        if not masks: return False
+
+        # Règle générale sans biomes : n'importe quelle règle du seau la couvre
+        if not mask: return True
+        return any(m and not (m & ~mask) for m in masks)